@@ -0,0 +1,88 @@
+import heapq
+import datetime
+import itertools
+from collections import namedtuple
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from dex.task import Task
+
+
+# A single due date of a task. n is 0 for the task's current due date, and k for its k-th future recurrence.
+Occurrence = namedtuple("Occurrence", ["date", "task", "n"])
+
+
+def iter_occurrences(tasks: Iterable[Task], start: datetime.date, end: datetime.date) -> Iterator[Occurrence]:
+    """
+    Lazily generate every occurrence of tasks due before an end date, in order of date.
+
+    Each task contributes its current due date; recurring tasks also contribute their future occurrences (due date
+    plus multiples of the recurrence period) up to the end date. A heap holds only the next pending occurrence of
+    each task, so occurrences are produced one at a time without expanding every recurrence up front. Occurrences of
+    a recurring task between its (overdue) due date and the start date are skipped.
+
+    Args:
+        tasks ([Task]): The tasks.
+        start (datetime.date): The first day of the period of interest. Tasks due before this day are still generated
+            (once, for their current due date) so they can be shown as overdue.
+        end (datetime.date): The last day (inclusive) of occurrences to generate.
+
+    Returns:
+        Iterator of Occurrences, ordered by date.
+    """
+    start_ordinal = start.toordinal()
+    end_ordinal = end.toordinal()
+    heap = []
+    # The counter breaks ties between occurrences on the same date, keeping the input order of tasks
+    counter = itertools.count()
+    for task in tasks:
+        due_ordinal = task.due.toordinal()
+        if due_ordinal <= end_ordinal:
+            heap.append((due_ordinal, next(counter), 0, task))
+    heapq.heapify(heap)
+
+    while heap:
+        ordinal, _, n, task = heap[0]
+        yield Occurrence(datetime.date.fromordinal(ordinal), task, n)
+
+        is_recurring, period = task.recurrence
+        if is_recurring:
+            next_n = n + 1
+            next_ordinal = ordinal + period
+            if next_ordinal < start_ordinal:
+                # jump straight to the first recurrence in the period of interest
+                n_skipped = -(-(start_ordinal - next_ordinal) // period)
+                next_n += n_skipped
+                next_ordinal += n_skipped * period
+            if next_ordinal <= end_ordinal:
+                heapq.heapreplace(heap, (next_ordinal, next(counter), next_n, task))
+                continue
+        heapq.heappop(heap)
+
+
+def build_agenda(tasks: Iterable[Task], days: int, start: Union[datetime.date, None] = None) -> \
+        Tuple[List[Occurrence], Iterator[Tuple[datetime.date, List[Occurrence]]]]:
+    """
+    Build a per-day agenda of tasks over the next days, including future occurrences of recurring tasks.
+
+    Args:
+        tasks ([Task]): The tasks to include.
+        days (int): The number of days in the agenda, starting from (and including) the start date.
+        start (datetime.date): The first day of the agenda. Defaults to today.
+
+    Returns:
+        ([Occurrence], Iterator): The overdue occurrences (due before the start date), and a lazy iterator of
+            (date, [Occurrence]) for each day in the agenda which has anything due.
+    """
+    start = datetime.date.today() if start is None else start
+    end = start + datetime.timedelta(days=days - 1)
+    occurrences = iter_occurrences(tasks, start, end)
+
+    overdue = []
+    for occurrence in occurrences:
+        if occurrence.date >= start:
+            occurrences = itertools.chain([occurrence], occurrences)
+            break
+        overdue.append(occurrence)
+
+    by_day = ((date, list(group)) for date, group in itertools.groupby(occurrences, key=lambda o: o.date))
+    return overdue, by_day
@@ -0,0 +1,221 @@
+"""
+A read-only Python API for scripts querying a dex root, without the CLI or an Executor.
+
+Unlike the Executor, which loads every active task of a root up front, the functions here are generators which parse
+one task file at a time as they are consumed, so a script can stop early (e.g., after the first match) without reading
+the rest of the root, and memory does not grow with the number of tasks. Only the directories which can hold the
+requested statuses are read: active (todo, ip, hold) tasks from a project's tasks dir, inactive (done, abandoned) tasks
+from its inactive dir and its archive (see dex.archive).
+
+Nothing is ever written: tasks are yielded read-only (see Task.read_only), pending journaled changes are applied in
+memory (see dex.journal), and tasks with mismatching project ids are yielded as they are in their files. Projects are
+given ids the same way as by the Executor (see dex.project.assign_project_ids), so ids match those shown by the CLI.
+
+    from dex.api import iter_tasks, iter_ranked, lookup
+
+    for t in iter_tasks("~/dex", projects=["a"], statuses=["todo", "ip"]):
+        print(t.dexid, t.name)
+    top = list(iter_ranked("~/dex", n=5, today=True))
+    t = lookup("~/dex", "a3")
+"""
+import os
+import json
+import heapq
+import itertools
+import warnings
+from collections import namedtuple
+from typing import Iterable, Iterator, Union
+
+from dex.task import Task
+from dex.project import read_project_ids, seed_project_ids, assign_project_ids
+from dex.archive import Archive
+from dex.journal import Journal
+from dex.logic import rank_tasks
+from dex.dependency import DependencyGraph
+from dex.exceptions import DexException, DexcodeException
+from dex.util import AttrDict
+from dex.constants import valid_project_ids, tasks_subdir, inactive_subdir, task_extension, executor_fname, \
+    journal_fname, default_executor, executor_all_projects_key, status_primitives, todo_str, ip_str, hold_str, \
+    done_str, abandoned_str
+from dex.constants import today_in_executor_format as today
+
+active_statuses = (todo_str, ip_str, hold_str)
+inactive_statuses = (done_str, abandoned_str)
+
+# A project folder of a root, with the id the Executor gives it
+ProjectRef = namedtuple("ProjectRef", ["id", "name", "path"])
+
+
+def iter_projects(root: str, ignored_dirs: Union[Iterable[str], None] = None,
+                  today: bool = False) -> Iterator[ProjectRef]:
+    """
+    Generate the projects of a root.
+
+    Args:
+        root (str): The path of the root.
+        ignored_dirs ([str]): Directories in the root which are not projects.
+        today (bool): If True, only the projects scheduled for today in the root's executor file.
+
+    Returns:
+        Iterator of ProjectRefs, in order of id.
+    """
+    root = os.path.abspath(os.path.expanduser(root))
+    if not os.path.isdir(root):
+        raise DexException(f"Root {root} does not exist.")
+    ignored_dirs = set(ignored_dirs or ())
+    todays_ids = _todays_project_ids(root) if today else None
+    folders = [fn for fn in os.listdir(root) if fn not in ignored_dirs and os.path.isdir(os.path.join(root, fn))]
+    assigned = read_project_ids(root)
+    if assigned is None:
+        assigned = seed_project_ids(root, folders)
+    for folder, pid in assign_project_ids(folders, assigned).items():
+        if todays_ids is None or pid in todays_ids:
+            yield ProjectRef(pid, folder, os.path.join(root, folder))
+
+
+def iter_tasks(root: str, projects: Union[Iterable[str], None] = None, statuses: Union[Iterable[str], None] = None,
+               today: bool = False, ignored_dirs: Union[Iterable[str], None] = None) -> Iterator[Task]:
+    """
+    Generate the tasks of a root, parsing each task file only when the task is reached.
+
+    Args:
+        root (str): The path of the root.
+        projects ([str]): Only tasks of these projects, given by id or by name. All projects if None.
+        statuses ([str]): Only tasks with these statuses. All statuses if None.
+        today (bool): If True, only tasks of the projects scheduled for today.
+        ignored_dirs ([str]): Directories in the root which are not projects.
+
+    Returns:
+        Iterator of (read-only) Tasks, project by project and in order of file name within each directory.
+    """
+    statuses = set(status_primitives if statuses is None else statuses)
+    projects = None if projects is None else set(projects)
+    pending = _pending_changes(root)
+    for p in iter_projects(root, ignored_dirs=ignored_dirs, today=today):
+        if projects is None or p.id in projects or p.name in projects:
+            yield from _iter_project_tasks(p, statuses, pending)
+
+
+def iter_ranked(root: str, n: int = 0, offset: int = 0, projects: Union[Iterable[str], None] = None,
+                today: bool = False, include_inactive: bool = False, include_held: bool = True,
+                ignored_dirs: Union[Iterable[str], None] = None) -> Iterator[Task]:
+    """
+    Generate the tasks of a root in order of computed priority, as ranked by the CLI (see dex.logic.rank_tasks):
+    active tasks first (blocked tasks after held ones), then, if include_inactive, done and abandoned tasks.
+
+    Ranking needs every active task, so the active tasks are held in memory; inactive tasks are only read once all
+    active tasks were consumed, and with n only the top done tasks are kept while reading them. Abandoned tasks are
+    generated in no particular order.
+
+    Args:
+        root (str): The path of the root.
+        n (int): Max number of tasks to generate. No limit if 0.
+        offset (int): Number of top ranked tasks to skip (e.g., for pagination).
+        projects ([str]): Only tasks of these projects, given by id or by name. All projects if None.
+        today (bool): If True, only tasks of the projects scheduled for today.
+        include_inactive (bool): If True, done and abandoned tasks are generated after the active ones.
+        include_held (bool): If False, held tasks are left out.
+        ignored_dirs ([str]): Directories in the root which are not projects.
+
+    Returns:
+        Iterator of (read-only) Tasks.
+    """
+    selection = dict(projects=projects, today=today, ignored_dirs=ignored_dirs)
+    n_needed = offset + n if n else 0
+
+    def ranked():
+        active = AttrDict({sp: [] for sp in status_primitives})
+        for t in iter_tasks(root, statuses=active_statuses, **selection):
+            active[t.status].append(t)
+        # Held tasks still block the tasks depending on them
+        dependencies = DependencyGraph(t for sp in active_statuses for t in active[sp])
+        if not include_held:
+            active.hold = []
+        ranked_active = rank_tasks(active, limit=n_needed, is_blocked=dependencies.is_blocked)
+        yield from ranked_active
+        if not include_inactive:
+            return
+
+        done = iter_tasks(root, statuses=[done_str], **selection)
+        if n_needed:
+            yield from heapq.nlargest(max(n_needed - len(ranked_active), 0), done, key=lambda t: t.priority)
+        else:
+            yield from sorted(done, key=lambda t: t.priority, reverse=True)
+        yield from iter_tasks(root, statuses=[abandoned_str], **selection)
+
+    return itertools.islice(ranked(), offset, n_needed or None)
+
+
+def lookup(root: str, dexid: str, ignored_dirs: Union[Iterable[str], None] = None) -> Union[Task, None]:
+    """
+    Find a task by dexid. The project with the dexid's project id is searched first, active tasks before inactive
+    ones, and the search stops at the first match.
+
+    Args:
+        root (str): The path of the root.
+        dexid (str): The dexid of the task.
+        ignored_dirs ([str]): Directories in the root which are not projects.
+
+    Returns:
+        (Task): The (read-only) task, or None if no task has the dexid.
+    """
+    pending = _pending_changes(root)
+    projects = sorted(iter_projects(root, ignored_dirs=ignored_dirs), key=lambda p: p.id != dexid[:1])
+    for statuses in (active_statuses, inactive_statuses):
+        for p in projects:
+            for t in _iter_project_tasks(p, set(statuses), pending):
+                if t.dexid == dexid:
+                    return t
+    return None
+
+
+def _iter_project_tasks(project: ProjectRef, statuses: set, pending: dict) -> Iterator[Task]:
+    # With pending journaled changes, a task's status may not match the directory of its file yet
+    any_status = bool(pending)
+    tasks_dir = os.path.join(project.path, tasks_subdir)
+    inactive_dir = os.path.join(tasks_dir, inactive_subdir)
+    dirs = []
+    if any_status or statuses.intersection(active_statuses):
+        dirs.append(tasks_dir)
+    if any_status or statuses.intersection(inactive_statuses):
+        dirs.append(inactive_dir)
+
+    for directory in dirs:
+        filenames = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+        tasks = (_parse_task(os.path.join(directory, fn)) for fn in filenames if fn.endswith(task_extension))
+        if directory == inactive_dir:
+            # Task files take precedence over archived tasks with the same name, as when loading a project
+            tasks = itertools.chain(tasks, Archive(directory).tasks(skip=filenames))
+        for t in tasks:
+            if t is None:
+                continue
+            for attribute, value in pending.get(t.dexid, ()):
+                t._apply(attribute, value)
+            if t.status in statuses:
+                t.read_only = True
+                yield t
+
+
+def _parse_task(path: str) -> Union[Task, None]:
+    if not os.path.isfile(path):
+        return None
+    try:
+        return Task.from_file(path)
+    except DexcodeException:
+        warnings.warn(f"File {path} has no dexcode. Please remove this file or make it into a task.")
+        return None
+
+
+def _pending_changes(root: str) -> dict:
+    path = os.path.join(os.path.abspath(os.path.expanduser(root)), journal_fname)
+    return Journal(path).pending_changes() if os.path.exists(path) else {}
+
+
+def _todays_project_ids(root: str) -> list:
+    path = os.path.join(root, executor_fname)
+    executor_week = default_executor
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            executor_week = json.load(f)
+    todays_ids = executor_week[today]
+    return valid_project_ids if todays_ids == executor_all_projects_key else list(todays_ids)
@@ -0,0 +1,219 @@
+import os
+import json
+import zlib
+import struct
+import tempfile
+import contextlib
+from typing import Dict, Iterable, List
+
+from dex.task import Task, file_stat
+from dex.locking import project_lock
+from dex.exceptions import ArchiveException
+from dex.constants import archive_fname
+
+pack_magic = b"DEXPACK1"
+# Offset and length of the index, at the very end of the pack
+pack_footer = struct.Struct(">QQ")
+
+
+class Archive:
+    def __init__(self, directory: str):
+        """
+        A pack file holding the inactive (done or abandoned) tasks of a project which were archived (see
+        Project.archive_tasks), in place of their task files.
+
+        The pack is one file in the project's inactive dir: the zlib compressed content of each task, followed by a
+        JSON index and a footer with the offset and length of the index. The index maps each task's file name to its
+        dexcode, the modification time of its file when it was archived, and the offset and length of its content, so
+        loading only reads the index; the content of a task is read when it is first needed (see Task.content).
+
+        The pack is never changed in place: adding or removing tasks writes a new pack (copying the compressed content
+        of the other tasks as is) and atomically replaces the old one. The new pack is written holding the project's
+        lock (see locked), from the index as changed by any other dex process since it was read.
+
+        Args:
+            directory (str): The directory of the pack (a project's inactive dir).
+        """
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, archive_fname)
+        self.entries: Dict[str, dict] = {}
+        self.file_stat = None
+        self._lock_depth = 0
+        self.load()
+
+    def __str__(self):
+        return f"<dex Archive {self.path} ({len(self)} tasks)>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, filename: str):
+        return filename in self.entries
+
+    def load(self) -> None:
+        """
+        (Re)read the index of the pack. An archive without a pack file is empty.
+
+        Returns:
+            None
+        """
+        self.entries = {}
+        self.file_stat = None
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            if f.read(len(pack_magic)) != pack_magic:
+                raise ArchiveException(f"{self.path} is not a dex archive.")
+            f.seek(-pack_footer.size, os.SEEK_END)
+            offset, length = pack_footer.unpack(f.read(pack_footer.size))
+            f.seek(offset)
+            self.entries = json.loads(f.read(length).decode("utf-8"))
+        self.file_stat = file_stat(self.path)
+
+    def changed_on_disk(self) -> bool:
+        """
+        Whether the pack was changed (e.g., by another dex process) since this object last read or wrote it.
+
+        Returns:
+            (bool)
+        """
+        current = file_stat(self.path) if os.path.exists(self.path) else None
+        return current != self.file_stat
+
+    def tasks(self, skip: Iterable[str] = ()) -> List[Task]:
+        """
+        Make tasks from the index, without reading their content.
+
+        Args:
+            skip ([str]): File names of tasks not to make (e.g., because a task file with the name exists, which
+                takes precedence over the archived task).
+
+        Returns:
+            ([Task]): The archived tasks, in order of file name.
+        """
+        skip = set(skip)
+        return [Task.from_archive(self, filename, self.entries[filename]["dexcode"])
+                for filename in sorted(self.entries) if filename not in skip]
+
+    def read(self, filename: str) -> str:
+        """
+        Read the content of an archived task.
+
+        Args:
+            filename (str): The file name of the task.
+
+        Returns:
+            (str): The content, without the dexcode.
+        """
+        # Another dex process may have written a new pack, moving the content
+        if self.changed_on_disk():
+            self.load()
+        if filename not in self.entries:
+            raise ArchiveException(f"Task {filename} is not in archive {self.path}.")
+        with open(self.path, "rb") as f:
+            return self._read_blob(f, filename).decode("utf-8")
+
+    def add(self, tasks: Iterable[Task]) -> None:
+        """
+        Add tasks to the pack, replacing any archived tasks with the same file names. The task files are not removed.
+
+        Args:
+            tasks ([Task]): The tasks.
+
+        Returns:
+            None
+        """
+        added = {}
+        for t in tasks:
+            entry = {"dexcode": t.dexcode, "mtime": t.modification_time}
+            added[t.relative_filename] = (entry, zlib.compress(t.content.encode("utf-8")))
+        self._rewrite(added, ())
+
+    def remove(self, filenames: Iterable[str]) -> None:
+        """
+        Remove tasks from the pack (e.g., after they were written back to task files). The pack is removed once empty.
+
+        Args:
+            filenames ([str]): The file names of the tasks.
+
+        Returns:
+            None
+        """
+        self._rewrite({}, filenames)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Hold the lock of the archive's project (see dex.locking.project_lock) while the pack is rewritten, so changes
+        of the pack by other dex processes at the same time are not lost. The index is re-read first if another process
+        changed the pack since this object last read or wrote it. The lock can be taken again while it is held (e.g.,
+        by add while Project.archive_tasks holds it).
+
+        Returns:
+            None
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        with project_lock(os.path.dirname(self.directory)):
+            self._lock_depth += 1
+            try:
+                if self.changed_on_disk():
+                    self.load()
+                yield
+            finally:
+                self._lock_depth -= 1
+
+    def _read_blob(self, f, filename: str) -> bytes:
+        entry = self.entries[filename]
+        f.seek(entry["offset"])
+        return zlib.decompress(f.read(entry["length"]))
+
+    def _rewrite(self, added: Dict[str, tuple], removed: Iterable[str]) -> None:
+        with self.locked():
+            self._write_pack(added, set(removed))
+
+    def _write_pack(self, added: Dict[str, tuple], removed: set) -> None:
+        if not added and not removed & set(self.entries):
+            return
+        kept = [fn for fn in self.entries if fn not in added and fn not in removed]
+        if not kept and not added:
+            os.remove(self.path)
+            self.entries = {}
+            self.file_stat = None
+            return
+
+        entries = {}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as out:
+            out.write(pack_magic)
+            offset = len(pack_magic)
+            old = open(self.path, "rb") if kept else None
+            try:
+                for filename in kept:
+                    entry = self.entries[filename]
+                    old.seek(entry["offset"])
+                    blob = old.read(entry["length"])
+                    out.write(blob)
+                    entries[filename] = dict(entry, offset=offset)
+                    offset += len(blob)
+            finally:
+                if old is not None:
+                    old.close()
+            for filename, (entry, blob) in added.items():
+                out.write(blob)
+                entries[filename] = dict(entry, offset=offset, length=len(blob))
+                offset += len(blob)
+            index = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+            out.write(index)
+            out.write(pack_footer.pack(offset, len(index)))
+        os.replace(tmp_path, self.path)
+        self.entries = entries
+        self.file_stat = file_stat(self.path)
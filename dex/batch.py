@@ -0,0 +1,386 @@
+import os
+import re
+import csv
+import json
+import shlex
+import datetime
+from collections import namedtuple
+from typing import IO, Iterable, Iterator, List, Tuple, Union
+
+from dex.task import Task
+from dex.exceptions import BatchException, DexException
+from dex.constants import importance_primitives, effort_primitives, status_primitives, valid_recurrence_times, \
+    due_date_fmt, done_str, ip_str, todo_str, abandoned_str, hold_str, inactive_subdir
+
+
+dexid_regex = re.compile(r"^[a-z]\d+$")
+
+# Shorthand commands for setting the status, same as 'dex task [dexid] done' etc.
+status_actions = {"done": done_str, "exec": ip_str, "todo": todo_str, "aban": abandoned_str, "hold": hold_str}
+
+# Options of 'set' (and 'due'), same as 'dex task [dexid] set'
+set_options = {"-i": "importance", "--importance": "importance", "-e": "effort", "--effort": "effort",
+               "-s": "status", "--status": "status", "-d": "due", "--due": "due",
+               "-r": "recurring", "--recurring": "recurring"}
+
+# The result of one dexid of one batch item. item is the 1-based line number of the item.
+BatchResult = namedtuple("BatchResult", ["item", "dexid", "ok", "message"])
+
+# Columns (CSV) or keys (JSON lines) of imported tasks; see parse_import_row
+import_fields = ("name", "effort", "importance", "due", "status", "recurring", "flags", "content")
+import_formats = ("csv", "jsonl")
+
+
+def is_dexid(s: str) -> bool:
+    return bool(dexid_regex.match(s))
+
+
+def parse_changes(importance=None, effort=None, status=None, due=None, recurring=None) -> Tuple[dict, List[str]]:
+    """
+    Validate changes to a task's attributes, as given on the command line. Arguments which are None are not changed.
+
+    Args:
+        importance (int or str): The new importance.
+        effort (int or str): The new effort.
+        status (str): The new status primitive.
+        due (str): The new due date, as YYYY-MM-DD or a number of days from today.
+        recurring (int or str): The new recurrence time in days (0 for not recurring).
+
+    Returns:
+        (dict, [str]): The parsed changes (keys of Task.update and "recurring"), and any error messages.
+    """
+    changes, errors = {}, []
+    for name, value, primitives in (("importance", importance, importance_primitives),
+                                    ("effort", effort, effort_primitives)):
+        if value is None:
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            errors.append(f"{value} not a valid {name} value {primitives}")
+            continue
+        if value not in primitives:
+            errors.append(f"{value} not a valid {name} value {primitives}")
+        else:
+            changes[name] = value
+
+    if status is not None:
+        if status not in status_primitives:
+            errors.append(f"{status} not a valid status {status_primitives}")
+        else:
+            changes["status"] = status
+
+    if due is not None:
+        try:
+            changes["due"] = datetime.datetime.today() + datetime.timedelta(days=int(due))
+        except (TypeError, ValueError):
+            try:
+                changes["due"] = datetime.datetime.strptime(str(due), due_date_fmt)
+            except ValueError:
+                errors.append(f"The entry '{due}' could not be parsed as a date or number of days.")
+
+    if recurring is not None:
+        try:
+            days = int(recurring)
+        except (TypeError, ValueError):
+            days = None
+        if days is None or (days not in valid_recurrence_times and days != 0):
+            errors.append(f"{recurring} not a valid recurrence time.")
+        else:
+            changes["recurring"] = days
+    return changes, errors
+
+
+def parse_batch_line(line: str) -> Tuple[List[str], dict]:
+    """
+    Parse one batch command, either as text in the same form as the arguments of 'dex task' (without "task"), e.g.:
+
+        a3 a7 b12 done
+        b2 imp 4
+        c1 due 2020-09-01 -r 7
+        a4 set -i 3 -s hold
+
+    or as a JSON object with "id" or "ids" and the attributes to change (or a status "action"), e.g.:
+
+        {"ids": ["a3", "a7"], "action": "done"}
+        {"id": "b2", "importance": 4, "due": "2020-09-01"}
+
+    Args:
+        line (str): The command.
+
+    Returns:
+        ([str], dict): The dexids and the parsed changes (see parse_changes).
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        dexids, kwargs = _parse_json_command(line)
+    else:
+        dexids, kwargs = _parse_text_command(line)
+
+    if not dexids:
+        raise BatchException("No task ids given.")
+    bad_ids = [dexid for dexid in dexids if not is_dexid(dexid)]
+    if bad_ids:
+        raise BatchException(f"Task ids {bad_ids} not parsed. Task ids are a letter followed by a number.")
+    changes, errors = parse_changes(**kwargs)
+    if errors:
+        raise BatchException(" ".join(errors))
+    if not changes:
+        raise BatchException("No changes given.")
+    return dexids, changes
+
+
+def _parse_json_command(line: str) -> Tuple[List[str], dict]:
+    try:
+        command = json.loads(line)
+    except ValueError as ve:
+        raise BatchException(f"Invalid JSON: {ve}")
+    if not isinstance(command, dict):
+        raise BatchException("JSON commands must be objects.")
+    command = dict(command)
+    dexids = command.pop("ids", None) or [command.pop("id", None)]
+    command.pop("id", None)
+    if not isinstance(dexids, list) or not all(isinstance(dexid, str) for dexid in dexids):
+        raise BatchException("JSON commands need an \"id\" string or an \"ids\" list of strings.")
+
+    action = command.pop("action", None)
+    if action is not None:
+        if action not in status_actions:
+            raise BatchException(f"Unknown action '{action}'. Actions are {list(status_actions.keys())}.")
+        command["status"] = status_actions[action]
+    unknown = [k for k in command if k not in ("importance", "effort", "status", "due", "recurring")]
+    if unknown:
+        raise BatchException(f"Unknown fields {unknown}.")
+    return dexids, command
+
+
+def _parse_text_command(line: str) -> Tuple[List[str], dict]:
+    try:
+        tokens = shlex.split(line)
+    except ValueError as ve:
+        raise BatchException(f"Could not parse command: {ve}")
+    n_ids = 0
+    while n_ids < len(tokens) and is_dexid(tokens[n_ids]):
+        n_ids += 1
+    dexids, tokens = tokens[:n_ids], tokens[n_ids:]
+    if not tokens:
+        raise BatchException("No command given.")
+
+    action, args = tokens[0], tokens[1:]
+    if action in status_actions and not args:
+        return dexids, {"status": status_actions[action]}
+    elif action in ("imp", "eff") and len(args) == 1:
+        return dexids, {"importance" if action == "imp" else "effort": args[0]}
+    elif action in ("due", "set"):
+        kwargs = {}
+        if action == "due":
+            if not args:
+                raise BatchException("'due' needs a due date.")
+            kwargs["due"], args = args[0], args[1:]
+        if len(args) % 2:
+            raise BatchException(f"Could not parse options {args}.")
+        for option, value in zip(args[::2], args[1::2]):
+            if option not in set_options or (action == "due" and set_options[option] != "recurring"):
+                raise BatchException(f"Unknown option '{option}' for '{action}'.")
+            kwargs[set_options[option]] = value
+        return dexids, kwargs
+    raise BatchException(f"Could not parse command '{' '.join(tokens)}'. Commands are "
+                         f"{list(status_actions.keys()) + ['imp', 'eff', 'due', 'set']}.")
+
+
+def apply_changes(task_changes: Iterable[Tuple[Task, dict]]) -> List[Tuple[Task, Union[str, None]]]:
+    """
+    Apply changes to tasks in one pass. All the changes to a task are merged (later changes win) and written with a
+    single write of the task's file, and tasks are processed grouped by the directory their files move to (e.g., the
+    inactive dir of a project), so moves into the same directory happen together.
+
+    Args:
+        task_changes ([(Task, dict)]): Tasks and changes (see parse_changes) to make to them.
+
+    Returns:
+        [(Task, str or None)]: Each task, in order of first appearance, and an error message if it could not be changed.
+    """
+    merged = {}
+    for t, changes in task_changes:
+        merged.setdefault(id(t), (t, {}))[1].update(changes)
+
+    def destination(item):
+        t, changes = item
+        status = changes.get("status", t.status)
+        is_inactive = status in (done_str, abandoned_str)
+        if is_inactive == (t.status in (done_str, abandoned_str)):
+            return ""
+        return os.path.abspath(os.path.join(t.prefix_path, inactive_subdir if is_inactive else os.pardir))
+
+    errors = {}
+    for t, changes in sorted(merged.values(), key=destination):
+        try:
+            t.update(importance=changes.get("importance"), effort=changes.get("effort"), due=changes.get("due"),
+                     status=changes.get("status"), recurring=changes.get("recurring"))
+        except (OSError, ValueError, DexException) as e:
+            errors[id(t)] = str(e)
+    return [(t, errors.get(tid)) for tid, (t, _) in merged.items()]
+
+
+def run_batch(executor, lines: Iterable[str]) -> List[BatchResult]:
+    """
+    Run batch commands (see parse_batch_line) against a loaded executor. Every command is parsed and every task is
+    looked up before any changes are made, then all changes are applied in one pass (see apply_changes).
+
+    Blank lines and lines starting with "#" are ignored.
+
+    Args:
+        executor (Executor): The executor.
+        lines ([str]): The commands, one per line.
+
+    Returns:
+        [BatchResult]: One result per task id of each command (or per command, if it could not be parsed), in order.
+    """
+    results = []
+    pending = []
+    for i, line in enumerate(lines, start=1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        try:
+            dexids, changes = parse_batch_line(line)
+        except BatchException as be:
+            results.append(BatchResult(i, None, False, be.msg))
+            continue
+        for dexid in dexids:
+            t = executor.get_task(dexid)
+            if t is None:
+                results.append(BatchResult(i, dexid, False, f"No task '{dexid}'."))
+            else:
+                pending.append((i, dexid, t, changes))
+
+    applied = dict((id(t), error) for t, error in apply_changes((t, changes) for _, _, t, changes in pending))
+    for i, dexid, t, changes in pending:
+        error = applied[id(t)]
+        if error is None:
+            results.append(BatchResult(i, dexid, True, f"'{t.name}' {_describe_changes(changes)}"))
+        else:
+            results.append(BatchResult(i, dexid, False, error))
+    return sorted(results, key=lambda r: r.item)
+
+
+def _describe_changes(changes: dict) -> str:
+    described = []
+    for k, v in changes.items():
+        v = v.strftime(due_date_fmt) if isinstance(v, datetime.datetime) else v
+        described.append(f"{k}={v}")
+    return ", ".join(described)
+
+
+def read_import_rows(f: IO, file_format: str) -> Iterator[Tuple[int, Union[dict, str]]]:
+    """
+    Read the rows of a task import file: either CSV with a header row naming the columns (see import_fields), e.g.:
+
+        name,effort,importance,due,status,recurring
+        Write report,3,4,2020-09-01,todo,
+        Water plants,1,2,3,,7
+
+    or JSON lines with one object per task, e.g.:
+
+        {"name": "Write report", "effort": 3, "importance": 4, "due": "2020-09-01"}
+
+    Blank lines (and, in JSON lines, lines starting with "#") are skipped. Empty CSV cells are treated as not given.
+
+    Args:
+        f (file): The open file.
+        file_format (str): "csv" or "jsonl".
+
+    Returns:
+        Iterator of (int, dict or str): The line number of each row and its fields, or an error message if the row
+            could not be read.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(f)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, "More cells than columns."
+            else:
+                yield reader.line_num, {k: v for k, v in record.items() if v not in (None, "")}
+    elif file_format == "jsonl":
+        for i, line in enumerate(f, start=1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as ve:
+                yield i, f"Invalid JSON: {ve}"
+                continue
+            yield i, record if isinstance(record, dict) else "JSON rows must be objects."
+    else:
+        raise BatchException(f"Unknown import format '{file_format}'. Formats are {list(import_formats)}.")
+
+
+def parse_import_row(record: dict) -> Tuple[dict, List[str]]:
+    """
+    Validate the fields of an imported task, given as strings (CSV) or JSON values. name, effort, importance and due
+    are required; due is YYYY-MM-DD or a number of days from today, recurring a number of days, and flags a list of
+    flags or a string of space separated flags.
+
+    Args:
+        record (dict): The fields of the task (see import_fields).
+
+    Returns:
+        (dict, [str]): The spec of the task (see Project.bulk_create_tasks), and any error messages.
+    """
+    unknown = [k for k in record if k not in import_fields]
+    missing = [k for k in ("name", "effort", "importance", "due") if record.get(k) is None]
+    errors = [f"Unknown fields {unknown}."] if unknown else []
+    if missing:
+        errors.append(f"Missing {missing}.")
+
+    changes, change_errors = parse_changes(importance=record.get("importance"), effort=record.get("effort"),
+                                           status=record.get("status"), due=record.get("due"),
+                                           recurring=record.get("recurring"))
+    errors += change_errors
+    spec = {k: v for k, v in changes.items() if k != "recurring"}
+    spec["name"] = str(record.get("name", "")).strip()
+
+    flags = record.get("flags", [])
+    if isinstance(flags, str):
+        flags = flags.split()
+    if not isinstance(flags, list) or not all(isinstance(flag, str) for flag in flags):
+        errors.append(f"{flags} not a valid list of flags.")
+        flags = []
+    if changes.get("recurring"):
+        flags = [flag for flag in flags if not flag.startswith("r")] + [f"r{changes['recurring']}"]
+    spec["flags"] = flags or ["n"]
+    if record.get("content") is not None:
+        spec["content"] = str(record["content"])
+    return spec, errors
+
+
+def run_import(project, rows: Iterable[Tuple[int, Union[dict, str]]]) -> List[BatchResult]:
+    """
+    Create tasks from import rows (see read_import_rows) in one project. Every row is parsed and validated before any
+    task is created, then all the valid rows are created at once (see Project.bulk_create_tasks).
+
+    Args:
+        project (Project): The project.
+        rows ([(int, dict or str)]): The line numbers and fields (or read errors) of the rows.
+
+    Returns:
+        [BatchResult]: One result per row, in order, with the dexid of each created task.
+    """
+    results = {}
+    specs = []
+    for i, record in rows:
+        if isinstance(record, str):
+            results[i] = BatchResult(i, None, False, record)
+            continue
+        spec, errors = parse_import_row(record)
+        if errors:
+            results[i] = BatchResult(i, None, False, " ".join(errors))
+        else:
+            specs.append((i, spec))
+
+    created = project.bulk_create_tasks([spec for _, spec in specs])
+    for (i, spec), (t, error) in zip(specs, created):
+        if t is None:
+            results[i] = BatchResult(i, None, False, error)
+        else:
+            results[i] = BatchResult(i, t.dexid, True, f"'{t.name}' created")
+    return [results[i] for i in sorted(results)]
@@ -0,0 +1,221 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import Callable, Union
+
+from dex.constants import cache_dirname, rendered_cache_subdir, rendered_cache_max_bytes
+
+
+def get_cache_dir(*subdirs: str) -> str:
+    """
+    Get the directory dex uses for caches, following the XDG base directory spec (~/.cache/dex by default).
+
+    Caches never live inside the executor's root directory, so they are safe to use with read-only vaults.
+
+    Args:
+        *subdirs (str): Subdirectories of the dex cache directory to join onto the path.
+
+    Returns:
+        (str): The path of the cache directory. It is not created.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, cache_dirname, *subdirs)
+
+
+def hash_str(string: str) -> str:
+    return hashlib.sha1(string.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    entry_extension = ".txt"
+    source_extension = ".src"
+
+    def __init__(self, path: Union[str, None] = None, max_bytes: int = rendered_cache_max_bytes):
+        """
+        An on-disk cache of rendered terminal output, keyed by the hash of the content being rendered.
+
+        Entries are evicted least-recently-used first once the cache grows beyond max_bytes. When a source file
+        (e.g., a task) is rendered with different content than last time, its previous entry is dropped immediately.
+
+        Args:
+            path (str): The directory of the cache. Defaults to the "rendered" dir in the dex cache directory.
+            max_bytes (int): The max total size of the cached entries and the records of their sources.
+        """
+        self.path = os.path.abspath(path) if path else get_cache_dir(rendered_cache_subdir)
+        self.max_bytes = max_bytes
+
+    def __str__(self):
+        return f"<dex RenderCache {self.path} | max {self.max_bytes} bytes>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def key(self, content: str) -> str:
+        """
+        The cache key for content. Includes the terminal width and mdv themes, since the rendered output depends on
+        them.
+
+        Args:
+            content (str): The content to be rendered.
+
+        Returns:
+            (str): The key
+        """
+        columns = shutil.get_terminal_size().columns
+        themes = [os.environ.get(v, "") for v in ("MDV_THEME", "MDV_CODE_THEME", "AXC_THEME", "AXC_CODE_THEME")]
+        return hash_str("\0".join([str(columns)] + themes + [content]))
+
+    def get(self, key: str) -> Union[str, None]:
+        """
+        Get a rendered entry, marking it as recently used.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            (str or None): The rendered output, or None if it is not cached.
+        """
+        entry = self._entry_path(key)
+        try:
+            with open(entry, "r") as f:
+                rendered = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return rendered
+
+    def put(self, key: str, rendered: str) -> None:
+        """
+        Store a rendered entry, then evict old entries if the cache is over its size cap.
+
+        Args:
+            key (str): The cache key
+            rendered (str): The rendered output
+
+        Returns:
+            None
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self._atomic_write(self._entry_path(key), rendered)
+        self.evict()
+
+    def get_or_render(self, content: str, renderer: Callable[[str], str], source: Union[str, None] = None) -> str:
+        """
+        Get rendered content from the cache, rendering and storing it if it is not cached.
+
+        Args:
+            content (str): The content to render.
+            renderer (callable): Function taking content and returning the rendered string.
+            source (str): Optional path of the file the content came from. If the content of this source has changed
+                since it was last rendered, the stale entry is removed.
+
+        Returns:
+            (str): The rendered content.
+        """
+        key = self.key(content)
+        rendered = self.get(key)
+        if rendered is None:
+            rendered = renderer(content)
+            try:
+                self.put(key, rendered)
+            except OSError:
+                # An unwritable cache should never prevent viewing
+                return rendered
+        if source:
+            self._update_source(source, key)
+        return rendered
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries, along with the records of the sources rendered to them, until the cache is
+        within its size cap. Records of sources whose entries were already removed are removed first.
+
+        Returns:
+            (int): The number of entries removed.
+        """
+        entries = {}
+        sources = []
+        total = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(self.entry_extension):
+                    stat = entry.stat()
+                    entries[entry.name[:-len(self.entry_extension)]] = (stat.st_mtime, stat.st_size, entry.path)
+                    total += stat.st_size
+                elif entry.name.endswith(self.source_extension):
+                    size = entry.stat().st_size
+                    sources.append((size, entry.path))
+                    total += size
+        if total <= self.max_bytes:
+            return 0
+
+        sources_by_key = {}
+        for size, path in sources:
+            try:
+                with open(path, "r") as f:
+                    key = f.read()
+            except FileNotFoundError:
+                continue
+            if key in entries:
+                sources_by_key.setdefault(key, []).append((size, path))
+            else:
+                self._remove(path)
+                total -= size
+
+        n_removed = 0
+        for _, size, path, key in sorted((m, size, path, key) for key, (m, size, path) in entries.items()):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            for source_size, source_path in sources_by_key.get(key, ()):
+                self._remove(source_path)
+                total -= source_size
+            n_removed += 1
+        return n_removed
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+
+        Returns:
+            None
+        """
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+
+    def _update_source(self, source: str, key: str) -> None:
+        source_file = os.path.join(self.path, hash_str(os.path.abspath(source)) + self.source_extension)
+        try:
+            with open(source_file, "r") as f:
+                previous_key = f.read()
+        except FileNotFoundError:
+            previous_key = None
+        if previous_key == key:
+            return
+        if previous_key:
+            self._remove(self._entry_path(previous_key))
+        try:
+            self._atomic_write(source_file, key)
+        except OSError:
+            pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key + self.entry_extension)
+
+    def _atomic_write(self, path: str, string: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, "w") as f:
+            f.write(string)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,207 @@
+import json
+import time
+import queue
+import collections
+import threading
+import http.client
+from urllib.parse import urlencode, quote
+from typing import Iterable, List, Union
+
+from dex.exceptions import ClientException
+from dex.constants import server_default_host, server_default_port, server_keepalive_timeout, todo_str
+
+
+class DexClient:
+    def __init__(self, host: str = server_default_host, port: int = server_default_port, max_connections: int = 4,
+                 timeout: float = 10, max_cached: int = 128):
+        """
+        A Python client for a dex server (see dex.server.DexServer).
+
+        Connections are kept alive and reused from a pool, so consecutive requests do not reconnect. Connections idle
+        for longer than the server keeps them open are not reused. A GET on a connection which the server closed
+        anyway is retried once on a new connection; other requests (e.g., creating a task) are never retried, since
+        the server may have handled them already. GET responses are cached with their ETag and revalidated with
+        If-None-Match, so unchanged responses are not re-sent by the server.
+
+        The client is thread-safe; at most max_connections connections are kept open.
+
+        Args:
+            host (str): The server's host.
+            port (int): The server's port.
+            max_connections (int): Max number of idle connections kept in the pool.
+            timeout (float): Socket timeout in seconds.
+            max_cached (int): Max number of GET responses cached; the least recently used are dropped first.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_cached = max_cached
+        self._pool = queue.LifoQueue(maxsize=max_connections)
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __str__(self):
+        return f"<dex DexClient {self.host}:{self.port}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+        """
+        while True:
+            try:
+                self._pool.get_nowait()[0].close()
+            except queue.Empty:
+                return
+
+    # Endpoints
+    ###########
+
+    def tasks(self, n: int = 0, offset: int = 0, where: Union[str, None] = None, only_today: bool = False,
+              include_inactive: bool = False, include_held: bool = True) -> List[dict]:
+        """
+        Get tasks ordered by computed priority. Arguments are the same as for
+        Executor.get_n_highest_priority_tasks (n=0 is all tasks).
+
+        Returns:
+            [dict]: Tasks (see Task.to_dict), with their project_id.
+        """
+        params = {"n": n, "offset": offset}
+        if where:
+            params["where"] = where
+        if only_today:
+            params["today"] = 1
+        if include_inactive:
+            params["inactive"] = 1
+        if not include_held:
+            params["held"] = 0
+        return self._request("GET", "/tasks?" + urlencode(params))["tasks"]
+
+    def task(self, dexid: str) -> dict:
+        return self._request("GET", f"/tasks/{quote(dexid)}")
+
+    def projects(self) -> List[dict]:
+        return self._request("GET", "/projects")["projects"]
+
+    def stats(self) -> dict:
+        return self._request("GET", "/stats")
+
+    def update_task(self, dexid: str, **changes) -> dict:
+        """
+        Change a task.
+
+        Args:
+            dexid (str): The task's dexid.
+            **changes: Any of status, importance, effort, due (YYYY-MM-DD), flags ([str]), name.
+
+        Returns:
+            (dict): The updated task.
+        """
+        return self._request("POST", f"/tasks/{quote(dexid)}", changes)
+
+    def create_task(self, project_id: str, name: str, effort: int, due: str, importance: int,
+                    status: str = todo_str, flags: Iterable[str] = ()) -> dict:
+        """
+        Create a new task in a project.
+
+        Args:
+            project_id (str): The project id.
+            name (str): The task name.
+            effort (int): The effort.
+            due (str): The due date, as YYYY-MM-DD.
+            importance (int): The importance.
+            status (str): The initial (active) status.
+            flags ([str]): Flags, e.g. ["r7"]. No flags ("n") if empty.
+
+        Returns:
+            (dict): The created task.
+        """
+        body = {"name": name, "effort": effort, "due": due, "importance": importance, "status": status,
+                "flags": list(flags) or ["n"]}
+        return self._request("POST", f"/projects/{quote(project_id)}/tasks", body)
+
+    # Connections
+    #############
+
+    def _request(self, method: str, path: str, body: Union[dict, None] = None):
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        cached = None
+        if method == "GET":
+            with self._cache_lock:
+                cached = self._cache.get(path)
+                if cached:
+                    self._cache.move_to_end(path)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        conn, reused = self._acquire()
+        try:
+            try:
+                response, payload = self._send(conn, method, path, data, headers)
+            except (http.client.RemoteDisconnected, ConnectionError):
+                if not reused or method != "GET":
+                    raise
+                # The server closed the idle connection; retry once on a new one
+                conn.close()
+                conn, reused = self._new_connection(), False
+                response, payload = self._send(conn, method, path, data, headers)
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise ClientException(f"Could not reach dex server at {self.host}:{self.port}: {e}")
+        self._release(conn, response)
+
+        if response.status == 304 and cached:
+            return cached[1]
+        result = json.loads(payload.decode("utf-8")) if payload else None
+        if response.status >= 400:
+            msg = result.get("error") if isinstance(result, dict) else response.reason
+            raise ClientException(msg, status=response.status)
+        etag = response.getheader("ETag")
+        if method == "GET" and etag:
+            with self._cache_lock:
+                self._cache[path] = (etag, result)
+                self._cache.move_to_end(path)
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _send(conn, method, path, data, headers):
+        conn.request(method, path, body=data, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        while True:
+            try:
+                conn, released = self._pool.get_nowait()
+            except queue.Empty:
+                return self._new_connection(), False
+            # The server closes connections idle for server_keepalive_timeout; leave a margin for the request
+            if time.monotonic() - released < server_keepalive_timeout / 2:
+                return conn, True
+            conn.close()
+
+    def _release(self, conn, response) -> None:
+        if response.will_close:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            conn.close()
@@ -1,8 +1,11 @@
 import os
+import sys
 import copy
 import json
 import random
 import datetime
+import itertools
+import shlex
 import shutil
 
 import click
@@ -10,18 +13,60 @@ import treelib
 
 from dex.project import Project
 from dex.executor import Executor
+from dex.task import write_counts
+from dex.federation import FederatedExecutor, federated_dexid
+from dex.server import DexServer
+from dex.batch import parse_changes, apply_changes, run_batch, is_dexid, read_import_rows, run_import, import_formats
 from dex.logic import rank_tasks
+from dex.render import show_tree
+from dex.cache import RenderCache
+from dex.query import compile_query
+from dex.exceptions import DexException, QueryException, FederationException, DependencyException, JournalException
 from dex.util import TerminalStyle, initiate_editor
 from dex.constants import status_primitives, hold_str, done_str, abandoned_str, ip_str, todo_str, \
-    executor_all_projects_key, valid_project_ids, importance_primitives, effort_primitives, max_due_date, due_date_fmt, valid_recurrence_times, recurring_flag, no_flags
+    executor_all_projects_key, root_id_separator, archive_default_days, server_default_host, server_default_port, server_default_workers, valid_project_ids, importance_primitives, effort_primitives, max_due_date, due_date_fmt, valid_recurrence_times
 
 '''
 # Top level commands
 --------------------
 dex init [path]                                     # create a new executor file and save the path somewhere
 dex exec                                            # print and start work on the highest importance task, printing all info
+    (--budget/-b [val])                             # pick the best set of tasks fitting in [val] effort, and start on the first
+    (--all-roots/-r)                                # pick the most important task across all registered roots
 dex info                                            # output some info about the current projects
+    (--json/--ndjson)                               # output JSON for scripts
 dex example [path]                                  # create an example directory
+dex agenda                                          # show what is due each day, including recurrences
+    (--days/-n [val])                               # number of days shown (default 14)
+dex plan --capacity [val]                           # plan active tasks over the week, fitting [val] effort per day
+    (--week)                                        # plan the next 7 days (default)
+    (--days/-n [val])                               # plan this number of days instead
+dex search [query]                                  # search the content of tasks and notes, ranked by relevance
+    (--status/-s [status])                          # only tasks with this status (repeatable)
+    (--project/-p [id])                             # only tasks and notes of this project (repeatable)
+    (--n-shown/-n [val])                            # number of results shown (default 10)
+dex serve                                           # serve tasks over HTTP/JSON on localhost (see dex.client)
+    (--port/-p [val])                               # port to bind (default 8765)
+dex batch                                           # run task commands from stdin, e.g. 'a3 a7 done' or JSON lines
+    (--file/-f [path])                              # read the commands from a file instead
+dex import [path] --project/-p [id]                 # create many tasks at once from a CSV or JSON lines file
+    (--format [csv/jsonl])                          # format of the file (default from its extension)
+dex shell                                           # interactive prompt for dex commands, with tab completion of task ids
+dex undo                                            # revert the most recent task change (needs the journal)
+    (--n-changes/-n [val])                          # revert this many changes
+dex archive                                         # pack old done and abandoned tasks into one archive file per project
+    (--days/-d [val])                               # only tasks unchanged for this many days (default 30)
+dex stats                                           # show completions per week and project, cycle times and overdue rates
+    (--days/-n [val])                               # only completions in the last [val] days (default all)
+    (--project/-p [id])                             # only completions in this project (repeatable)
+
+
+# Root commands
+-------------------
+dex roots                                           # list registered roots (for --all-roots)
+dex roots add [name] [path]                         # register a root
+    (--ignore/-i [dir])                             # directories to ignore in the root
+dex roots rm [name]                                 # unregister a root
 
 
 # Executor commands
@@ -30,9 +75,18 @@ dex executor                                        # view weekly schedule
 dex executor edit                                   # edit the schedule file
 
 
+# Journal commands
+-------------------
+dex journal                                         # show whether task changes are journaled, and pending changes
+dex journal enable                                  # journal task changes instead of rewriting task files right away
+dex journal disable                                 # write pending changes to the task files and stop journaling
+dex journal compact                                 # write pending changes to the task files
+
+
 # Project commands
 -------------------
-dex projects
+dex projects                                        # list all projects
+    (--json/--ndjson)                               # output JSON for scripts
 dex project new                                     # make a new project
 dex project [id]                                    # show all tasks for this project, ordered by priority             
 dex project [id] exec                               # work on this specific project (not recommended)
@@ -52,13 +106,22 @@ dex tasks                                           # view ordered tasks across
     
     Additional options
     (--n-shown/-n [val])                            # limit to this number of total tasks shown
+    (--page [val])                                  # show this page of tasks, with --n-shown tasks per page
+    (--offset [val])                                # skip this number of the highest ranked tasks
     (--all-projects/-a)                             # show across all projects, not just today
     (--include-inactive)                            # show inactive (done+abandoned) tasks
+    (--where/-w [expr])                             # only show tasks matching an expression, e.g. 'importance>=4 and due<=7'
+    (--json/--ndjson)                               # output the tasks as JSON (one task per line with --ndjson) for scripts
     
 dex task                                            # make a new task
 dex task [dexid]                                    # view a task
 dex task [dexid] edit                               # edit a task
 dex task [dexid] rename                             # rename a task
+dex task [dexid] move [id]                          # move a task to another project (it gets a new dexid there)
+dex task [dexid] links                              # show the tasks and notes a task links to ([[name]]) and is linked from
+dex task [dexid] depends [dexid] ...                # make a task depend on (be blocked by) other tasks until they are done
+    (--remove/-r)                                   # remove the dependencies instead
+dex task [dexid] [dexid] ... [command]              # run set, or a set alias (e.g., done), on several tasks at once
     
 dex task [dexid] set ...                            # set an attribute of a task
     (--importance/-i [val]) 
@@ -84,11 +147,15 @@ dex task [dexid] aban                               # abandon a task
 
 # Constants
 PROJECT_SUBCOMMAND_LIST = ["exec", "rename", "rm"]
-TASK_SUBCOMMAND_LIST = PROJECT_SUBCOMMAND_LIST + ["edit", "done", "todo", "hold", "aban", "imp", "eff", "due"]
+TASK_SUBCOMMAND_LIST = PROJECT_SUBCOMMAND_LIST + ["edit", "done", "todo", "hold", "aban", "imp", "eff", "due", "links", "depends", "move"]
 CONTAINER_DIR = os.path.dirname(os.path.abspath(__file__))
 CURRENT_ROOT_PATH_LOC = os.path.join(CONTAINER_DIR, "current_root.path")
 CURRENT_ROOT_IGNORE_LOC = os.path.join(CONTAINER_DIR, "current_root.ignore")
+ROOTS_LOC = os.path.join(CONTAINER_DIR, "roots.json")
 MAX_ENTRY_RETRIES = 3
+TASK_IDS_META_KEY = "dex.task_ids"
+READ_ONLY_COMMAND_LIST = ["info", "projects", "tasks", "agenda", "plan", "search", "stats"]
+MULTI_TASK_SUBCOMMAND_LIST = ["set", "done", "exec", "todo", "aban", "hold", "imp", "eff", "due"]
 
 STATUS_COLORMAP = {"todo": "b", "ip": "y", "hold": "m", "done": "g", "abandoned": "k"}
 SUCCESS_COLOR = "c"
@@ -133,6 +200,34 @@ def get_current_ignore():
     return [folder.replace("\n", "") for folder in i]
 
 
+def get_registered_roots():
+    if not os.path.exists(ROOTS_LOC):
+        return {}
+    with open(ROOTS_LOC, "r") as f:
+        return json.load(f)
+
+
+def write_registered_roots(roots):
+    with open(ROOTS_LOC, "w") as f:
+        json.dump(roots, f, indent=4)
+
+
+class ExecutorContext(dict):
+    """
+    Context object which only loads the current root's executor when a command first asks for it, so commands which
+    do not need it (e.g., exec --all-roots) do not pay for loading it. Query commands (READ_ONLY_COMMAND_LIST) load
+    it read-only, so they never write to the root.
+    """
+    def __missing__(self, key):
+        if key not in ("EXECUTOR", "PMAP"):
+            raise KeyError(key)
+        checks_root_path_loc()
+        e = Executor(path=get_current_root_path(), ignored_dirs=get_current_ignore(), read_only=self.get("READ_ONLY", False))
+        self["EXECUTOR"] = e
+        self["PMAP"] = e.project_map
+        return self[key]
+
+
 # Utility functions for common CLI tasks
 ########################################################################################################################
 def get_project_header_str(project):
@@ -171,27 +266,59 @@ def get_task_string(t, colorize_status=False, id_color="x", name_color="x", attr
     return f"{id_str} ({status_str}) - {name_str} {attr_str}"
 
 
-def print_projects(pmap, show_n_tasks=3, show_inactive=False, **get_task_str_kwargs):
-    tree = treelib.Tree()
-    tree.create_node("All projects", "root")
-    i = 0
-    for p in pmap.values():
-        id_str = get_project_header_str(p)
-        tree.create_node(id_str, p.id, parent="root")
-        if show_n_tasks:
-            ordered_tasks = rank_tasks(p.tasks, limit=show_n_tasks, include_inactive=show_inactive)
-            if ordered_tasks:
-                for task in ordered_tasks:
-                    task_txt = get_task_string(task, **get_task_str_kwargs)
-                    tree.create_node(task_txt, i, parent=p.id)
-                    i += 1
-                if len(p.tasks.all) - len(p.tasks.done + p.tasks.abandoned) > show_n_tasks:
-                    tree.create_node("...", i, parent=p.id)
-                    i += 1
-            else:
-                tree.create_node("No tasks.", i, parent=p.id)
-                i += 1
-    tree.show(key=lambda node: node.identifier)
+def get_task_record(t, project_id):
+    record = t.to_dict()
+    record["project_id"] = project_id
+    return record
+
+
+def get_project_record(p):
+    return {
+        "id": p.id,
+        "name": p.name,
+        "path": p.path,
+        "n_tasks": {sp: len(p.tasks[sp]) for sp in status_primitives}
+    }
+
+
+def write_records(records, output_format):
+    """
+    Write records (dicts) to stdout for scripts, one at a time as they are produced, instead of building the tree
+    output: as a JSON array, or as newline delimited JSON (one record per line) if output_format is "ndjson".
+    """
+    write = sys.stdout.write
+    if output_format == "ndjson":
+        for record in records:
+            write(json.dumps(record))
+            write("\n")
+        return
+    write("[")
+    for i, record in enumerate(records):
+        write(",\n" if i else "\n")
+        write(json.dumps(record))
+    write("\n]\n")
+
+
+def output_format_options(f):
+    f = click.option("--ndjson", "output_format", flag_value="ndjson", help="Output newline delimited JSON (one record per line) for scripts.")(f)
+    return click.option("--json", "output_format", flag_value="json", help="Output JSON for scripts.")(f)
+
+
+def print_projects(pmap, show_n_tasks=3, show_inactive=False, offset=0, query=None, **get_task_str_kwargs):
+    def project_rows(p):
+        task_collection = p.tasks if query is None else query.filter_collection(p.tasks, p)
+        ordered_tasks = rank_tasks(task_collection, limit=show_n_tasks, include_inactive=show_inactive, offset=offset)
+        if ordered_tasks:
+            for task in ordered_tasks:
+                yield get_task_string(task, **get_task_str_kwargs)
+            n_active = sum(len(task_collection[sp]) for sp in (todo_str, ip_str, hold_str))
+            if n_active > show_n_tasks + offset:
+                yield "..."
+        else:
+            yield "No tasks."
+
+    project_nodes = ((get_project_header_str(p), project_rows(p) if show_n_tasks else ()) for p in pmap.values())
+    show_tree("All projects", project_nodes)
 
 
 def ask_for_yn(prompt, action=None):
@@ -212,7 +339,7 @@ def ask_for_yn(prompt, action=None):
 
 def print_task_work_interface(task):
     print(get_task_string(task, colorize_status=True, id_color="u", name_color="u"))
-    ask_for_yn("View this task?", action=task.view)
+    ask_for_yn("View this task?", action=lambda: print(task.view(cache=RenderCache())))
     task.set_status(ip_str)
     print(ts.f(SUCCESS_COLOR, f"You're now working on '{task.name}'"))
     print(ts.f("y", "Now get to work!"))
@@ -224,26 +351,21 @@ def print_project_task_collection(project, show_inactive=False, n_shown=10000):
     if show_inactive:
         active_statuses += [abandoned_str, done_str]
     id_str = get_project_header_str(project)
-    tree = treelib.Tree()
-    tree.create_node(id_str, "header")
-    nid = 0
-    for sp in active_statuses:
+
+    def status_rows(sp):
         color = STATUS_COLORMAP[sp]
-        sp_str = "In progress" if sp == ip_str else sp.capitalize()
-        tree.create_node(ts.f(color, sp_str), sp, parent="header")
         statused_tasks = task_collection[sp]
-        if n_shown:
-            if not statused_tasks:
-                nid += 1
-                tree.create_node("No tasks.", nid, parent=sp)
-                continue
-            for i, t in enumerate(statused_tasks):
-                nid += 1
-                task_txt = get_task_string(t, colorize_status=True)
-                tree.create_node(ts.f(color, task_txt), nid, parent=sp)
-                if i >= n_shown:
-                    break
-    tree.show(key=lambda node: node.identifier)
+        if not statused_tasks:
+            yield "No tasks."
+        for t in itertools.islice(statused_tasks, n_shown):
+            yield ts.f(color, get_task_string(t, colorize_status=True))
+
+    # Statuses are shown in alphabetical order, as they always have been in the tree layout
+    status_nodes = []
+    for sp in sorted(active_statuses):
+        sp_str = "In progress" if sp == ip_str else sp.capitalize()
+        status_nodes.append((ts.f(STATUS_COLORMAP[sp], sp_str), status_rows(sp) if n_shown else ()))
+    show_tree(id_str, status_nodes)
 
 
 # Utility functions for checking tasks and projects
@@ -256,7 +378,7 @@ def check_project_id_exists(pmap, project_id):
 
 
 def check_task_id_exists(project, tid):
-    if tid not in project.task_map.keys():
+    if project.get_task(tid) is None:
         print(ts.f(ERROR_COLOR, f"Task ID {tid} invalid. Select from the following tasks in project '{project.name}':"))
         print_project_task_collection(project,show_inactive=True)
         click.Context.exit(1)
@@ -268,17 +390,31 @@ def check_input_not_empty(input_str):
         click.Context.exit(1)
 
 
+class MultiTaskGroup(click.Group):
+    """
+    Group taking several task ids before the subcommand, e.g. 'dex task a3 a7 b12 done'. Click only takes a single
+    argument before a subcommand, so all but the last of the leading task ids are stored in ctx.meta.
+    """
+    def parse_args(self, ctx, args):
+        n_ids = 0
+        while n_ids < len(args) and is_dexid(args[n_ids]):
+            n_ids += 1
+        ctx.meta[TASK_IDS_META_KEY] = args[:n_ids]
+        if n_ids > 1:
+            args = args[n_ids - 1:]
+        return super().parse_args(ctx, args)
+
+
 # Global context level commands ########################################################################################
 # dex
 @click.group(invoke_without_command=False)
 @click.pass_context
 def cli(ctx):
-    ctx.ensure_object(dict)
-    if ctx.invoked_subcommand not in ["init", "example"]:
+    ctx.ensure_object(ExecutorContext)
+    # Kept for all commands of a dex shell, since its executor is loaded once for all of them
+    ctx.obj.setdefault("READ_ONLY", ctx.invoked_subcommand in READ_ONLY_COMMAND_LIST)
+    if ctx.invoked_subcommand not in ["init", "example", "roots"]:
         checks_root_path_loc()
-        e = Executor(path=get_current_root_path(), ignored_dirs=get_current_ignore())
-        ctx.obj["EXECUTOR"] = e
-        ctx.obj["PMAP"] = e.project_map
 
 
 # Root level commands ##################################################################################################
@@ -303,25 +439,84 @@ def init(path, ignore):
 
 # dex exec
 @cli.command(help="Automatically determine most important task and start work.")
+@click.option("--budget", "-b", type=click.INT, help="Pick the set of tasks with the highest total priority fitting in this much effort.")
+@click.option("--all-roots", "-r", is_flag=True, help="Pick the most important task across all registered roots (see 'dex roots').")
 @click.pass_context
-def exec(ctx):
+def exec(ctx, budget, all_roots):
+    if all_roots:
+        if budget is not None:
+            print(ts.f(ERROR_COLOR, "--budget cannot be used with --all-roots."))
+            click.Context.exit(1)
+        try:
+            fe = load_federated_executor()
+            ranked = fe.get_n_highest_priority_tasks(1)
+        except FederationException as fe_exc:
+            print(ts.f(ERROR_COLOR, str(fe_exc)))
+            click.Context.exit(1)
+        if ranked:
+            root, task = ranked[0]
+            print(ts.f("u", f"Most important task across roots {list(fe.executors.keys())} is {federated_dexid(root, task)}"))
+            print_task_work_interface(task)
+        else:
+            print(ts.f(ERROR_COLOR, f"No tasks found in any root. Add a new task with 'dex task'"))
+        return
+
     e = ctx.obj["EXECUTOR"]
+    if budget is not None:
+        if budget < 1:
+            print(ts.f(ERROR_COLOR, "The budget must be at least 1 effort."))
+            click.Context.exit(1)
+        tasks = e.get_tasks_within_budget(budget)
+        if not tasks:
+            print(ts.f(ERROR_COLOR, f"No active tasks fit in a budget of {budget} effort. Try a larger budget."))
+            click.Context.exit(1)
+        total_effort = sum(t.effort for t in tasks)
+        header_txt = f"Session of {len(tasks)} tasks ({total_effort}/{budget} effort)"
+        show_tree(ts.f("u", header_txt), [get_task_string(t, colorize_status=True) for t in tasks])
+        print_task_work_interface(tasks[0])
+        return
+
     tasks = e.get_n_highest_priority_tasks(1, include_inactive=False)
     if tasks:
+        blockers = e.dependencies.blockers(tasks[0])
+        if blockers:
+            print(ts.f(ERROR_COLOR, f"All active tasks are blocked. Task {tasks[0].dexid} is blocked by {[b.dexid for b in blockers]}."))
+            click.Context.exit(1)
         print_task_work_interface(tasks[0])
     else:
         print(ts.f(ERROR_COLOR, f"No tasks found for any project in executor {e.path}. Add a new task with 'dex task'"))
 
 
 
+def load_federated_executor():
+    roots = {name: (r["path"], r["ignore"]) for name, r in get_registered_roots().items()}
+    return FederatedExecutor(roots)
+
+
 @cli.command(help="Get info about your projects.")
 @click.option("--visualize", "-v", is_flag=True, help="Make a graph of current tasks.")
 @click.option("--include-inactive", "-i", is_flag=True, help="Include info on inactive (done and abandoned) tasks.")
+@output_format_options
 @click.pass_context
-def info(ctx, visualize, include_inactive):
+def info(ctx, visualize, include_inactive, output_format):
     e = ctx.obj["EXECUTOR"]
+    if output_format:
+        record = {
+            "path": e.path,
+            "n_projects": len(e.projects),
+            "pid_mismatches": e.pid_mismatches,
+            "n_active_today": len(e.get_n_highest_priority_tasks(n=0, only_today=True, include_inactive=False)),
+            "n_active": len(e.get_n_highest_priority_tasks(n=0, only_today=False, include_inactive=False))
+        }
+        if include_inactive:
+            record["n_today"] = len(e.get_n_highest_priority_tasks(n=0, only_today=True, include_inactive=True))
+            record["n_all"] = len(e.get_n_highest_priority_tasks(n=0, only_today=False, include_inactive=True))
+        write_records([record], output_format)
+        return
     print(f"The current dex working directory is '{e.path}'")
     print(f"There are currently {len(e.projects)} projects.")
+    for pid, dexids in e.pid_mismatches.items():
+        print(ts.f(ERROR_COLOR, f"Project {pid} has tasks with mismatching project ids: {dexids}. They are converted to project {pid} by the next command which can change tasks (e.g., 'dex exec')."))
 
     print(f"There are currently {len(e.get_n_highest_priority_tasks(n=10000, only_today=True, include_inactive=False))} active tasks for today's projects.")
     if include_inactive:
@@ -459,6 +654,48 @@ def example(path):
         print(f"New example created at {path}. Use 'dex init {path}' to initialize it and start work!")
 
 
+# dex roots
+@cli.group(invoke_without_command=True, help="Roots (sets of projects) used together with --all-roots.")
+@click.pass_context
+def roots(ctx):
+    if ctx.invoked_subcommand is not None:
+        return
+    registered = get_registered_roots()
+    if not registered:
+        print(ts.f(ERROR_COLOR, "No roots registered. Use 'dex roots add [name] [path]' to register one."))
+        return
+    root_nodes = ((ts.f("w", name), [r["path"]]) for name, r in registered.items())
+    show_tree(ts.f("u", "Registered roots"), root_nodes)
+
+
+# dex roots add
+@roots.command(name="add", help="Register a root by name.")
+@click.argument("name", nargs=1, type=click.STRING)
+@click.argument("path", nargs=1, type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option("--ignore", "-i", multiple=True, help="Directories to ignore in the root (e.g., ./assets)")
+def roots_add(name, path, ignore):
+    if root_id_separator in name:
+        print(ts.f(ERROR_COLOR, f"Root names cannot contain '{root_id_separator}'."))
+        click.Context.exit(1)
+    registered = get_registered_roots()
+    registered[name] = {"path": os.path.abspath(path), "ignore": list(ignore)}
+    write_registered_roots(registered)
+    print(ts.f(SUCCESS_COLOR, f"Root '{name}' registered at {registered[name]['path']}."))
+
+
+# dex roots rm
+@roots.command(name="rm", help="Unregister a root (its files are not touched).")
+@click.argument("name", nargs=1, type=click.STRING)
+def roots_rm(name):
+    registered = get_registered_roots()
+    if name not in registered:
+        print(ts.f(ERROR_COLOR, f"No root named '{name}'. Roots are {list(registered.keys())}."))
+        click.Context.exit(1)
+    del registered[name]
+    write_registered_roots(registered)
+    print(ts.f(SUCCESS_COLOR, f"Root '{name}' unregistered."))
+
+
 # Schedule level commands ##############################################################################################
 # dion schedule
 @cli.group(invoke_without_command=True, help="Weekly executor (schedule) related commands.")
@@ -499,13 +736,125 @@ def executor_edit(ctx):
     print(f"Weekly schedule at {s.executor_file} written.")
 
 
+# Journal level commands ###############################################################################################
+# dex journal
+@cli.group(invoke_without_command=True, help="Journal task changes, so changing a task only appends to one file (and changes can be undone).")
+@click.pass_context
+def journal(ctx):
+    if ctx.invoked_subcommand is not None:
+        return
+    e = ctx.obj["EXECUTOR"]
+    if e.journal is None:
+        print("Task changes are written to the task files right away. Use 'dex journal enable' to journal them.")
+        return
+    n_pending = len(e.journal.pending)
+    print(f"Task changes are journaled in {e.journal.path}.")
+    print(f"{n_pending} changes pending (not yet in the task files), {len(e.journal.records)} changes in history.")
+
+
+# dex journal enable
+@journal.command(name="enable", help="Journal task changes instead of rewriting task files right away.")
+@click.pass_context
+def journal_enable(ctx):
+    e = ctx.obj["EXECUTOR"]
+    e.enable_journal()
+    print(ts.f(SUCCESS_COLOR, f"Task changes are now journaled in {e.journal.path}."))
+
+
+# dex journal disable
+@journal.command(name="disable", help="Write pending changes to the task files and stop journaling (the history for undo is removed).")
+@click.pass_context
+def journal_disable(ctx):
+    e = ctx.obj["EXECUTOR"]
+    e.disable_journal()
+    print(ts.f(SUCCESS_COLOR, "Task changes are now written to the task files right away."))
+
+
+# dex journal compact
+@journal.command(name="compact", help="Write pending changes to the task files.")
+@click.pass_context
+def journal_compact(ctx):
+    e = ctx.obj["EXECUTOR"]
+    try:
+        n_written = e.compact()
+    except JournalException as je:
+        print(ts.f(ERROR_COLOR, str(je)))
+        click.Context.exit(1)
+    print(ts.f(SUCCESS_COLOR, f"{n_written} task files written."))
+
+
+# dex undo
+@cli.command(help="Revert the most recent task change (needs the journal, see 'dex journal'). Repeat to go further back.")
+@click.option("--n-changes", "-n", default=1, type=click.INT, help="Number of changes to revert (default 1).")
+@click.pass_context
+def undo(ctx, n_changes):
+    e = ctx.obj["EXECUTOR"]
+    for _ in range(n_changes):
+        try:
+            t, record = e.undo()
+        except JournalException as je:
+            print(ts.f(ERROR_COLOR, str(je)))
+            click.Context.exit(1)
+        print(ts.f(SUCCESS_COLOR, f"Undid change of {record['attr']} of task {t.dexid} ({t.name}): "
+                                  f"{record['new']} -> {record['old']}"))
+
+
+# dex archive
+@cli.command(help="Pack done and abandoned tasks unchanged for some days into one archive file per project. Archived tasks are still listed, and are unarchived when changed.")
+@click.option("--days", "-d", default=archive_default_days, type=click.INT, help=f"Only archive tasks unchanged for this many days (default {archive_default_days}).")
+@click.pass_context
+def archive(ctx, days):
+    e = ctx.obj["EXECUTOR"]
+    archived = e.archive(days)
+    pmap = ctx.obj["PMAP"]
+    for pid, tasks in archived.items():
+        if tasks:
+            print(f"Project {pid} ({pmap[pid].name}): archived {len(tasks)} tasks, {len(pmap[pid].archive)} tasks in archive.")
+    print(ts.f(SUCCESS_COLOR, f"{sum(len(tasks) for tasks in archived.values())} tasks archived."))
+
+
+# dex stats
+@cli.command(help="Show statistics of completed tasks: completions per week and project, cycle times (from starting a task to completing it) and overdue rates.")
+@click.option("--days", "-n", type=click.INT, help="Only completions in this many days, up to today (default all).")
+@click.option("--project", "-p", "project_ids", multiple=True, type=click.Choice(valid_project_ids), help="Only completions in this project. Repeat for several projects.")
+@click.pass_context
+def stats(ctx, days, project_ids):
+    e = ctx.obj["EXECUTOR"]
+    if days is not None and days < 1:
+        print(ts.f(ERROR_COLOR, "Statistics must cover at least 1 day."))
+        click.Context.exit(1)
+    s = e.stats(days=days, project_ids=project_ids or None)
+    period = f"the last {days} days" if days else "all time"
+    print(ts.f("u", f"{s['completions']} tasks completed ({s['effort']} effort) in {period}"))
+    if not s["completions"]:
+        return
+
+    pmap = ctx.obj["PMAP"]
+    print(ts.f("w", "Per week:"))
+    for week, n in s["per_week"].items():
+        print(f"    {week.strftime(due_date_fmt)}: {n}")
+    print(ts.f("w", "Per project:"))
+    for pid, n in s["per_project"].items():
+        name = pmap[pid].name if pid in pmap else "(no such project)"
+        print(f"    {pid} ({name}): {n}, {s['overdue_rate_per_project'][pid]:.0%} overdue")
+
+    ct = s["cycle_time"]
+    if ct["n"]:
+        pcts = ", ".join(f"p{p:g} {v:.1f}" for p, v in ct["percentiles"].items())
+        print(f"Cycle time (days, {ct['n']} tasks started with 'ip'): mean {ct['mean']:.1f}, {pcts}")
+    print(f"Completed after their due date: {s['overdue_rate']:.0%}")
+
+
 # Project level commands ###############################################################################################
 # dex projects
 @cli.command(help="List all projects.")
+@output_format_options
 @click.pass_context
-def projects(ctx):
+def projects(ctx, output_format):
     s = ctx.obj["EXECUTOR"]
-    if s.projects:
+    if output_format:
+        write_records((get_project_record(p) for p in s.projects), output_format)
+    elif s.projects:
         print_projects(s.project_map, show_n_tasks=0)
     else:
         print(ts.f(ERROR_COLOR, "No projects. Use 'dion project new' to create a new project."))
@@ -571,7 +920,11 @@ def project_rename(ctx):
     old_name = copy.deepcopy(p.name)
     new_name = input("New project name: ")
     check_input_not_empty(new_name)
-    p.rename(new_name)
+    try:
+        p.rename(new_name)
+    except DexException as de:
+        print(ts.f(ERROR_COLOR, de.msg))
+        click.Context.exit(1)
     print(f"Project '{old_name}' renamed to '{new_name}.")
 
 
@@ -597,126 +950,148 @@ def project_rm(ctx):
 
 ### Task collection options
 @click.option("--n-shown", "-n", help="Number of tasks shown (default is all tasks).", type=click.INT)
+@click.option("--page", help="Show this page of results, with n-shown tasks per page (first page is 1).", type=click.INT)
+@click.option("--offset", help="Skip this many of the highest ranked tasks before showing tasks.", type=click.INT, default=0)
 @click.option("--all-projects", "-a", is_flag=True, help="Show tasks across all the executor's projects, not just today's.")
 @click.option("--include-inactive", "-v", is_flag=True, help="Show done and abandoned tasks.")
 @click.option("--hide-task-details", "-h", is_flag=True, help="show task details")
 @click.option("--hide-held", is_flag=True, help="Hide held tasks.")
+@click.option("--where", "-w", help="Only show tasks matching a filter expression, e.g. 'importance>=4 and due<=7 and recurring and project=b'.")
 ### Ordering options
 @click.option("--by-project", '-p', is_flag=True, help="Organize tasks by project. n_shown is shown for each project.")
 @click.option("--by-importance", '-i', is_flag=True, help="Organize tasks by importance.")
 @click.option("--by-effort", '-e', is_flag=True, help="Organize tasks by effort.")
 @click.option("--by-due", '-d', is_flag=True, help="Organize tasks by due date.")
 @click.option("--by-status", "-s", is_flag=True, help="Organize tasks by status.")
+@output_format_options
 @click.pass_context
-def tasks(ctx, n_shown, all_projects, include_inactive, hide_task_details, hide_held,  by_project, by_importance, by_effort, by_due, by_status):
+def tasks(ctx, n_shown, page, offset, all_projects, include_inactive, hide_task_details, hide_held, where, by_project, by_importance, by_effort, by_due, by_status, output_format):
     orderings = [by_due, by_status, by_project, by_importance, by_effort]
     if sum(orderings) > 1:
         print(ts.f("r", "Please only specify one ordering/organization option (--by-(project/importance/effort/due/status))"))
         click.Context.exit(1)
+    if page is not None:
+        if n_shown is None or page < 1:
+            print(ts.f(ERROR_COLOR, "Pages start at 1 and require the page size to be set with --n-shown/-n."))
+            click.Context.exit(1)
+        offset += (page - 1) * n_shown
+    if offset < 0:
+        print(ts.f(ERROR_COLOR, "The offset must be a non-negative number of tasks."))
+        click.Context.exit(1)
+    query = None
+    if where:
+        try:
+            query = compile_query(where)
+        except QueryException as qe:
+            print(ts.f(ERROR_COLOR, str(qe)))
+            click.Context.exit(1)
+
     show_task_details = not hide_task_details
     if n_shown is None:
-        n_shown = 10000
-        n_shown_str = "All"
+        # Scripts get every task (0 means no limit), however many there are
+        n_shown = 0 if output_format else 10000
+        n_shown_str = "All" if not offset else f"All after the top {offset}"
     else:
         n_shown = int(n_shown)
-        n_shown_str = f"Top {n_shown}"
+        n_shown_str = f"Top {n_shown}" if not offset else f"Top {offset + 1}-{offset + n_shown}"
     e = ctx.obj["EXECUTOR"]
 
     only_today = not all_projects
     only_today_str = f"today's projects only" if only_today else "all projects"
 
     pmap = e.project_map_today if only_today else e.project_map
-    tasks_ordered = e.get_n_highest_priority_tasks(n_shown, only_today=only_today, include_inactive=include_inactive)
-
-    if hide_held:
-        tasks_ordered = [t for t in tasks_ordered if t.status != hold_str]
+    selection = dict(only_today=only_today, include_inactive=include_inactive, include_held=not hide_held,
+                     where=query, offset=offset)
+    if by_due:
+        tasks_ordered = e.get_tasks_by_due(n_shown, **selection)
+    elif by_importance or by_effort:
+        tasks_ordered = e.get_tasks_by_attribute("importance" if by_importance else "effort", n_shown, **selection)
+    elif by_project:
+        tasks_ordered = None
+    else:
+        tasks_ordered = e.get_n_highest_priority_tasks(n_shown, **selection)
+
+    if output_format:
+        # The same tasks in the same order as the tree output, without the tree
+        if by_project:
+            records = (get_task_record(t, p.id) for p in pmap.values() for t in rank_tasks(
+                p.tasks if query is None else query.filter_collection(p.tasks, p), limit=n_shown,
+                include_inactive=include_inactive, offset=offset))
+        else:
+            if by_status:
+                tasks_ordered = sorted(tasks_ordered, key=lambda t: t.status)
+            records = (get_task_record(t, e.index.project_id(t)) for t in tasks_ordered)
+        write_records(records, output_format)
+        return
 
-    tree = treelib.Tree()
     header_txt = f"{n_shown_str} tasks for {only_today_str}"
+    if where:
+        header_txt += f" matching '{where}'"
     if not any(orderings):
         header_txt += " (ordered by computed priority)"
-        tree.create_node(ts.f("u", header_txt), "header")
-        if tasks_ordered:
-            for j, t in enumerate(tasks_ordered):
+
+        def priority_rows():
+            for j, t in enumerate(tasks_ordered, start=offset):
                 if j < 3:
                     color = "r"
                 elif 15 > j >= 3:
                     color = "y"
                 else:
                     color = "g"
+                yield get_task_string(t, colorize_status=True, id_color=color, name_color=color, attr_color="x", show_details=show_task_details)
 
-                task_txt = get_task_string(t, colorize_status=True, id_color=color, name_color=color, attr_color="x", show_details=show_task_details)
-                # task_txt = ts.f(color, task_txt)
-                tree.create_node(task_txt, j, parent="header")
-            if len(tasks_ordered) > n_shown:
-                tree.create_node("...", j + 1, parent="header")
-        else:
-            tree.create_node("No tasks", parent="header")
-        tree.show(key=lambda node: node.identifier)
+        show_tree(ts.f("u", header_txt), priority_rows() if tasks_ordered else ["No tasks"])
     elif by_project:
-        print_projects(pmap, show_n_tasks=n_shown, show_inactive=include_inactive, colorize_status=True, show_details = show_task_details)
+        print_projects(pmap, show_n_tasks=n_shown, show_inactive=include_inactive, offset=offset, query=query, colorize_status=True, show_details = show_task_details)
     elif by_due:
+        show_tree("Due date color legend", [
+            ts.f("r", "Overdue or due today"),
+            ts.f("y", "Due within one week"),
+            ts.f("g", "Due within one month"),
+            ts.f("b", "Due in 1+ months")
+        ])
 
-        legend_tree = treelib.Tree()
-        legend_tree.create_node("Due date color legend", "header")
-        legend_tree.create_node(ts.f("r", "Overdue or due today"), 1, parent="header")
-        legend_tree.create_node(ts.f("y", "Due within one week"), 2, parent="header")
-        legend_tree.create_node(ts.f("g", "Due within one month"), 3, parent="header")
-        legend_tree.create_node(ts.f("b", "Due in 1+ months"), 4, parent="header")
-        legend_tree.show(key=lambda node: node.identifier)
-
-        ordered_by_due = sorted(tasks_ordered, key=lambda t: t.days_till_due)
         header_txt += " (ordered by due date)"
-        tree.create_node(ts.f("u", header_txt), "header")
-
-        for i, t in enumerate(ordered_by_due):
-            dtd = t.days_till_due
-            due_date_str = t.due.strftime(due_date_fmt)
-            if dtd < 0:
-                color = "r"
-            elif dtd == 0:
-                color = "r"
-            elif dtd < 7:
-                color = "y"
-            elif dtd < 30:
-                color = "g"
-            else:
-                color = "b"
-            task_txt = get_task_string(t, colorize_status=False, name_color=color, show_details=show_task_details)
-            tree.create_node(task_txt, i, parent="header")
-        tree.show(key=lambda node: node.identifier)
+        today_ordinal = datetime.date.today().toordinal()
+
+        def due_rows():
+            for t in tasks_ordered:
+                dtd = t.due.toordinal() - today_ordinal
+                if dtd < 0:
+                    color = "r"
+                elif dtd == 0:
+                    color = "r"
+                elif dtd < 7:
+                    color = "y"
+                elif dtd < 30:
+                    color = "g"
+                else:
+                    color = "b"
+                yield get_task_string(t, colorize_status=False, name_color=color, show_details=show_task_details)
+
+        show_tree(ts.f("u", header_txt), due_rows())
 
     elif by_status:
-        tree.create_node(ts.f("u", header_txt + " (ordered by status)"), "header")
         ordered_by_status = {sp: [] for sp in status_primitives}
 
         # this will already be ordered by computed priortiy
         for task in tasks_ordered:
             ordered_by_status[task.status].append(task)
 
-        node_id = 0
-        for sp in [todo_str, ip_str, hold_str, done_str, abandoned_str]:
-            task_list = ordered_by_status[sp]
-            subheader_id = f"subheader_{sp}"
+        def status_rows(task_list):
+            for task in task_list:
+                yield get_task_string(task, colorize_status=False, show_details=show_task_details)
 
+        # Statuses are shown in alphabetical order, as they always have been in the tree layout
+        status_nodes = []
+        for sp in sorted(status_primitives):
             sp_str = "In progress" if sp == ip_str else sp.capitalize()
-            tree.create_node(ts.f(STATUS_COLORMAP[sp], sp_str), subheader_id, parent="header")
-            for i, task in enumerate(task_list):
-                node_id += 1
-                task_txt = get_task_string(task, colorize_status=False, show_details=show_task_details)
-                tree.create_node(task_txt, node_id, parent=subheader_id)
-        tree.show(key=lambda node: node.identifier)
+            status_nodes.append((ts.f(STATUS_COLORMAP[sp], sp_str), status_rows(ordered_by_status[sp])))
+        show_tree(ts.f("u", header_txt + " (ordered by status)"), status_nodes)
 
     elif by_importance or by_effort:
         # Ordering is the same for both importance and effort
         key = "importance" if by_importance else "effort"
-        primitives = importance_primitives if by_importance else effort_primitives
-
-        tree.create_node(ts.f("u", header_txt + f" (ordered by {key})"), "header")
-        ordered_by_attr = {p: [] for p in primitives}
-
-        for task in tasks_ordered:
-            ordered_by_attr[getattr(task, key)].append(task)
 
         primitives_colormap = {
             1: "k",
@@ -726,19 +1101,343 @@ def tasks(ctx, n_shown, all_projects, include_inactive, hide_task_details, hide_
             5: "r"
         }
 
-        node_id = 0
-        for p in reversed(primitives):
-            color = primitives_colormap[p]
-            for task in ordered_by_attr[p]:
-                node_id += 1
-                task_txt = get_task_string(task, colorize_status=True, id_color=color, name_color=color)
-                tree.create_node(task_txt, node_id, parent="header")
-        tree.show(key=lambda node: node.identifier)
+        # already ordered by the attribute, then by computed priority
+        def attr_rows():
+            for task in tasks_ordered:
+                color = primitives_colormap[getattr(task, key)]
+                yield get_task_string(task, colorize_status=True, id_color=color, name_color=color)
+
+        show_tree(ts.f("u", header_txt + f" (ordered by {key})"), attr_rows())
+
+
+# dex agenda
+@cli.command(help="Show what is due each day over the next days, including future occurrences of recurring tasks.")
+@click.option("--days", "-n", default=14, type=click.INT, help="Number of days to show, starting today (default 14).")
+@click.option("--today-only", "-t", is_flag=True, help="Only show tasks from today's projects.")
+@click.option("--hide-held", is_flag=True, help="Hide held tasks.")
+@click.option("--where", "-w", help="Only show tasks matching a filter expression (see 'dex tasks --where').")
+@click.pass_context
+def agenda(ctx, days, today_only, hide_held, where):
+    e = ctx.obj["EXECUTOR"]
+    if days < 1:
+        print(ts.f(ERROR_COLOR, "The agenda must be at least 1 day long."))
+        click.Context.exit(1)
+    try:
+        overdue, by_day = e.get_agenda(days, only_today=today_only, include_held=not hide_held, where=where)
+    except QueryException as qe:
+        print(ts.f(ERROR_COLOR, str(qe)))
+        click.Context.exit(1)
+
+    today = datetime.date.today()
+    day_nodes = []
+    if overdue:
+        day_nodes.append((ts.f("r", "Overdue"), [get_occurrence_string(o, today) for o in overdue]))
+
+    def days_with_tasks():
+        for date, occurrences in by_day:
+            day_str = f"{date.strftime('%A')} {date.strftime(due_date_fmt)}"
+            day_str = ts.f("g", day_str + " (today)") if date == today else ts.f("w", day_str)
+            yield day_str, (get_occurrence_string(o, today) for o in occurrences)
+
+    header_txt = f"Agenda for the next {days} days"
+    show_tree(ts.f("u", header_txt), itertools.chain(day_nodes, days_with_tasks()))
+
+
+def get_occurrence_string(occurrence, today):
+    t = occurrence.task
+    task_str = get_task_string(t, colorize_status=True, show_details=False)
+    attr_str = f"{t.importance} importance, {t.effort} effort"
+    if occurrence.n:
+        recurrence_str = f"recurrence {occurrence.n}, every {t.recurrence[1]} days"
+        return task_str + ts.f("c", f"[{recurrence_str}]") + f" [{attr_str}]"
+    elif occurrence.date < today:
+        return task_str + ts.f("r", f"[overdue by {(today - occurrence.date).days} days]") + f" [{attr_str}]"
+    return task_str + f"[{attr_str}]"
+
+
+# dex plan
+@cli.command(help="Plan active tasks over the days their projects are scheduled, without exceeding a daily effort capacity.")
+@click.option("--capacity", "-c", required=True, type=click.INT, help="Total effort which can be done each day.")
+@click.option("--week", is_flag=True, help="Plan the next 7 days (the default).")
+@click.option("--days", "-n", type=click.INT, help="Number of days to plan, starting today.")
+@click.option("--where", "-w", help="Only plan tasks matching a filter expression (see 'dex tasks --where').")
+@click.pass_context
+def plan(ctx, capacity, week, days, where):
+    e = ctx.obj["EXECUTOR"]
+    if week and days not in (None, 7):
+        print(ts.f(ERROR_COLOR, "Use either --week or --days, not both."))
+        click.Context.exit(1)
+    days = 7 if days is None else days
+    if days < 1 or capacity < 1:
+        print(ts.f(ERROR_COLOR, "Both the number of days and the capacity must be at least 1."))
+        click.Context.exit(1)
+    try:
+        planner = e.plan(capacity, days=days, where=where)
+    except QueryException as qe:
+        print(ts.f(ERROR_COLOR, str(qe)))
+        click.Context.exit(1)
+
+    today = datetime.date.today()
+
+    def day_nodes():
+        for date, planned in planner.days:
+            day_str = f"{date.strftime('%A')} {date.strftime(due_date_fmt)}"
+            day_str = ts.f("g", day_str + " (today)") if date == today else ts.f("w", day_str)
+            load_str = f" [{planner.load(date)}/{capacity} effort]"
+            yield day_str + load_str, [get_planned_task_string(t, date) for t in planned]
+        unplanned = planner.unplanned
+        if unplanned:
+            rows = [get_planned_task_string(t, None) for t in unplanned]
+            yield ts.f("r", f"Unplanned ({len(unplanned)} tasks did not fit)"), rows
+
+    header_txt = f"Plan for the next {days} days ({capacity} effort per day)"
+    show_tree(ts.f("u", header_txt), day_nodes())
+
+
+def get_planned_task_string(t, date):
+    task_str = get_task_string(t, colorize_status=True, show_details=False)
+    date_str = t.due.strftime(due_date_fmt)
+    attr_str = f"[due {date_str}, {t.importance} importance, {t.effort} effort]"
+    if date is not None and date > t.due.date():
+        return task_str + ts.f("r", f"[late by {(date - t.due.date()).days} days]") + f" {attr_str}"
+    return task_str + attr_str
+
+
+# dex search
+@cli.command(help="Search the content of all tasks and notes. All terms must match; end a term with * to match it as a prefix (e.g., 'deploy*').")
+@click.argument("query", nargs=-1, required=True, type=click.STRING)
+@click.option("--n-shown", "-n", default=10, type=click.INT, help="Number of results shown (default 10, 0 for all).")
+@click.option("--status", "-s", "statuses", multiple=True, help=f"Only show tasks with this status {status_primitives}. Can be repeated.")
+@click.option("--project", "-p", "project_ids", multiple=True, help="Only show tasks and notes of this project id. Can be repeated.")
+@click.pass_context
+def search(ctx, query, n_shown, statuses, project_ids):
+    e = ctx.obj["EXECUTOR"]
+    pmap = ctx.obj["PMAP"]
+    for sp in statuses:
+        if sp not in status_primitives:
+            print(ts.f(ERROR_COLOR, f"{sp} not a valid status {status_primitives}"))
+            click.Context.exit(1)
+    for pid in project_ids:
+        check_project_id_exists(pmap, pid)
+
+    query = " ".join(query)
+    results = e.search(query, n=n_shown, statuses=statuses or None, project_ids=project_ids or None)
+    project_names = {p.path: p.name for p in pmap.values()}
+    rows = []
+    for r in results:
+        score_str = ts.f("c", f"[score {r.score:.2f}]")
+        task = e.get_task(r.dexid) if r.kind == "task" and r.dexid else None
+        if task is not None:
+            rows.append(get_task_string(task, colorize_status=True, show_details=False) + score_str)
+        else:
+            rows.append(f"{r.kind} - {r.name} ({project_names.get(r.project, r.project)}) " + score_str)
+    show_tree(ts.f("u", f"{len(results)} results for '{query}'"), rows)
+
+
+# dex serve
+@cli.command(help="Serve tasks over HTTP/JSON (localhost only by default), for scripts and dashboards (see dex.client).")
+@click.option("--host", default=server_default_host, help=f"Host to bind (default {server_default_host}).")
+@click.option("--port", "-p", default=server_default_port, type=click.INT, help=f"Port to bind (default {server_default_port}).")
+@click.option("--workers", "-w", default=server_default_workers, type=click.INT, help=f"Threads handling requests (default {server_default_workers}).")
+@click.option("--verbose", "-v", is_flag=True, help="Log every request.")
+@click.pass_context
+def serve(ctx, host, port, workers, verbose):
+    e = ctx.obj["EXECUTOR"]
+    server = DexServer(e, host=host, port=port, workers=workers, verbose=verbose)
+    bound_host, bound_port = server.server_address[:2]
+    print(ts.f(SUCCESS_COLOR, f"Serving {e.path} at http://{bound_host}:{bound_port} (Ctrl+C to stop)"))
+    if e.journal is not None:
+        e.journal.start_compacting(lambda: e.loaded_tasks)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if e.journal is not None:
+            e.journal.stop_compacting()
+            e.compact()
+
+
+# dex batch
+@cli.command(help="Run task commands from stdin against one loaded executor, one per line (e.g., 'a3 a7 done', 'b2 imp 4', 'c1 set -s hold -e 2') or as JSON lines (e.g., {\"ids\": [\"a3\"], \"action\": \"done\"}).")
+@click.option("--file", "-f", "commands_file", type=click.File("r"), default="-", help="Read commands from this file instead of stdin.")
+@click.pass_context
+def batch(ctx, commands_file):
+    e = ctx.obj["EXECUTOR"]
+    results = run_batch(e, commands_file)
+    n_failed = 0
+    for r in results:
+        dexid_str = f" {r.dexid}" if r.dexid else ""
+        if r.ok:
+            print(ts.f(SUCCESS_COLOR, f"ok    [{r.item}]{dexid_str}") + f" {r.message}")
+        else:
+            n_failed += 1
+            print(ts.f(ERROR_COLOR, f"error [{r.item}]{dexid_str} {r.message}"))
+    print(f"{len(results) - n_failed} succeeded, {n_failed} failed ({write_counts['written']} task files written, {write_counts['skipped']} already up to date).")
+    if n_failed:
+        click.Context.exit(1)
+
+
+# dex import
+@cli.command(name="import", help="Create many tasks in a project at once from a CSV file (with a header row of name, effort, importance, due, and optionally status, recurring, flags, content) or a JSON lines file with the same keys.")
+@click.argument("import_file", nargs=1, type=click.File("r"))
+@click.option("--project", "-p", "project_id", required=True, type=click.STRING, help="The id of the project the tasks are created in.")
+@click.option("--format", "file_format", type=click.Choice(import_formats), default=None, help="The format of the file. Inferred from its extension if not given.")
+@click.pass_context
+def import_tasks(ctx, import_file, project_id, file_format):
+    pmap = ctx.obj["PMAP"]
+    if project_id not in pmap:
+        print(ts.f(ERROR_COLOR, f"No project with id '{project_id}'."))
+        click.Context.exit(1)
+    if file_format is None:
+        file_format = os.path.splitext(import_file.name)[1].lstrip(".").lower()
+        file_format = "jsonl" if file_format in ("json", "ndjson") else file_format
+        if file_format not in import_formats:
+            print(ts.f(ERROR_COLOR, f"Cannot infer the format of '{import_file.name}'. Use --format {'/'.join(import_formats)}."))
+            click.Context.exit(1)
+
+    results = run_import(pmap[project_id], read_import_rows(import_file, file_format))
+    n_failed = 0
+    for r in results:
+        if r.ok:
+            print(ts.f(SUCCESS_COLOR, f"ok    [{r.item}] {r.dexid}") + f" {r.message}")
+        else:
+            n_failed += 1
+            print(ts.f(ERROR_COLOR, f"error [{r.item}] {r.message}"))
+    print(f"{len(results) - n_failed} tasks created, {n_failed} rows failed.")
+    if n_failed:
+        click.Context.exit(1)
+
+
+# dex shell
+@cli.command(help="Interactive prompt for running dex commands against one executor kept in memory, with tab completion of task ids.")
+@click.pass_context
+def shell(ctx):
+    e = ctx.obj["EXECUTOR"]
+    enable_shell_completion(ctx.obj)
+    print(ts.f(SUCCESS_COLOR, f"dex shell for {e.path}"))
+    print("Enter dex commands without 'dex' (e.g., 'tasks -n 5', 'task a3 done'), 'help', or 'exit'.")
+    if e.journal is not None:
+        e.journal.start_compacting(lambda: e.loaded_tasks)
+    while True:
+        try:
+            line = input("dex> ")
+        except EOFError:
+            print()
+            break
+        except KeyboardInterrupt:
+            print()
+            continue
+
+        try:
+            args = shlex.split(line)
+        except ValueError as ve:
+            print(ts.f(ERROR_COLOR, f"Could not parse command: {ve}"))
+            continue
+        if not args:
+            continue
+        elif args[0] in ("exit", "quit"):
+            break
+        elif args[0] == "help":
+            args = ["--help"]
+        elif args[0] == "shell":
+            print(ts.f(ERROR_COLOR, "Already in the dex shell."))
+            continue
+        run_shell_command(ctx.obj, args)
+
+    e = ctx.obj.get("EXECUTOR")
+    if e is not None and e.journal is not None:
+        e.journal.stop_compacting()
+        e.compact()
+
+
+def run_shell_command(obj, args):
+    # Background compaction of the journal must not run during a command
+    e = obj.get("EXECUTOR")
+    if e is not None and e.journal is not None:
+        with e.journal.lock:
+            _run_shell_command(obj, args)
+    else:
+        _run_shell_command(obj, args)
+
+
+def _run_shell_command(obj, args):
+    for key in ("TASK", "TASKS"):
+        obj.pop(key, None)
+
+    try:
+        # Pick up changes made to the files since the last command (e.g., by an editor or another dex process)
+        if "EXECUTOR" in obj:
+            e = obj["EXECUTOR"]
+            e.refresh()
+            obj["PMAP"] = e.project_map
+        cli.main(args=args, prog_name="dex", obj=obj, standalone_mode=False)
+    except click.ClickException as ce:
+        ce.show()
+    except click.Abort:
+        print(ts.f(ERROR_COLOR, "Aborted!"))
+    except (click.exceptions.Exit, SystemExit):
+        pass
+    except DexException as de:
+        # Not an Exception (see dex.exceptions), so caught separately
+        print(ts.f(ERROR_COLOR, de.msg))
+    except Exception as ex:
+        # Keep the shell (and its loaded executor) alive if a single command fails
+        print(ts.f(ERROR_COLOR, f"Command failed with {type(ex).__name__}: {ex}"))
+
+    # e.g., after 'init' switched to another root, load the new root on the next command
+    if "EXECUTOR" in obj and os.path.exists(CURRENT_ROOT_PATH_LOC) and \
+            os.path.abspath(get_current_root_path()) != obj["EXECUTOR"].path:
+        obj.pop("EXECUTOR")
+        obj.pop("PMAP", None)
+
+
+def enable_shell_completion(obj):
+    try:
+        import readline
+    except ImportError:
+        return False
+
+    def complete(text, state):
+        if state == 0:
+            preceding = readline.get_line_buffer()[:readline.get_begidx()]
+            complete.matches = get_shell_completions(preceding, text, obj)
+        return complete.matches[state] if state < len(complete.matches) else None
+
+    readline.set_completer(complete)
+    readline.set_completer_delims(" \t\n")
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    return True
+
+
+def get_shell_completions(preceding, text, obj):
+    words = preceding.split()
+    if not words:
+        candidates = list(cli.commands.keys()) + ["help", "exit"]
+    else:
+        command = cli.commands.get(words[0])
+        candidates = []
+        if command is not None:
+            for param in command.params:
+                if isinstance(param, click.Option):
+                    candidates += param.opts
+            if isinstance(command, click.Group):
+                candidates += list(command.commands.keys())
+        if "EXECUTOR" in obj:
+            if words[0] in ("task", "batch"):
+                candidates += [t.dexid for p in obj["EXECUTOR"].projects for t in p.tasks.all]
+            elif words[0] == "project":
+                candidates += list(obj["EXECUTOR"].project_map.keys())
+    return sorted(c for c in set(candidates) if c.startswith(text))
 
 
 # dex task
 # dex task new
-@cli.group(invoke_without_command=True, help="Commands for a single task (do 'dex task new' w/ no args for new task).")
+@cli.group(cls=MultiTaskGroup, invoke_without_command=True, help="Commands for a single task, or several tasks (e.g., 'dex task a3 a7 done'). Do 'dex task new' w/ no args for new task.")
 @click.argument("task_id", nargs=1, type=click.STRING, required=False)
 @click.pass_context
 def task(ctx, task_id):
@@ -869,6 +1568,18 @@ def task(ctx, task_id):
         elif ctx.invoked_subcommand is None and task_id is None:
             click.echo(ctx.get_help())
             click.Context.exit(0)
+        elif len(ctx.meta.get(TASK_IDS_META_KEY, [])) > 1:
+            task_ids = ctx.meta[TASK_IDS_META_KEY]
+            if ctx.invoked_subcommand not in MULTI_TASK_SUBCOMMAND_LIST:
+                print(ts.f(ERROR_COLOR, f"Several task ids can only be used with the commands {MULTI_TASK_SUBCOMMAND_LIST}."))
+                click.Context.exit(1)
+            e = ctx.obj["EXECUTOR"]
+            missing = [tid for tid in task_ids if e.get_task(tid) is None]
+            if missing:
+                print(ts.f(ERROR_COLOR, f"Tasks {missing} do not exist. No tasks were changed."))
+                click.Context.exit(1)
+            ctx.obj["TASKS"] = [e.get_task(tid) for tid in task_ids]
+            ctx.obj["TASK"] = ctx.obj["TASKS"][0]
         else:
             try:
                 int(task_id[1:])
@@ -879,13 +1590,14 @@ def task(ctx, task_id):
             check_project_id_exists(pmap, project_id)
             p = pmap[project_id]
             check_task_id_exists(p, task_id)
-            t= p.task_map[task_id]
+            t = p.get_task(task_id)
             ctx.obj["TASK"] = t
+            ctx.obj["TASKS"] = [t]
 
             # dex task [dexid] (view it)
             if task_id is not None and ctx.invoked_subcommand is None:
                 print(get_task_string(t, colorize_status=True), "\n")
-                print(t.view())
+                print(t.view(cache=RenderCache()))
 
 # dex task [dexid] edit
 @task.command(name="edit", help="Edit a task's content.")
@@ -896,6 +1608,66 @@ def task_edit(ctx):
     print(f"Task {t.dexid}: '{t.name}' edited.")
 
 
+# dex task [dexid] links
+@task.command(name="links", help="Show the tasks and notes a task links to ([[name]]) and is linked from.")
+@click.pass_context
+def task_links(ctx):
+    t = ctx.obj["TASK"]
+    e = ctx.obj["EXECUTOR"]
+    graph = e.get_link_graph()
+    tasks_by_path = {task.path: task for p in e.projects for task in p.tasks.all}
+    project_names = {p.path: p.name for p in e.projects}
+
+    def doc_string(path):
+        linked = tasks_by_path.get(path)
+        if linked is not None:
+            return get_task_string(linked, colorize_status=True, show_details=False)
+        project_name = project_names.get(os.path.dirname(os.path.dirname(path)), "")
+        return f"note - {os.path.splitext(os.path.basename(path))[0]} ({project_name})"
+
+    outlinks = [doc_string(path) for path in graph.outlinks(t.path)]
+    outlinks += [ts.f(ERROR_COLOR, f"[[{target}]] (no such task or note)") for target in graph.unresolved(t.path)]
+    backlinks = [doc_string(path) for path in graph.backlinks(t.path)]
+    header_txt = get_task_string(t, colorize_status=True, show_details=False)
+    show_tree(header_txt, [(ts.f("w", f"Links to ({len(outlinks)})"), outlinks),
+                           (ts.f("w", f"Linked from ({len(backlinks)})"), backlinks)])
+
+
+# dex task [dexid] depends
+@task.command(name="depends", help="Make a task depend on (be blocked by) other tasks until they are done, e.g. 'dex task a3 depends b1 b2'. With no task ids, show the task's dependencies.")
+@click.argument("dependency_ids", nargs=-1, type=click.STRING)
+@click.option("--remove", "-r", is_flag=True, help="Remove these dependencies instead of adding them.")
+@click.pass_context
+def task_depends(ctx, dependency_ids, remove):
+    t = ctx.obj["TASK"]
+    e = ctx.obj["EXECUTOR"]
+    for dependency_id in dependency_ids:
+        try:
+            if remove:
+                t.rm_dependency(dependency_id)
+                print(ts.f(SUCCESS_COLOR, f"Task {t.dexid}: '{t.name}' no longer depends on {dependency_id}."))
+            else:
+                e.add_dependency(t.dexid, dependency_id)
+                print(ts.f(SUCCESS_COLOR, f"Task {t.dexid}: '{t.name}' now depends on {dependency_id}."))
+        except ValueError:
+            print(ts.f(ERROR_COLOR, f"Task {t.dexid} does not depend on {dependency_id}."))
+            click.Context.exit(1)
+        except DependencyException as de:
+            print(ts.f(ERROR_COLOR, de.msg))
+            click.Context.exit(1)
+
+    if not dependency_ids:
+        blockers = e.dependencies.blockers(t)
+        dependencies = [e.get_task(d) for d in t.dependencies]
+        dependency_rows = [get_task_string(d, colorize_status=True, show_details=False) if d else ts.f(ERROR_COLOR, f"{dexid} (no such task)")
+                           for d, dexid in zip(dependencies, t.dependencies)]
+        dependent_rows = [get_task_string(d, colorize_status=True, show_details=False) for d in e.dependencies.dependents(t)]
+        blocked_str = ts.f(ERROR_COLOR, f"[blocked by {len(blockers)} tasks]") if blockers else ts.f(SUCCESS_COLOR, "[not blocked]")
+        header_txt = get_task_string(t, colorize_status=True, show_details=False) + blocked_str
+        show_tree(header_txt, [(ts.f("w", f"Depends on ({len(dependency_rows)})"), dependency_rows),
+                               (ts.f("w", f"Dependents ({len(dependent_rows)})"), dependent_rows)])
+
+
 # dex task [dexid] rename
 @task.command(name="rename", help="Rename a task.")
 @click.pass_context
@@ -905,10 +1677,33 @@ def task_rename(ctx):
     print(f"Old name: {old_name}")
     new_name = input("New name: ")
     check_input_not_empty(new_name)
-    t.rename(new_name)
+    try:
+        t.rename(new_name)
+    except DexException as de:
+        print(ts.f(ERROR_COLOR, de.msg))
+        click.Context.exit(1)
+    except ValueError as ve:
+        print(ts.f(ERROR_COLOR, str(ve)))
+        click.Context.exit(1)
     print(f"Task {t.dexid} renamed from '{old_name}' to '{t.name}'.")
 
 
+# dex task [dexid] move [project_id]
+@task.command(name="move", help="Move a task to another project, e.g. 'dex task a3 move b'. The task gets a new task id in that project.")
+@click.argument("project_id", nargs=1, type=click.STRING)
+@click.pass_context
+def task_move(ctx, project_id):
+    t = ctx.obj["TASK"]
+    e = ctx.obj["EXECUTOR"]
+    old_dexid = t.dexid
+    try:
+        e.move_task(old_dexid, project_id)
+    except DexException as de:
+        print(ts.f(ERROR_COLOR, de.msg))
+        click.Context.exit(1)
+    print(ts.f(SUCCESS_COLOR, f"Task {old_dexid}: '{t.name}' moved to project '{e.project_map[project_id].name}' as {t.dexid}."))
+
+
 # dex task [dexid] set [args]
 @task.command(name="set", help="Change a task's importance, effort, status, and/or due date and recurrence.")
 @click.option("--importance", "-i", help=f"Set a task's importance {importance_primitives}", type=click.INT)
@@ -922,61 +1717,26 @@ def task_set(ctx, importance, effort, status, due, recurring):
 
 
 def _task_set(ctx, importance, effort, status, due, recurring):
-    has_error = False
-    if importance is not None and int(importance) not in importance_primitives:
-        print(ts.f(ERROR_COLOR, f"{importance} not a valid importance value {importance_primitives}"))
-        has_error = True
-    if effort is not None and int(effort) not in effort_primitives:
-        print(ts.f(ERROR_COLOR, f"{effort} not a valid effort value {effort_primitives}"))
-        has_error = True
-    if status is not None and status not in status_primitives:
-        print(ts.f(ERROR_COLOR, f"{status} not a valid status {status_primitives}"))
-        has_error = True
-
-    task_due = None
-    if due is not None:
-        try:
-            task_due_int = int(due)
-            task_due = datetime.datetime.today() + datetime.timedelta(days=task_due_int)
-        except ValueError:
-            try:
-                task_due = datetime.datetime.strptime(due, due_date_fmt)
-            except ValueError:
-                print(ts.f(ERROR_COLOR, f"The entry '{due}' could not be parsed as a date or number of days."))
-                has_error = True
-
-    if recurring is not None:
-        recurring = int(recurring)
-        if recurring not in valid_recurrence_times and recurring != 0:
-            print(ts.f(ERROR_COLOR, f"{recurring} not a valid recurrence time."))
-            has_error = True
+    changes, errors = parse_changes(importance, effort, status, due, recurring)
+    for error in errors:
+        print(ts.f(ERROR_COLOR, error))
 
-    if has_error:
+    if errors:
         print(ts.f(ERROR_COLOR, f"Errors encountered during argument parsing. Task not updated. See `dex task [dexid] set for more information."))
         click.Context.exit(1)
     else:
-        t = ctx.obj["TASK"]
-        if importance is not None:
-            t.set_importance(importance)
-        if effort is not None:
-            t.set_effort(effort)
-        if due is not None:
-            t.set_due(task_due)
         if status is not None:
             print(f"Changing status to {status}")
-            t.set_status(status)
-        if recurring is not None:
-            recurring_flags = [f for f in t.flags if recurring_flag in f]
-            for f in recurring_flags:
-                t.rm_flag(f)
-
-            # if r is 0, all the recurrences have been removed, so only do stuff if r != 0
-            if recurring == 0 and no_flags not in t.flags:
-                t.add_flag(no_flags)
-            if recurring != 0:
-                t.add_flag(f"r{recurring}")
-        success_text = ts.f(SUCCESS_COLOR, f"Task {t.dexid} successfully updated to:")
-        print(f"{success_text}\n{get_task_string(t)}\n")
+        has_error = False
+        for t, error in apply_changes((t, changes) for t in ctx.obj["TASKS"]):
+            if error:
+                print(ts.f(ERROR_COLOR, f"Task {t.dexid} could not be updated: {error}"))
+                has_error = True
+            else:
+                success_text = ts.f(SUCCESS_COLOR, f"Task {t.dexid} successfully updated to:")
+                print(f"{success_text}\n{get_task_string(t)}\n")
+        if has_error:
+            click.Context.exit(1)
 
 
 # dex task [dexid] done
@@ -25,7 +25,7 @@ status_primitives_ints = {i: s for i, s in enumerate(status_primitives)}
 status_primitives_ints_inverted = {v: k for k, v in status_primitives_ints.items()}
 
 dexcode_delimiter_flag = "&"
-recurring_flag, no_flags = flags_primitives = ["r", "n"]
+recurring_flag, no_flags, dependency_flag = flags_primitives = ["r", "n", "d"]
 
 tasks_subdir = "tasks"
 notes_subdir = "notes"
@@ -34,11 +34,39 @@ inactive_subdir = f"{abandoned_str}+{done_str}"
 task_extension = ".md"
 note_extension = ".md"
 executor_extension = ".json"
+archive_fname = "archive.pack"
+locks_dirname = ".dexlocks"
+project_lock_fname = "project.lock"
 print_separator = "-"*30
 
 
+cache_dirname = "dex"
+rendered_cache_subdir = "rendered"
+rendered_cache_max_bytes = 32 * 1024 * 1024
+search_cache_subdir = "search"
+links_cache_subdir = "links"
+
+server_default_host = "127.0.0.1"
+server_default_port = 8765
+server_default_workers = 8
+server_keepalive_timeout = 5
+
+journal_compact_threshold = 200
+journal_history_max = 1000
+journal_compact_interval = 5.0
+
+archive_default_days = 30
+
+# Threads writing task files when creating tasks in bulk (see Project.bulk_create_tasks)
+bulk_write_workers = 8
+
 executor_fname = f"executor{executor_extension}"
+journal_fname = "journal.jsonl"
+journal_lock_fname = ".journal.lock"
+events_fname = "events.bin"
+project_ids_fname = f"project_ids{executor_extension}"
 executor_all_projects_key = "all"
+root_id_separator = ":"
 default_executor = {
     day: executor_all_projects_key for day in
     ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
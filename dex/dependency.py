@@ -0,0 +1,221 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+from dex.task import Task
+from dex.constants import done_str, abandoned_str
+
+
+def is_open(status: str) -> bool:
+    return status not in (done_str, abandoned_str)
+
+
+class DependencyGraph:
+    def __init__(self, tasks: Iterable[Task] = ()):
+        """
+        The DAG of dependencies between tasks (from their dependency flags, see Task.dependencies), kept up to date
+        as tasks change (see update).
+
+        A task is blocked while any task it depends on is open (not done or abandoned). For every task, the number of
+        its open dependencies is maintained incrementally, so is_blocked is O(1) and a status change only touches the
+        tasks which depend on the changed task. Dependencies on dexids which do not exist do not block.
+
+        Dependencies which would create a cycle are not added to the graph; they are recorded in cycles instead.
+
+        Args:
+            tasks ([Task]): The tasks. Dexids must be unique.
+        """
+        self._tasks: Dict[str, Task] = {}
+        self._deps: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._n_open: Dict[str, int] = {}
+        self.cycles: List[Tuple[str, str]] = []
+
+        tasks = list(tasks)
+        for t in tasks:
+            self._tasks[t.dexid] = t
+            self._n_open[t.dexid] = 0
+        for t in sorted(tasks, key=lambda x: x.dexid):
+            self._set_dependencies(t.dexid, t.dependencies)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __str__(self):
+        n_edges = sum(len(deps) for deps in self._deps.values())
+        return f"<dex DependencyGraph ({len(self)} tasks, {n_edges} dependencies)>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def is_blocked(self, task: Task) -> bool:
+        """
+        Whether a task has any open dependencies.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            (bool)
+        """
+        return self._n_open.get(task.dexid, 0) > 0
+
+    def blockers(self, task: Task) -> List[Task]:
+        """
+        The open tasks blocking a task.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            ([Task]): The tasks, in order of dexid.
+        """
+        deps = sorted(self._deps.get(task.dexid, ()))
+        return [self._tasks[d] for d in deps if d in self._tasks and is_open(self._tasks[d].status)]
+
+    def dependents(self, task: Task) -> List[Task]:
+        """
+        The tasks depending on a task.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            ([Task]): The tasks, in order of dexid.
+        """
+        return [self._tasks[d] for d in sorted(self._dependents.get(task.dexid, ())) if d in self._tasks]
+
+    def dependent_dexids(self, dexid: str) -> List[str]:
+        """
+        The dexids of the tasks whose dependency flags name a dexid, whether or not a task has that dexid (e.g., after
+        the task's dexid changed).
+
+        Args:
+            dexid (str): The dexid.
+
+        Returns:
+            ([str]): The dexids, sorted.
+        """
+        return sorted(self._dependents.get(dexid, ()))
+
+    def would_cycle(self, dexid: str, dependency: str) -> bool:
+        """
+        Whether making a task depend on another would create a cycle, i.e. whether the task is already a (transitive)
+        dependency of the other. Only the dependencies reachable from the other task are searched.
+
+        Args:
+            dexid (str): The dexid of the dependent task.
+            dependency (str): The dexid of the task it would depend on.
+
+        Returns:
+            (bool)
+        """
+        if dexid == dependency:
+            return True
+        stack, seen = [dependency], {dependency}
+        while stack:
+            for d in self._deps.get(stack.pop(), ()):
+                if d == dexid:
+                    return True
+                if d not in seen:
+                    seen.add(d)
+                    stack.append(d)
+        return False
+
+    def order(self, tasks: Iterable[Task]) -> List[Task]:
+        """
+        Order tasks so that every task comes after the tasks it depends on (a topological order). Ties are broken by
+        the given order of the tasks.
+
+        Args:
+            tasks ([Task]): The tasks to order. Dependencies outside of these tasks are ignored.
+
+        Returns:
+            ([Task]): The ordered tasks.
+        """
+        tasks = list(tasks)
+        position = {t.dexid: i for i, t in enumerate(tasks)}
+        n_waiting = {t.dexid: len([d for d in self._deps.get(t.dexid, ()) if d in position]) for t in tasks}
+        ready = [t for t in tasks if not n_waiting[t.dexid]]
+        ordered = []
+        while ready:
+            t = ready.pop(0)
+            ordered.append(t)
+            released = []
+            for d in self._dependents.get(t.dexid, ()):
+                if d in n_waiting:
+                    n_waiting[d] -= 1
+                    if not n_waiting[d]:
+                        released.append(tasks[position[d]])
+            if released:
+                ready = sorted(ready + released, key=lambda x: position[x.dexid])
+        return ordered
+
+    def update(self, task: Task, event: str, old, new) -> None:
+        """
+        Update the graph after a task has changed. Has the same signature as Task listeners.
+
+        Args:
+            task (Task): The task, already in its new state.
+            event (str): The attribute which changed, "created" for new tasks, or "deleted" for removed tasks.
+            old: The previous value of the attribute.
+            new: The new value of the attribute.
+
+        Returns:
+            None
+        """
+        if event == "created":
+            self._add(task)
+        elif event == "deleted":
+            self._remove(task.dexid, task.status)
+        elif event == "dexid":
+            self._remove(old, task.status)
+            self._add(task)
+        elif task.dexid not in self._tasks:
+            return
+        elif event == "status" and is_open(old) != is_open(new):
+            change = 1 if is_open(new) else -1
+            for d in self._dependents.get(task.dexid, ()):
+                if d in self._n_open:
+                    self._n_open[d] += change
+        elif event == "flags":
+            self._set_dependencies(task.dexid, task.dependencies)
+
+    def _add(self, task: Task) -> None:
+        dexid = task.dexid
+        self._tasks[dexid] = task
+        self._n_open[dexid] = 0
+        # Tasks may already depend on this dexid
+        if is_open(task.status):
+            for d in self._dependents.get(dexid, ()):
+                if d in self._n_open:
+                    self._n_open[d] += 1
+        self._set_dependencies(dexid, task.dependencies)
+
+    def _remove(self, dexid: str, status: str) -> None:
+        if dexid not in self._tasks:
+            return
+        self._set_dependencies(dexid, [])
+        if is_open(status):
+            for d in self._dependents.get(dexid, ()):
+                if d in self._n_open:
+                    self._n_open[d] -= 1
+        del self._tasks[dexid]
+        del self._n_open[dexid]
+
+    def _set_dependencies(self, dexid: str, dependencies: Iterable[str]) -> None:
+        for d in self._deps.pop(dexid, set()):
+            self._dependents[d].discard(dexid)
+            if d in self._tasks and is_open(self._tasks[d].status):
+                self._n_open[dexid] -= 1
+        self.cycles = [c for c in self.cycles if c[0] != dexid]
+
+        deps = set()
+        for d in dependencies:
+            if self.would_cycle(dexid, d):
+                self.cycles.append((dexid, d))
+                continue
+            deps.add(d)
+            self._dependents.setdefault(d, set()).add(dexid)
+            if d in self._tasks and is_open(self._tasks[d].status):
+                self._n_open[dexid] += 1
+        if deps:
+            self._deps[dexid] = deps
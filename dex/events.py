@@ -0,0 +1,115 @@
+import os
+import time
+import struct
+import datetime
+import threading
+
+from dex.task import Task
+from dex.exceptions import DexException
+from dex.constants import status_primitives_ints_inverted, done_str
+
+events_magic = b"DEXEVT1\n"
+# ts, local day ordinal, project id, task number, old status, new status, due day ordinal, effort
+event_record = struct.Struct("<dicIbbiB")
+# The numpy dtype of a record (see EventLog.array), matching event_record field by field
+event_dtype_fields = [
+    ("ts", "<f8"),
+    ("day", "<i4"),
+    ("project", "S1"),
+    ("number", "<u4"),
+    ("old", "i1"),
+    ("new", "i1"),
+    ("due", "<i4"),
+    ("effort", "u1"),
+]
+
+
+class EventLog:
+    def __init__(self, path: str):
+        """
+        An append-only log of the status transitions of tasks (e.g., todo to ip, ip to done), for throughput and
+        cycle time statistics (see dex.stats).
+
+        Each transition is one fixed size binary record (see event_record) appended to the log, so recording is one
+        small write and the whole log can be read as one array without parsing. A torn last record (e.g., from a
+        crash while appending) is ignored.
+
+        Completing a recurring task does not change its status (see Task.set_status), but is recorded as a
+        transition to done all the same.
+
+        Args:
+            path (str): The path of the log file. It is created on the first recorded transition.
+        """
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"<dex EventLog {self.path} ({len(self)} events)>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return (os.path.getsize(self.path) - len(events_magic)) // event_record.size
+
+    def record(self, task: Task, event: str, old, new) -> None:
+        """
+        Record a status transition of a task. Has the same signature as Task listeners; events which are not status
+        transitions are ignored.
+
+        Args:
+            task (Task): The task, already in its new state.
+            event (str): The changed attribute; "status" for status changes, or "completed" for completions of
+                recurring tasks (where old is the due date which was completed).
+            old: The previous value.
+            new: The new value.
+
+        Returns:
+            None
+        """
+        if event == "status":
+            old_status, new_status, due = old, new, task.due
+        elif event == "completed":
+            old_status, new_status, due = task.status, done_str, old
+        else:
+            return
+
+        now = time.time()
+        record = event_record.pack(
+            now,
+            datetime.date.fromtimestamp(now).toordinal(),
+            task.dexid[0].encode("ascii"),
+            int(task.dexid[1:]),
+            status_primitives_ints_inverted[old_status],
+            status_primitives_ints_inverted[new_status],
+            due.toordinal(),
+            task.effort
+        )
+        with self.lock:
+            new_file = not os.path.exists(self.path)
+            with open(self.path, "ab") as f:
+                if new_file:
+                    f.write(events_magic)
+                f.write(record)
+
+    def array(self):
+        """
+        Read the whole log as a numpy structured array with one element per transition, in the order they were
+        recorded (see event_dtype_fields).
+
+        Returns:
+            (numpy.ndarray): The transitions.
+        """
+        import numpy as np
+
+        dtype = np.dtype(event_dtype_fields)
+        if not os.path.exists(self.path):
+            return np.zeros(0, dtype=dtype)
+        with open(self.path, "rb") as f:
+            if f.read(len(events_magic)) != events_magic:
+                raise DexException(f"{self.path} is not a dex event log.")
+            data = f.read()
+        n = len(data) // dtype.itemsize
+        return np.frombuffer(data, dtype=dtype, count=n)
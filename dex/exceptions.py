@@ -17,3 +17,68 @@ class DexcodeException(DexException):
 
 class FileOverwriteError(DexException):
     pass
+
+
+class QueryException(DexException):
+    """
+    Exception for a task query (filter expression) which cannot be parsed or evaluated.
+    """
+    pass
+
+
+class FederationException(DexException):
+    """
+    Exception for a problem with the roots of a federated executor, or a namespaced dexid.
+    """
+    pass
+
+
+class BatchException(DexException):
+    """
+    Exception for a batch command which cannot be parsed.
+    """
+    pass
+
+
+class ClientException(DexException):
+    """
+    Exception for an error response from (or failure to reach) a dex server.
+    """
+    def __init__(self, msg, status=None):
+        super().__init__(msg)
+        self.status = status
+
+
+class DependencyException(DexException):
+    """
+    Exception for a task dependency which cannot be added, e.g. because it would create a cycle.
+    """
+    pass
+
+
+class JournalException(DexException):
+    """
+    Exception for a problem with the mutation journal, e.g. nothing left to undo.
+    """
+    pass
+
+
+class ReadOnlyException(DexException):
+    """
+    Exception for a change attempted on tasks or projects loaded in read-only mode.
+    """
+    pass
+
+
+class ArchiveException(DexException):
+    """
+    Exception for a problem with a project's archive of inactive tasks, e.g. an unreadable pack file.
+    """
+    pass
+
+
+class ConflictException(DexException):
+    """
+    Exception for a task changed by another process in a way this process cannot follow, e.g. its file was removed.
+    """
+    pass
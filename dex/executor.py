@@ -1,69 +1,239 @@
 import os
 import json
 import itertools
+import functools
+import datetime
+import warnings
 from typing import List, Union, Iterable
 
-from dex.task import Task
-from dex.project import Project
-from dex.constants import executor_fname, valid_project_ids, default_executor, executor_all_projects_key
+from dex.task import Task, file_stat
+from dex.project import Project, read_project_ids, write_project_ids, assign_project_ids, seed_project_ids
+from dex.constants import executor_fname, default_executor, executor_all_projects_key, \
+    journal_fname, journal_compact_threshold, archive_default_days, events_fname
 from dex.constants import today_in_executor_format as today
-from dex.logic import rank_tasks
-from dex.constants import status_primitives
+from dex.logic import rank_tasks, select_tasks_within_budget
+from dex.query import Query, compile_query
+from dex.index import TaskIndex
+from dex.agenda import build_agenda
+from dex.planner import Planner
+from dex.search import SearchIndex, SearchResult
+from dex.links import LinkGraph
+from dex.dependency import DependencyGraph
+from dex.journal import Journal
+from dex.events import EventLog
+from dex.exceptions import DexException, DependencyException, JournalException, ReadOnlyException
+from dex.constants import status_primitives, todo_str, ip_str, hold_str, done_str, abandoned_str, dependency_flag
 from dex.util import AttrDict
 
 
 class Executor:
-    def __init__(self, path: str, ignored_dirs: Union[Iterable, None] = None):
+    def __init__(self, path: str, ignored_dirs: Union[Iterable, None] = None, read_only: bool = False):
         """
         Executor handles all projects and interfaces mostly with the CLI. It is at the top of the hierarchy.
 
         Args:
             path (str): The path of the root directory containing all projects
             ignored_dirs ([str]): List of directories to ignore in the root executor dir
+            read_only (bool): If True, loading makes no changes to the root (safe on read-only mounts and snapshots):
+                missing files and directories are not created (a missing executor file means the default schedule),
+                tasks with mismatching project ids are reported (see pid_mismatches) instead of coerced, and pending
+                journaled changes are replayed in memory only. Changing tasks or projects raises ReadOnlyException.
         """
         path = os.path.abspath(path)
         if not os.path.exists(path):
+            if read_only:
+                raise DexException(f"Root {path} does not exist.")
             os.mkdir(path)
         self.path = path
         self.ignored_dirs = ignored_dirs if ignored_dirs else []
+        self.read_only = read_only
 
-        executor_file = os.path.join(self.path, executor_fname)
-        if not os.path.exists(executor_file):
-            with open(executor_file, "w") as f:
+        self.executor_file = os.path.join(self.path, executor_fname)
+        if not os.path.exists(self.executor_file) and not read_only:
+            with open(self.executor_file, "w") as f:
                 json.dump(default_executor, f)
-            executor_week = default_executor
-        else:
-            with open(executor_file, "r") as f:
-                executor_week = json.load(f)
+        self._load_executor_week()
+
+        # Incremented on every change to a task, so callers can tell whether their view of the tasks is stale
+        self.generation = 0
+
+        # Task changes are journaled (instead of written to the task files right away) if the root has a journal
+        journal_file = os.path.join(self.path, journal_fname)
+        self.journal = Journal(journal_file, get_tasks=lambda: self.loaded_tasks) if os.path.exists(journal_file) \
+            else None
+
+        # Status transitions are logged for statistics (see stats). Changes picked up by refresh or by reloading a task
+        # before changing it (see Task.reload) were made (and logged) by another process, so they are not logged again.
+        self.events = None if read_only else EventLog(os.path.join(self.path, events_fname))
+        self._refreshing = False
+        self._load_projects(self._find_project_folders())
+
+    def refresh(self) -> bool:
+        """
+        Bring the executor up to date with its files, after they were changed by another process (e.g., another dex
+        command or an editor). Only the modification times and sizes of files are checked; only changed task files
+        are re-read (see Project.refresh). If project folders were added or removed, all projects are reloaded.
+
+        Returns:
+            (bool): Whether anything changed.
+        """
+        changed = False
+        executor_file_stat = file_stat(self.executor_file) if os.path.exists(self.executor_file) else None
+        if executor_file_stat != self._executor_file_stat:
+            self._load_executor_week()
+            changed = True
+
+        # Pending journaled changes of another process are not in the files, so reload everything
+        journal_changed = self.journal is not None and \
+            (self.journal.changed_on_disk() or self.journal.changed_by_others)
+        if journal_changed:
+            self.journal.load()
+
+        folders = self._find_project_folders()
+        if journal_changed or set(folders) != {p.path for p in self.projects}:
+            self.generation += 1
+            self._load_projects(folders)
+            return True
 
-        self.executor_file = executor_file
-        self.executor_week = executor_week
+        self._refreshing = True
+        try:
+            for p in self.projects:
+                changed = p.refresh(coerce_pid_mismatches=True) or changed
+        finally:
+            self._refreshing = False
+        return changed
 
+    @property
+    def pid_mismatches(self) -> dict:
+        """
+        Tasks whose project ids do not match their projects' ids, which were not coerced because the executor is
+        read-only.
+
+        Returns:
+            {str: [str]}: Keys are project ids, values are the dexids of the mismatching tasks in that project.
+        """
+        return {p.id: list(p.pid_mismatches) for p in self.projects if p.pid_mismatches}
+
+    def _load_executor_week(self) -> None:
+        if not os.path.exists(self.executor_file):
+            # Only possible in read-only mode
+            self.executor_week = dict(default_executor)
+            self._executor_file_stat = None
+            return
+        with open(self.executor_file, "r") as f:
+            self.executor_week = json.load(f)
+        self._executor_file_stat = file_stat(self.executor_file)
+
+    def _find_project_folders(self) -> List[str]:
         folders = []
-        for folder in os.listdir(self.path):
+        for folder in sorted(os.listdir(self.path)):
             full_dirpath = os.path.join(self.path, folder)
             if os.path.isdir(full_dirpath):
                 if folder not in self.ignored_dirs:
                     folders.append(full_dirpath)
+        return folders
+
+    def _load_projects(self, folders: List[str]) -> None:
+        # Ids are kept in the root, so they stay the same when projects are added, removed or renamed (otherwise tasks
+        # would be coerced to new project ids, rewriting their files and breaking dependencies and the schedule)
+        assigned = read_project_ids(self.path)
+        folder_names = [os.path.basename(f) for f in folders]
+        # Roots from before ids were kept start from the ids their tasks have, so no task needs to be rewritten
+        project_ids = assign_project_ids(folder_names, seed_project_ids(self.path, folder_names)
+                                         if assigned is None else assigned)
+        if project_ids != assigned and not self.read_only:
+            write_project_ids(self.path, project_ids)
+
         projects = []
-        for i, folder in enumerate(folders):
-            pid = valid_project_ids[i]
-            p = Project.from_files(folder, pid, coerce_pid_mismatches=True)
+        for name, pid in project_ids.items():
+            # Inactive tasks are only loaded once needed (e.g., include_inactive=True or get_task of an inactive task)
+            p = Project.from_files(os.path.join(self.path, name), pid, coerce_pid_mismatches=True,
+                                   read_only=self.read_only, load_inactive=False)
             projects.append(p)
         self.projects = projects
 
+        # In roots from before ids were kept, tasks whose ids are not those of most tasks of their projects (or of
+        # projects whose ids were taken by others) were just coerced to new ids. Coercing the inactive tasks too (which
+        # may be depended on) lets all dependencies on the old dexids be retargeted at once (see _migrate_project_ids).
+        migrating = assigned is None and not self.read_only and any(p.coerced_dexids for p in self.projects)
+        if migrating:
+            for p in self.projects:
+                p.load_inactive()
+
+        if self.journal is not None:
+            # Pending changes may be of inactive tasks
+            pending_dexids = {r["dexid"] for r in self.journal.pending}
+            if pending_dexids - {t.dexid for t in self.loaded_tasks}:
+                for p in self.projects:
+                    p.load_inactive()
+            tasks = self.loaded_tasks
+            for t in tasks:
+                t.journaled = True
+            self.journal.replay(tasks)
+            if len(self.journal.pending) >= journal_compact_threshold and not self.read_only:
+                self.journal.compact(tasks)
+
+        # Inactive tasks loaded later are added as "created" (see _on_task_change). Unloaded inactive tasks cannot
+        # block other tasks, so the dependency graph does not need them either.
+        self.index = TaskIndex((t, p.id) for p in self.projects for t in p.loaded_tasks)
+        self.dependencies = DependencyGraph(t for p in self.projects for t in p.loaded_tasks)
+        for dexid, dependency in self.dependencies.cycles:
+            warnings.warn(f"Ignoring dependency of task {dexid} on {dependency}, since it would create a cycle.")
+        for p in self.projects:
+            p.listeners.append(functools.partial(self._on_task_change, p.id))
+
+        if migrating:
+            self._migrate_project_ids()
+
+    def _migrate_project_ids(self) -> None:
+        # All coerced dexids are substituted at once, since a dexid may have been coerced to a dexid which was itself
+        # coerced. Dependencies on dexids which another task still has are left to that task.
+        dexids = {t.dexid for t in self.loaded_tasks}
+        coerced = {old: new for p in self.projects for old, new in p.coerced_dexids.items() if old not in dexids}
+        dependents = {d for old in coerced for d in self.dependencies.dependent_dexids(old)}
+        for dexid in sorted(dependents):
+            t = self.get_task(dexid)
+            with t._locked():
+                t.set_flags([f"{dependency_flag}{coerced.get(f[1:], f[1:])}" if f.startswith(dependency_flag) else f
+                             for f in t.flags])
+
+        # The schedule names projects by id, so each project keeps its place in it under the id most of its tasks had
+        former_ids = []
+        for p in self.projects:
+            previous = {new: old for old, new in p.coerced_dexids.items()}
+            ids = [previous.get(t.dexid, t.dexid)[0] for t in p.loaded_tasks]
+            if ids:
+                former_ids.append((max(sorted(set(ids)), key=ids.count), p.id))
+            p.coerced_dexids = {}
+        new_ids = dict(former_ids)
+        if len(new_ids) == len(former_ids) and any(old != new for old, new in former_ids) and \
+                os.path.exists(self.executor_file):
+            executor_week = {}
+            for day, pids in self.executor_week.items():
+                if pids != executor_all_projects_key:
+                    pids = [new_ids[pid] for pid in pids if pid in new_ids]
+                executor_week[day] = pids
+            with open(self.executor_file, "w") as f:
+                json.dump(executor_week, f)
+            self._load_executor_week()
+
     def __str__(self):
         return f"<dex Executor {self.path} | {len(self.projects)} projects>"
 
     def __repr__(self):
         return self.__str__()
 
-    def get_tasks(self, only_today: bool) -> AttrDict:
+    def get_tasks(self, only_today: bool, where: Union[str, Query, None] = None,
+                  include_inactive: bool = True) -> AttrDict:
         """
         Get a task collection of tasks across more than one project.
 
         Args:
             only_today (bool): If True, include only the projects which are specified for today.
+            where (str or Query): A query expression (see dex.query) that tasks must match. Project and status
+                conditions are applied to whole projects and status collections before individual tasks are checked.
+            include_inactive (bool): If False, the collections of inactive (done and abandoned) tasks are left empty,
+                so inactive tasks are not loaded.
 
         Returns:
             AttrDict: The task collection across
@@ -71,29 +241,426 @@ class Executor:
         """
 
         pmap = self.project_map_today if only_today else self.project_map
+        statuses = status_primitives if include_inactive else (todo_str, ip_str, hold_str)
+        query = compile_query(where) if isinstance(where, str) else where
+        if query is None:
+            collections = [p.tasks for p in pmap.values()]
+        else:
+            collections = [query.filter_collection(p.tasks, p, statuses=statuses) for p in pmap.values()]
+
         relevant_tasks = {}
         for sp in status_primitives:
-            relevant_tasks[sp] = list(itertools.chain(*[p.tasks[sp] for p in pmap.values()]))
+            relevant_tasks[sp] = list(itertools.chain(*[c[sp] for c in collections])) if sp in statuses else []
         relevant_tasks = AttrDict(relevant_tasks)
         return relevant_tasks
 
-    def get_n_highest_priority_tasks(self, n: int = 1, only_today: bool = False, include_inactive: bool = False) -> List[Task]:
+    def get_task(self, dexid: str) -> Union[Task, None]:
+        """
+        Get a task by its dexid.
+
+        Args:
+            dexid (str): The dexid, e.g. "a3".
+
+        Returns:
+            (Task or None): The task, or None if no task has the dexid.
+        """
+        project = self.project_map.get(dexid[:1])
+        return None if project is None else project.get_task(dexid)
+
+    def get_n_highest_priority_tasks(self, n: int = 1, only_today: bool = False, include_inactive: bool = False,
+                                     offset: int = 0, include_held: bool = True,
+                                     where: Union[str, Query, None] = None) -> List[Task]:
         """
         Get the n highest priority tasks using the executor file (schedule) to determine the valid projects to use.
+        Tasks blocked by other tasks (see add_dependency) are ranked after held tasks.
 
         Args:
-            n (int): Number of tasks to return.
+            n (int): Number of tasks to return (0 for all tasks).
             include_inactive (bool): Include inactive (done+abandoned) tasks in the returned list.
             only_today (bool): If True, include only the projects which are specified for today.
+            offset (int): Number of highest priority tasks to skip before returning n tasks.
+            include_held (bool): If False, held tasks are excluded before ranking.
+            where (str or Query): A query expression (see dex.query) that tasks must match. Tasks are filtered before
+                priorities are computed.
 
         Returns:
             [Task]: List of ordered tasks
 
         """
-        all_todays_tasks = self.get_tasks(only_today=only_today)
-        ordered = rank_tasks(all_todays_tasks, limit=n, include_inactive=include_inactive)
+        all_todays_tasks = self.get_tasks(only_today=only_today, where=where, include_inactive=include_inactive)
+        if not include_held:
+            all_todays_tasks.hold = []
+        ordered = rank_tasks(all_todays_tasks, limit=n, include_inactive=include_inactive, offset=offset,
+                             is_blocked=self.dependencies.is_blocked)
         return ordered
 
+    def get_tasks_within_budget(self, budget: int, only_today: bool = False,
+                                where: Union[str, Query, None] = None) -> List[Task]:
+        """
+        Get the set of active (todo and in progress) tasks with the highest total priority whose total effort fits
+        within a budget, e.g. for a work session. Tasks blocked by other tasks (see add_dependency) are not selected.
+
+        Args:
+            budget (int): The maximum total effort of the tasks.
+            only_today (bool): If True, include only the projects which are specified for today.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+
+        Returns:
+            [Task]: The selected tasks, ordered by computed priority.
+        """
+        select = self._index_selector(only_today, False, False, where)
+        unblocked = (t for t in self.index.iter_by_due(select) if not self.dependencies.is_blocked(t))
+        return select_tasks_within_budget(unblocked, budget)
+
+    def get_tasks_by_due(self, n: int = 0, only_today: bool = False, include_inactive: bool = False,
+                         include_held: bool = True, where: Union[str, Query, None] = None,
+                         offset: int = 0) -> List[Task]:
+        """
+        Get tasks ordered strictly by due date (earliest first), read from the due date index.
+
+        Args:
+            n (int): Number of tasks to return (0 for all tasks).
+            only_today (bool): If True, include only the projects which are specified for today.
+            include_inactive (bool): Include inactive (done+abandoned) tasks.
+            include_held (bool): Include held tasks.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+            offset (int): Number of tasks to skip before returning n tasks.
+
+        Returns:
+            [Task]: List of ordered tasks
+        """
+        select = self._index_selector(only_today, include_inactive, include_held, where)
+        return list(itertools.islice(self.index.iter_by_due(select), offset, offset + n if n else None))
+
+    def get_tasks_by_attribute(self, attribute: str, n: int = 0, only_today: bool = False,
+                               include_inactive: bool = False, include_held: bool = True,
+                               where: Union[str, Query, None] = None, offset: int = 0) -> List[Task]:
+        """
+        Get tasks ordered strictly by importance or effort (highest first, ties ordered by computed priority), read from
+        the importance and effort buckets.
+
+        Args:
+            attribute (str): "importance" or "effort"
+            n (int): Number of tasks to return (0 for all tasks).
+            only_today (bool): If True, include only the projects which are specified for today.
+            include_inactive (bool): Include inactive (done+abandoned) tasks.
+            include_held (bool): Include held tasks.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+            offset (int): Number of tasks to skip before returning n tasks.
+
+        Returns:
+            [Task]: List of ordered tasks
+        """
+        select = self._index_selector(only_today, include_inactive, include_held, where)
+        ordered = self.index.iter_by_attribute(attribute, descending=True, select=select)
+        return list(itertools.islice(ordered, offset, offset + n if n else None))
+
+    def get_tasks_due_within(self, days: int, start: int = 0, only_today: bool = False,
+                             include_inactive: bool = False) -> List[Task]:
+        """
+        Get the tasks due in a range of days from today, e.g. "due in the next 3 days", ordered by due date.
+
+        Args:
+            days (int): The max number of days till due (inclusive).
+            start (int): The min number of days till due (inclusive). Negative values include overdue tasks.
+            only_today (bool): If True, include only the projects which are specified for today.
+            include_inactive (bool): Include inactive (done+abandoned) tasks.
+
+        Returns:
+            [Task]: List of tasks ordered by due date
+        """
+        select = self._index_selector(only_today, include_inactive, True, None)
+        return self.index.due_between(start, days, select=select)
+
+    def get_agenda(self, days: int, start: Union[datetime.date, None] = None, only_today: bool = False,
+                   include_held: bool = True, where: Union[str, Query, None] = None) -> tuple:
+        """
+        Get a per-day agenda of active tasks over the next days, including future occurrences of recurring tasks.
+
+        Args:
+            days (int): Number of days in the agenda, including the start date.
+            start (datetime.date): The first day of the agenda. Defaults to today.
+            only_today (bool): If True, include only the projects which are specified for today.
+            include_held (bool): Include held tasks.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+
+        Returns:
+            ([Occurrence], Iterator): The overdue occurrences, and a lazy iterator of (date, [Occurrence]) for each day
+                with anything due. See dex.agenda.build_agenda.
+        """
+        select = self._index_selector(only_today, False, include_held, where)
+        return build_agenda(self.index.iter_by_due(select), days, start=start)
+
+    def plan(self, capacity: int, days: int = 7, start: Union[datetime.date, None] = None,
+             where: Union[str, Query, None] = None, keep_updated: bool = False) -> Planner:
+        """
+        Plan active (todo and in progress) tasks over the next days, assigning each to a day its project is scheduled
+        on without exceeding the capacity of any day.
+
+        Args:
+            capacity (int): The total effort which can be done each day.
+            days (int): The number of days to plan, including the start date.
+            start (datetime.date): The first day of the plan. Defaults to today.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+            keep_updated (bool): If True, the plan is incrementally updated whenever a task changes.
+
+        Returns:
+            (Planner): The plan. See dex.planner.Planner.
+        """
+        planner = Planner(self.executor_week, capacity, self.project_map.keys(), days=days, start=start)
+        select = self._index_selector(False, False, False, where)
+        planner.plan((t, self.index.project_id(t)) for t in self.index.iter_by_due(select))
+        if keep_updated:
+            for p in self.projects:
+                p.listeners.append(planner.listener(p.id, select=select))
+        return planner
+
+    def search(self, query: str, n: int = 10, statuses: Union[Iterable[str], None] = None,
+               project_ids: Union[Iterable[str], None] = None,
+               index: Union[SearchIndex, None] = None) -> List[SearchResult]:
+        """
+        Full text search of the content of all tasks and notes. The on-disk search index of this root is updated
+        first, re-reading only files which changed since the last search (see dex.search.SearchIndex).
+
+        Args:
+            query (str): The search terms. All terms must match; a term ending in "*" matches as a prefix.
+            n (int): Max number of results. 0 returns all results.
+            statuses ([str]): If given, only tasks with these statuses are returned.
+            project_ids ([str]): If given, only tasks and notes of these projects are returned.
+            index (SearchIndex): The index to use. Defaults to this root's index in the dex cache directory.
+
+        Returns:
+            ([SearchResult]): The results, best first.
+        """
+        own_index = index is None
+        index = SearchIndex(self.path) if own_index else index
+        try:
+            index.update(self.projects)
+            projects = None
+            if project_ids is not None:
+                projects = [p.path for pid, p in self.project_map.items() if pid in project_ids]
+            return index.search(query, n=n, statuses=statuses, projects=projects)
+        finally:
+            if own_index:
+                index.close()
+
+    def add_dependency(self, dexid: str, dependency: str) -> None:
+        """
+        Make a task depend on (be blocked by) another task, until the other task is done or abandoned.
+
+        Args:
+            dexid (str): The dexid of the dependent task.
+            dependency (str): The dexid of the task it depends on.
+
+        Returns:
+            None
+        """
+        t = self.get_task(dexid)
+        for i in (dexid, dependency):
+            if self.get_task(i) is None:
+                raise DependencyException(f"No task '{i}'.")
+        if dependency in t.dependencies:
+            raise DependencyException(f"Task {dexid} already depends on {dependency}.")
+        if self.dependencies.would_cycle(dexid, dependency):
+            raise DependencyException(f"Task {dexid} cannot depend on {dependency}, since {dependency} already "
+                                      f"depends on {dexid}.")
+        t.add_dependency(dependency)
+
+    def move_task(self, dexid: str, project_id: str) -> Task:
+        """
+        Move a task to another project (see Project.move_task), giving it a new dexid there. Tasks depending on it are
+        changed to depend on its new dexid. The indexes are updated in place, without loading the root again. With a
+        journal, pending changes are written to the task files first, so no pending change refers to the old dexid.
+
+        Args:
+            dexid (str): The dexid of the task.
+            project_id (str): The id of the project to move it to.
+
+        Returns:
+            (Task): The moved task, with its new dexid.
+        """
+        self._check_writable()
+        t = self.get_task(dexid)
+        if t is None:
+            raise DexException(f"No task '{dexid}'.")
+        project = self.project_map.get(project_id)
+        if project is None:
+            raise DexException(f"No project with id '{project_id}'.")
+        if self.journal is None:
+            return self._move_task(t, project)
+        # The journal's lock is taken before the projects' locks, since moving the task records its new dexid
+        with self.journal.locked():
+            if self.journal.pending:
+                self.compact()
+            return self._move_task(t, project)
+
+    def _move_task(self, t: Task, project: Project) -> Task:
+        dexid = t.dexid
+        dependents = self.dependencies.dependents(t)
+        self.project_map[dexid[:1]].move_task(t, project)
+        old_flag, new_flag = f"{dependency_flag}{dexid}", f"{dependency_flag}{t.dexid}"
+        for d in dependents:
+            with d._locked():
+                d.set_flags([new_flag if f == old_flag else f for f in d.flags])
+        return t
+
+    def archive(self, days: int = archive_default_days) -> dict:
+        """
+        Archive the inactive tasks of all projects whose files were not modified for some days (see
+        Project.archive_tasks).
+
+        Args:
+            days (int): Only tasks whose files are older than this number of days are archived.
+
+        Returns:
+            {str: [Task]}: Keys are project ids, values are the tasks archived in that project.
+        """
+        self._check_writable()
+        return {p.id: p.archive_tasks(days) for p in self.projects}
+
+    def compact(self) -> int:
+        """
+        Write all pending journaled changes to the task files (see dex.journal.Journal.compact).
+
+        Returns:
+            (int): The number of task files written.
+        """
+        if self.journal is None:
+            raise JournalException(f"Root {self.path} has no journal.")
+        self._check_writable()
+        return self.journal.compact(self.loaded_tasks)
+
+    def undo(self) -> tuple:
+        """
+        Revert the most recent task change which was not undone yet (see dex.journal.Journal.undo).
+
+        Returns:
+            (Task, dict): The changed task and the journal record of the change which was undone.
+        """
+        if self.journal is None:
+            raise JournalException(f"Root {self.path} has no journal, so changes cannot be undone.")
+        self._check_writable()
+        return self.journal.undo(self.get_task)
+
+    def enable_journal(self) -> None:
+        """
+        Start journaling task changes, creating the journal file in the root.
+
+        Returns:
+            None
+        """
+        if self.journal is not None:
+            return
+        self._check_writable()
+        self.journal = Journal(os.path.join(self.path, journal_fname), get_tasks=lambda: self.loaded_tasks)
+        for t in self.loaded_tasks:
+            t.journaled = True
+
+    def disable_journal(self) -> None:
+        """
+        Stop journaling task changes. Pending changes are written to the task files, and the journal file (with the
+        history for undo) is removed.
+
+        Returns:
+            None
+        """
+        if self.journal is None:
+            return
+        self._check_writable()
+        self.journal.stop_compacting()
+        self.compact()
+        for t in self.loaded_tasks:
+            t.journaled = False
+        os.remove(self.journal.path)
+        self.journal = None
+
+    def stats(self, days: Union[int, None] = None, project_ids: Union[Iterable[str], None] = None,
+              percentiles: Iterable[float] = (50, 90)) -> dict:
+        """
+        Get statistics of the completed tasks from the log of status transitions (see dex.stats.summarize):
+        completions per day, week and project, cycle time percentiles and overdue rates.
+
+        Args:
+            days (int): Only completions in this many days up to and including today. All completions if None.
+            project_ids ([str]): Only completions in these projects. All projects if None.
+            percentiles ([float]): The percentiles of cycle time to compute.
+
+        Returns:
+            (dict): The statistics.
+        """
+        from dex.stats import summarize
+
+        events = EventLog(os.path.join(self.path, events_fname)) if self.events is None else self.events
+        start = datetime.date.today() - datetime.timedelta(days=days - 1) if days else None
+        return summarize(events.array(), start=start, project_ids=project_ids, percentiles=percentiles)
+
+    def get_link_graph(self, graph: Union[LinkGraph, None] = None) -> LinkGraph:
+        """
+        Get the graph of wiki links ([[name]]) between all tasks and notes, brought up to date with the files. Only
+        files which changed since the graph was last updated are re-read (see dex.links.LinkGraph).
+
+        Args:
+            graph (LinkGraph): The graph to update. Defaults to this root's graph in the dex cache directory.
+
+        Returns:
+            (LinkGraph): The up to date graph. Documents are identified by path (e.g., Task.path).
+        """
+        graph = LinkGraph(self.path) if graph is None else graph
+        graph.update(self.projects)
+        return graph
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ReadOnlyException(f"Root {self.path} was loaded read-only, so it cannot be changed.")
+
+    def _index_selector(self, only_today: bool, include_inactive: bool, include_held: bool,
+                        where: Union[str, Query, None]):
+        pmap = self.project_map_today if only_today else self.project_map
+        statuses = set(status_primitives) if include_inactive else {todo_str, ip_str, hold_str}
+        if not include_held:
+            statuses.discard(hold_str)
+        query = compile_query(where) if isinstance(where, str) else where
+        if query is not None:
+            pmap = {pid: p for pid, p in pmap.items() if query.matches_project(p)}
+            statuses = {sp for sp in statuses if query.matches_status(sp)}
+        if statuses & {done_str, abandoned_str}:
+            for p in pmap.values():
+                p.load_inactive()
+        if query is not None:
+            return lambda t, pid: pid in pmap and t.status in statuses and query(t, pmap[pid])
+        return lambda t, pid: pid in pmap and t.status in statuses
+
+    def _on_task_change(self, project_id: str, task: Task, event: str, old, new) -> None:
+        self.generation += 1
+        self.index.update(task, event, old, new, project_id=project_id)
+        self.dependencies.update(task, event, old, new)
+        if self.journal is not None:
+            if event == "created":
+                task.journaled = True
+            self.journal.record(task, event, old, new)
+        if self.events is not None and not self._refreshing and not task.reloading:
+            self.events.record(task, event, old, new)
+
+    @property
+    def all_tasks(self) -> List[Task]:
+        """
+        All tasks of all projects, loading the inactive tasks if needed.
+
+        Returns:
+            ([Task]): The tasks.
+        """
+        return [t for p in self.projects for t in p.tasks.all]
+
+    @property
+    def loaded_tasks(self) -> List[Task]:
+        """
+        The tasks of all projects loaded so far (see Project.loaded_tasks).
+
+        Returns:
+            ([Task]): The tasks.
+        """
+        return [t for p in self.projects for t in p.loaded_tasks]
+
     @property
     def project_map(self) -> dict:
         """
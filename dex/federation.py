@@ -0,0 +1,131 @@
+import os
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Union
+
+from dex.task import Task
+from dex.executor import Executor
+from dex.query import Query
+from dex.exceptions import FederationException
+from dex.constants import todo_str, ip_str, hold_str, done_str, root_id_separator
+
+
+# Same group order as dex.logic.rank_tasks: active, then held, then blocked active, then done, then abandoned
+_rank_groups = {todo_str: 0, ip_str: 0, hold_str: 1, done_str: 3}
+_blocked_rank_group = 2
+_abandoned_rank_group = 4
+
+
+def federated_dexid(root: str, task: Task) -> str:
+    """
+    Namespace a task's dexid by the name of its root, e.g. "work:a3".
+
+    Args:
+        root (str): The name of the root.
+        task (Task): The task.
+
+    Returns:
+        (str): The namespaced dexid.
+    """
+    return f"{root}{root_id_separator}{task.dexid}"
+
+
+def split_federated_dexid(federated_id: str) -> Tuple[str, str]:
+    """
+    Split a namespaced dexid (e.g., "work:a3") into the root name and dexid.
+
+    Args:
+        federated_id (str): The namespaced dexid.
+
+    Returns:
+        (str, str): The root name and the dexid.
+    """
+    root, sep, dexid = federated_id.rpartition(root_id_separator)
+    if not sep or not root or not dexid:
+        raise FederationException(f"Task id '{federated_id}' is not of the form 'root{root_id_separator}dexid'.")
+    return root, dexid
+
+
+class FederatedExecutor:
+    def __init__(self, roots: Dict[str, Tuple[str, Iterable[str]]], max_workers: Union[int, None] = None):
+        """
+        A combined view over the executors of several roots (e.g., separate work and personal vaults).
+
+        The executors are loaded in parallel, since loading is dominated by reading task files. Dexids are only unique
+        within a root, so tasks are identified across roots by namespaced dexids (see federated_dexid).
+
+        Args:
+            roots ({str: (str, [str])}): Mapping of root name to (root path, ignored dirs).
+            max_workers (int): Max number of roots loaded at once. Defaults to one thread per root.
+        """
+        if not roots:
+            raise FederationException("No roots to federate. Register roots with 'dex roots add'.")
+        for name, (path, _) in roots.items():
+            if root_id_separator in name:
+                raise FederationException(f"Root name '{name}' cannot contain '{root_id_separator}'.")
+            if not os.path.isdir(path):
+                raise FederationException(f"Path '{path}' of root '{name}' does not exist.")
+
+        names = list(roots.keys())
+        with ThreadPoolExecutor(max_workers=max_workers or len(names)) as pool:
+            executors = pool.map(lambda name: Executor(roots[name][0], ignored_dirs=roots[name][1]), names)
+            self.executors = dict(zip(names, executors))
+
+    def __str__(self):
+        return f"<dex FederatedExecutor {list(self.executors.keys())}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_n_highest_priority_tasks(self, n: int = 1, only_today: bool = False, include_inactive: bool = False,
+                                     include_held: bool = True,
+                                     where: Union[str, Query, None] = None) -> List[Tuple[str, Task]]:
+        """
+        Get the n highest priority tasks across all roots, by k-way merging each root's own ranking. Only the top n
+        tasks of each root are ever ranked.
+
+        Args:
+            n (int): Number of tasks to return (0 for all tasks).
+            only_today (bool): If True, include only the projects which are specified for today in each root.
+            include_inactive (bool): Include inactive (done+abandoned) tasks in the returned list.
+            include_held (bool): If False, held tasks are excluded before ranking.
+            where (str or Query): A query expression (see dex.query) that tasks must match.
+
+        Returns:
+            [(str, Task)]: List of (root name, task), ordered as dex.logic.rank_tasks orders tasks.
+        """
+        def ranked(name, executor):
+            tasks = executor.get_n_highest_priority_tasks(n, only_today=only_today, include_inactive=include_inactive,
+                                                          include_held=include_held, where=where)
+            return ((name, t) for t in tasks)
+
+        merged = heapq.merge(*(ranked(name, e) for name, e in self.executors.items()), key=self._rank_key)
+        return list(itertools.islice(merged, n or None))
+
+    def get_task(self, federated_id: str) -> Tuple[str, Task]:
+        """
+        Get a task by its namespaced dexid.
+
+        Args:
+            federated_id (str): The namespaced dexid, e.g. "work:a3".
+
+        Returns:
+            (str, Task): The root name and task.
+        """
+        root, dexid = split_federated_dexid(federated_id)
+        if root not in self.executors:
+            raise FederationException(f"No root named '{root}'. Roots are {list(self.executors.keys())}.")
+        for p in self.executors[root].projects:
+            for t in p.tasks.all:
+                if t.dexid == dexid:
+                    return root, t
+        raise FederationException(f"No task '{dexid}' in root '{root}'.")
+
+    def _rank_key(self, root_and_task: Tuple[str, Task]) -> tuple:
+        root, task = root_and_task
+        group = _rank_groups.get(task.status, _abandoned_rank_group)
+        if group == 0 and self.executors[root].dependencies.is_blocked(task):
+            group = _blocked_rank_group
+        # Abandoned tasks are ordered by dexid, as in each root's ranking
+        return (group, task.dexid) if group == _abandoned_rank_group else (group, -task.priority)
@@ -0,0 +1,215 @@
+import bisect
+import datetime
+import itertools
+from typing import Iterable, Iterator, Callable, List, Tuple, Union
+
+from dex.task import Task
+from dex.constants import importance_primitives, effort_primitives, status_primitives
+
+
+class TaskIndex:
+    bucketed_attributes = {"importance": importance_primitives, "effort": effort_primitives}
+
+    def __init__(self, tasks: Iterable[Tuple[Task, str]] = ()):
+        """
+        Secondary indexes over tasks, kept up to date as tasks change (see update), so views ordered by due date,
+        importance, effort or status do not need to sort or regroup every task.
+
+        - Due date: a sorted list of (due date ordinal, dexid, id) keys, for ordered iteration and range queries.
+        - Importance and effort: one bucket per primitive value (counting sort over the 1-5 domains).
+        - Status: one bucket per status primitive.
+
+        Args:
+            tasks ([(Task, str)]): (task, project id) pairs to index.
+        """
+        self._tasks = {}
+        self._project_ids = {}
+        self._due_keys = []
+        self._buckets = {attr: {v: {} for v in values} for attr, values in self.bucketed_attributes.items()}
+        self._buckets["status"] = {sp: {} for sp in status_primitives}
+
+        for task, project_id in tasks:
+            self._add_to_buckets(task, project_id)
+            self._due_keys.append(self._due_key(task))
+        self._due_keys.sort()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __str__(self):
+        return f"<dex TaskIndex ({len(self)} tasks)>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def add(self, task: Task, project_id: str) -> None:
+        """
+        Add a task to the index.
+
+        Args:
+            task (Task): The task
+            project_id (str): The id of the task's project
+
+        Returns:
+            None
+        """
+        if id(task) in self._tasks:
+            return
+        self._add_to_buckets(task, project_id)
+        bisect.insort(self._due_keys, self._due_key(task))
+
+    def remove(self, task: Task) -> None:
+        """
+        Remove a task from the index.
+
+        Args:
+            task (Task): The task
+
+        Returns:
+            None
+        """
+        if id(task) not in self._tasks:
+            return
+        self._remove_due_key(self._due_key(task))
+        for attr, buckets in self._buckets.items():
+            buckets[getattr(task, attr)].pop(id(task), None)
+        del self._tasks[id(task)]
+        del self._project_ids[id(task)]
+
+    def update(self, task: Task, event: str, old, new, project_id: Union[str, None] = None) -> None:
+        """
+        Update the index after a task has changed. Has the same signature as Task listeners (plus the project id).
+
+        Args:
+            task (Task): The task, already in its new state.
+            event (str): The attribute which changed, "created" for new tasks, or "deleted" for removed tasks.
+            old: The previous value of the attribute.
+            new: The new value of the attribute.
+            project_id (str): The id of the task's project. Only required for new tasks.
+
+        Returns:
+            None
+        """
+        if event == "created":
+            self.add(task, project_id)
+        elif event == "deleted":
+            self.remove(task)
+        elif id(task) not in self._tasks:
+            return
+        elif event in ("due", "dexid"):
+            due = old if event == "due" else task.due
+            dexid = old if event == "dexid" else task.dexid
+            self._remove_due_key((due.toordinal(), dexid, id(task)))
+            bisect.insort(self._due_keys, self._due_key(task))
+        elif event in self._buckets:
+            self._buckets[event][old].pop(id(task), None)
+            self._buckets[event][new][id(task)] = task
+
+    def iter_by_due(self, select: Union[Callable, None] = None) -> Iterator[Task]:
+        """
+        Iterate over tasks in order of due date (earliest first).
+
+        Args:
+            select (callable): Function of (task, project id) returning whether to include the task.
+
+        Returns:
+            Iterator of Tasks
+        """
+        return self._select((self._tasks[key[2]] for key in self._due_keys), select)
+
+    def due_between(self, start: int, end: int, today: Union[datetime.date, None] = None,
+                    select: Union[Callable, None] = None) -> List[Task]:
+        """
+        Get the tasks due between two numbers of days from today (inclusive), in order of due date, using a binary
+        search instead of looking at every task.
+
+        Args:
+            start (int): The minimum number of days till due (e.g., 0 for today, negative for overdue).
+            end (int): The maximum number of days till due.
+            today (datetime.date): The day the number of days are counted from. Defaults to today.
+            select (callable): Function of (task, project id) returning whether to include the task.
+
+        Returns:
+            [Task]: Tasks due in the range.
+        """
+        today = datetime.date.today() if today is None else today
+        start_ordinal = today.toordinal() + start
+        end_ordinal = today.toordinal() + end
+        lo = bisect.bisect_left(self._due_keys, (start_ordinal,))
+        hi = bisect.bisect_left(self._due_keys, (end_ordinal + 1,))
+        return list(self._select((self._tasks[key[2]] for key in self._due_keys[lo:hi]), select))
+
+    def iter_by_attribute(self, attribute: str, descending: bool = True,
+                          select: Union[Callable, None] = None) -> Iterator[Task]:
+        """
+        Iterate over tasks in order of a bucketed attribute (importance or effort). Tasks within a bucket are in
+        order of computed priority; only the buckets which are reached are ordered.
+
+        Args:
+            attribute (str): "importance" or "effort".
+            descending (bool): If True, the highest values come first.
+            select (callable): Function of (task, project id) returning whether to include the task.
+
+        Returns:
+            Iterator of Tasks
+        """
+        if attribute not in self.bucketed_attributes:
+            raise ValueError(f"Tasks are only indexed by {list(self.bucketed_attributes.keys())}, not '{attribute}'")
+        values = self.bucketed_attributes[attribute]
+        values = reversed(values) if descending else values
+        buckets = self._buckets[attribute]
+
+        def bucket_contents(v):
+            selected = self._select(buckets[v].values(), select)
+            return sorted(selected, key=lambda t: t.priority, reverse=True)
+
+        return itertools.chain.from_iterable(bucket_contents(v) for v in values)
+
+    def with_status(self, status: str, select: Union[Callable, None] = None) -> List[Task]:
+        """
+        Get all tasks with a status.
+
+        Args:
+            status (str): A status primitive.
+            select (callable): Function of (task, project id) returning whether to include the task.
+
+        Returns:
+            [Task]
+        """
+        return list(self._select(self._buckets["status"][status].values(), select))
+
+    def count(self, attribute: str, value) -> int:
+        """
+        Count the tasks with a value of a bucketed attribute (importance, effort, or status) in O(1).
+
+        Args:
+            attribute (str): "importance", "effort", or "status"
+            value: The value to count.
+
+        Returns:
+            (int)
+        """
+        return len(self._buckets[attribute][value])
+
+    def project_id(self, task: Task) -> str:
+        return self._project_ids[id(task)]
+
+    def _select(self, tasks: Iterable[Task], select: Union[Callable, None]) -> Iterator[Task]:
+        if select is None:
+            return iter(tasks)
+        return (t for t in tasks if select(t, self._project_ids[id(t)]))
+
+    def _add_to_buckets(self, task: Task, project_id: str) -> None:
+        self._tasks[id(task)] = task
+        self._project_ids[id(task)] = project_id
+        for attr, buckets in self._buckets.items():
+            buckets[getattr(task, attr)][id(task)] = task
+
+    def _remove_due_key(self, key: tuple) -> None:
+        i = bisect.bisect_left(self._due_keys, key)
+        if i < len(self._due_keys) and self._due_keys[i] == key:
+            del self._due_keys[i]
+
+    @staticmethod
+    def _due_key(task: Task) -> tuple:
+        return task.due.toordinal(), task.dexid, id(task)
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import datetime
+import tempfile
+import threading
+import contextlib
+import warnings
+from typing import Callable, Iterable, List, Tuple, Union
+
+from dex.task import Task, file_stat
+from dex.locking import journal_lock
+from dex.exceptions import JournalException
+from dex.constants import due_date_fmt, journal_history_max, journal_compact_interval
+
+# Task attributes whose changes are journaled. Other changes (e.g., renames) are made on the files directly.
+journaled_attributes = ("status", "due", "effort", "importance", "flags", "dexid")
+
+
+class Journal:
+    def __init__(self, path: str, history_max: int = journal_history_max,
+                 get_tasks: Union[Callable[[], Iterable[Task]], None] = None):
+        """
+        An append-only journal of task changes, so a change costs one small append instead of rewriting (and maybe
+        moving) a task file. Journaled tasks (see Task.journaled) only mark themselves dirty when changed; the journal
+        records each change (see record) and compact later writes all dirty tasks to their files in one batch.
+
+        Each line of the journal is a JSON record, either a change:
+
+            {"seq": 12, "ts": 1596000000.0, "dexid": "a3", "attr": "status", "old": "todo", "new": "done"}
+
+        (with "undoes": <seq> if it reverts an earlier change, see undo), or a compaction marker:
+
+            {"compacted": 12}
+
+        meaning all changes up to that seq are in the task files. Loading tasks from their files and applying the
+        changes after the last marker (see replay) gives the current state. Compacted changes are kept (up to
+        history_max records) for undo.
+
+        Several dex processes may share a journal: appending and compacting are done holding the journal's lock (see
+        locked), after reading the changes other processes appended since (see changed_by_others). Their changes are
+        applied to this process' tasks before a change is appended or the journal is compacted, and a compaction
+        marker only covers changes applied to the tasks which were written.
+
+        Args:
+            path (str): The path of the journal file. It is created if it does not exist.
+            history_max (int): Max number of records kept after compaction.
+            get_tasks (callable): Function returning all tasks of the root (e.g., Executor.loaded_tasks), to apply the
+                changes of other processes to before a change is appended. If None, they are only applied when
+                compacting.
+        """
+        self.path = os.path.abspath(path)
+        self.history_max = history_max
+        self.get_tasks = get_tasks
+        self.lock = threading.RLock()
+        self.records = []
+        self.compacted_seq = 0
+        self.seq = 0
+        # Whether changes appended by other processes were read since the journal was last loaded
+        self.changed_by_others = False
+        # Seq of the first change which is not yet applied to this process' tasks, if any
+        self._unapplied_seq = None
+        self._lock_depth = 0
+        self._undoing = None
+        self._stop_compacting = None
+        if not os.path.exists(self.path):
+            open(self.path, "a").close()
+        self.load()
+
+    def __str__(self):
+        return f"<dex Journal {self.path} | {len(self.pending)} pending changes>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def load(self) -> None:
+        """
+        (Re)read the journal file. A torn last line (e.g., from a crash during an append) is ignored.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.records = []
+            self.compacted_seq = 0
+            self.changed_by_others = False
+            self._unapplied_seq = None
+            with open(self.path, "r") as f:
+                for i, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        warnings.warn(f"Ignoring unreadable line {i} of journal {self.path}.")
+                        continue
+                    if "compacted" in record:
+                        self.compacted_seq = record["compacted"]
+                    else:
+                        self.records.append(record)
+            self.seq = max([self.compacted_seq] + [r["seq"] for r in self.records])
+            self._file_stat = file_stat(self.path)
+
+    @property
+    def pending(self) -> List[dict]:
+        """
+        The changes which are not yet in the task files, oldest first.
+        """
+        return [r for r in self.records if r["seq"] > self.compacted_seq]
+
+    def pending_changes(self) -> dict:
+        """
+        The pending changes grouped by task, for applying them to tasks one at a time (e.g., while streaming tasks
+        from their files) instead of all at once (see replay). Changes recorded after a task's dexid changed are
+        grouped with its earlier changes.
+
+        Returns:
+            {str: [(str, object)]}: Keys are dexids in the task files, values are the (attribute, value) changes of the
+                task, oldest first.
+        """
+        changes = {}
+        # Current dexid of a changed task -> its dexid in the task files
+        file_dexids = {}
+        with self.lock:
+            for record in self.pending:
+                file_dexid = file_dexids.pop(record["dexid"], record["dexid"])
+                value = _decode_value(record["attr"], record["new"])
+                changes.setdefault(file_dexid, []).append((record["attr"], value))
+                file_dexids[value if record["attr"] == "dexid" else record["dexid"]] = file_dexid
+        return changes
+
+    def changed_on_disk(self) -> bool:
+        """
+        Whether the journal file was changed by another process since this object last read or wrote it.
+
+        Returns:
+            (bool)
+        """
+        try:
+            return file_stat(self.path) != self._file_stat
+        except FileNotFoundError:
+            return True
+
+    def record(self, task: Task, event: str, old, new) -> None:
+        """
+        Record a change to a task. Has the same signature as Task listeners; events which are not changes of
+        journaled attributes are ignored.
+
+        Args:
+            task (Task): The task, already in its new state.
+            event (str): The changed attribute.
+            old: The previous value.
+            new: The new value.
+
+        Returns:
+            None
+        """
+        if event not in journaled_attributes:
+            return
+        with self.locked():
+            self._read_changes_by_others()
+            self.seq += 1
+            record = {
+                "seq": self.seq,
+                "ts": round(time.time(), 3),
+                "dexid": old if event == "dexid" else task.dexid,
+                "attr": event,
+                "old": _encode_value(event, old),
+                "new": _encode_value(event, new)
+            }
+            if self._undoing is not None:
+                record["undoes"] = self._undoing
+            self.records.append(record)
+            if self._unapplied_seq is not None and self.get_tasks is not None:
+                # The change is applied again after the earlier changes of other processes, as on the next load
+                self._unapplied_seq = self._replay_from(self._unapplied_seq, self.get_tasks())
+            self._append([record])
+
+    def replay(self, tasks: Iterable[Task]) -> int:
+        """
+        Apply the pending changes to tasks loaded from their files, without writing the files. The changed tasks are
+        marked dirty.
+
+        Args:
+            tasks ([Task]): All tasks of the root.
+
+        Returns:
+            (int): The number of changes applied.
+        """
+        by_dexid = {t.dexid: t for t in tasks}
+        n_applied = 0
+        with self.lock:
+            for record in self.pending:
+                t = by_dexid.get(record["dexid"])
+                if t is None:
+                    warnings.warn(f"Ignoring journaled change of task {record['dexid']}, which does not exist.")
+                    continue
+                self._apply_record(record, t, by_dexid)
+                n_applied += 1
+            self._unapplied_seq = None
+        return n_applied
+
+    def compact(self, tasks: Iterable[Task]) -> int:
+        """
+        Write all dirty tasks to their files in one batch, then mark the recorded changes as compacted. Changes which
+        other processes appended are applied to the tasks first; changes of tasks which are not given (e.g., inactive
+        tasks which were not loaded) are not in the files written, so neither they nor any later change are marked.
+        Tasks are written grouped by the directory their files move to. If the journal is longer than history_max
+        records, it is rewritten with only the most recent ones.
+
+        Args:
+            tasks ([Task]): All tasks of the root.
+
+        Returns:
+            (int): The number of tasks written.
+        """
+        tasks = list(tasks)
+        with self.locked():
+            self._read_changes_by_others()
+            if self._unapplied_seq is not None:
+                self._unapplied_seq = self._replay_from(self._unapplied_seq, tasks)
+            dirty = sorted((t for t in tasks if t.dirty), key=lambda t: (t.prefix_path, t.path))
+            for t in dirty:
+                t.flush()
+            compacted_seq = self.seq if self._unapplied_seq is None else self._unapplied_seq - 1
+            if compacted_seq <= self.compacted_seq:
+                return len(dirty)
+            self.compacted_seq = compacted_seq
+            if len(self.records) > self.history_max:
+                self.records = self.records[-self.history_max:]
+                self._rewrite()
+            else:
+                self._append([{"compacted": compacted_seq}])
+            return len(dirty)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Hold the journal's lock (see dex.locking.journal_lock) against other threads and processes appending to or
+        compacting the journal. The lock can be taken again while it is held, e.g., to change tasks while holding it
+        (see Executor.move_task), since a project lock must not be held while the journal's lock is taken.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with journal_lock(self.path):
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def undo(self, get_task: Callable[[str], Union[Task, None]]) -> Tuple[Task, dict]:
+        """
+        Revert the most recent change which has not been undone yet (undo can be repeated to go further back). The
+        reverting change is recorded like any other change, with "undoes" set to the seq of the reverted change.
+
+        Args:
+            get_task (callable): Function of a dexid returning the task, or None if it does not exist (e.g.,
+                Executor.get_task).
+
+        Returns:
+            (Task, dict): The changed task and the record of the change which was undone.
+        """
+        with self.locked():
+            self._read_changes_by_others()
+            undone = {r["undoes"] for r in self.records if "undoes" in r}
+            for record in reversed(self.records):
+                if "undoes" not in record and record["seq"] not in undone:
+                    break
+            else:
+                raise JournalException("Nothing to undo.")
+
+            attr = record["attr"]
+            old, new = _decode_value(attr, record["old"]), _decode_value(attr, record["new"])
+            t = get_task(new if attr == "dexid" else record["dexid"])
+            if t is None:
+                raise JournalException(f"Cannot undo change of task {record['dexid']}, which no longer exists.")
+            self._undoing = record["seq"]
+            try:
+                current = getattr(t, attr)
+                t._apply(attr, old)
+                t._write_state()
+                t._notify(attr, current, old)
+            finally:
+                self._undoing = None
+            return t, record
+
+    def start_compacting(self, get_tasks: Callable[[], Iterable[Task]],
+                         interval: float = journal_compact_interval) -> None:
+        """
+        Compact the journal in a background (daemon) thread every interval seconds while there are pending changes.
+        Callers changing tasks from other threads should hold the journal's lock while doing so.
+
+        Args:
+            get_tasks (callable): Function returning all tasks of the root.
+            interval (float): Seconds between compactions.
+
+        Returns:
+            None
+        """
+        self.stop_compacting()
+        stop = threading.Event()
+
+        def compact_until_stopped():
+            while not stop.wait(interval):
+                with self.lock:
+                    if self.pending:
+                        self.compact(get_tasks())
+
+        self._stop_compacting = stop
+        threading.Thread(target=compact_until_stopped, name="dex-journal-compaction", daemon=True).start()
+
+    def stop_compacting(self) -> None:
+        if self._stop_compacting is not None:
+            self._stop_compacting.set()
+            self._stop_compacting = None
+
+    def _read_changes_by_others(self) -> None:
+        # Only called holding the journal's lock, so nothing is appended until the caller's change is
+        if not self.changed_on_disk():
+            return
+        seq = self.seq
+        changed_by_others = self.changed_by_others
+        unapplied_seq = self._unapplied_seq
+        self.load()
+        new_seqs = [r["seq"] for r in self.records if r["seq"] > seq]
+        self.changed_by_others = changed_by_others or bool(new_seqs)
+        self._unapplied_seq = min([s for s in new_seqs + [unapplied_seq] if s is not None], default=None)
+
+    def _replay_from(self, seq: int, tasks: Iterable[Task]) -> Union[int, None]:
+        # Apply the changes from a seq on to tasks which may already be in a later state (e.g., changed by this
+        # process), so the final state is that of the journal. Returns the seq of the first change which could not be
+        # applied, since its task was not given.
+        records = [r for r in self.records if r["seq"] >= seq]
+        by_dexid = {t.dexid: t for t in tasks}
+        # Tasks are looked up by their dexids at the first change
+        for record in reversed(records):
+            if record["attr"] == "dexid" and record["new"] in by_dexid:
+                by_dexid[record["dexid"]] = by_dexid.pop(record["new"])
+        unapplied_seq = None
+        for record in records:
+            t = by_dexid.get(record["dexid"])
+            if t is None:
+                unapplied_seq = record["seq"] if unapplied_seq is None else unapplied_seq
+                continue
+            self._apply_record(record, t, by_dexid)
+        return unapplied_seq
+
+    @staticmethod
+    def _apply_record(record: dict, task: Task, by_dexid: dict) -> None:
+        value = _decode_value(record["attr"], record["new"])
+        task._apply(record["attr"], value)
+        task.dirty = True
+        if record["attr"] == "dexid":
+            by_dexid[value] = by_dexid.pop(record["dexid"])
+
+    def _append(self, records: List[dict]) -> None:
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        self._file_stat = file_stat(self.path)
+
+    def _rewrite(self) -> None:
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            for r in self.records + [{"compacted": self.compacted_seq}]:
+                f.write(json.dumps(r, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self._file_stat = file_stat(self.path)
+
+
+def _encode_value(attr: str, value):
+    return value.strftime(due_date_fmt) if attr == "due" else value
+
+
+def _decode_value(attr: str, value):
+    return datetime.datetime.strptime(value, due_date_fmt) if attr == "due" else value
@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import tempfile
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+from dex.cache import get_cache_dir, hash_str
+from dex.constants import links_cache_subdir, task_extension, note_extension
+
+# [[target]], [[target|alias]], [[target#heading]] and ![[target]] (embeds) all link to target
+link_regex = re.compile(r"\[\[([^\[\]|#]*)(?:#[^\[\]|]*)?(?:\|[^\[\]]*)?\]\]")
+
+
+def parse_links(content: str) -> List[str]:
+    """
+    Find the targets of wiki links (e.g., [[some note]]) in content, in the form Obsidian writes them.
+
+    Args:
+        content (str): The markdown content.
+
+    Returns:
+        ([str]): The link targets, in order of first appearance and without duplicates.
+    """
+    targets = []
+    for match in link_regex.finditer(content):
+        target = match.group(1).strip()
+        if target and target not in targets:
+            targets.append(target)
+    return targets
+
+
+def link_key(target: str) -> str:
+    """
+    The name a link target or file is matched by: its basename without the markdown extension, case insensitive (as
+    Obsidian resolves links).
+
+    Args:
+        target (str): A link target (e.g., "folder/Some Note.md") or a file path.
+
+    Returns:
+        (str): The key.
+    """
+    name = os.path.basename(target.replace("\\", "/"))
+    if name.endswith(task_extension) or name.endswith(note_extension):
+        name = os.path.splitext(name)[0]
+    return name.strip().lower()
+
+
+class LinkGraph:
+    def __init__(self, root: str, path: Union[str, None] = None):
+        """
+        A graph of the wiki links ([[name]]) between the tasks and notes of a root.
+
+        The links of each file are persisted in a JSON file in the dex cache directory (one per root), along with the
+        modification time and size of the file. update re-reads only files which changed, so queries (outlinks,
+        backlinks, neighbors, orphans) never require re-reading every file. Documents are identified by their paths.
+
+        Args:
+            root (str): The path of the root (executor) directory.
+            path (str): The path of the JSON file. Defaults to a file named by the hash of the root in the "links" dir
+                of the dex cache directory.
+        """
+        self.root = os.path.abspath(root)
+        if path is None:
+            path = os.path.join(get_cache_dir(links_cache_subdir), hash_str(self.root) + ".json")
+        self.path = os.path.abspath(path)
+
+        # {doc path: (mtime_ns, size, [link targets])}
+        self._docs = {}
+        try:
+            with open(self.path, "r") as f:
+                self._docs = {doc: (mtime_ns, size, targets) for doc, (mtime_ns, size, targets) in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            pass
+        self._build()
+
+    def __str__(self):
+        return f"<dex LinkGraph {self.root} | {len(self._docs)} documents>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc: str) -> bool:
+        return os.path.abspath(doc) in self._docs
+
+    def update(self, projects: Iterable) -> Tuple[int, int]:
+        """
+        Bring the graph up to date with the task and note files of projects, re-reading only files whose modification
+        time or size changed. The graph is saved if anything changed.
+
+        Args:
+            projects ([Project]): The projects of the root. Files of projects not given are dropped from the graph.
+
+        Returns:
+            (int, int): The number of documents (re)parsed and the number removed.
+        """
+        on_disk = {}
+        for p in projects:
+            for directory, extension in ((p.tasks_dir, task_extension), (p.inactive_dir, task_extension),
+                                         (p.notes_dir, note_extension)):
+                if not os.path.isdir(directory):
+                    continue
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(extension) and entry.is_file():
+                            st = entry.stat()
+                            on_disk[os.path.abspath(entry.path)] = (st.st_mtime_ns, st.st_size)
+
+        removed = [doc for doc in self._docs if doc not in on_disk]
+        for doc in removed:
+            del self._docs[doc]
+
+        n_parsed = 0
+        for doc, (mtime_ns, size) in on_disk.items():
+            if doc in self._docs and self._docs[doc][:2] == (mtime_ns, size):
+                continue
+            try:
+                with open(doc, "r") as f:
+                    targets = parse_links(f.read())
+            except (OSError, UnicodeDecodeError):
+                targets = []
+            self._docs[doc] = (mtime_ns, size, targets)
+            n_parsed += 1
+
+        if n_parsed or removed:
+            self._build()
+            self.save()
+        return n_parsed, len(removed)
+
+    def save(self) -> None:
+        """
+        Write the graph to its JSON file.
+
+        Returns:
+            None
+        """
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump({doc: list(v) for doc, v in self._docs.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, target: str, source: Union[str, None] = None) -> Union[str, None]:
+        """
+        Find the document a link target refers to.
+
+        Args:
+            target (str): The link target (e.g., "Some Note" from [[Some Note]]).
+            source (str): The path of the document containing the link. If several documents have the target's name,
+                one in the same project folder is preferred.
+
+        Returns:
+            (str or None): The path of the document, or None if no document has the target's name.
+        """
+        candidates = self._by_key.get(link_key(target))
+        if not candidates:
+            return None
+        if source is not None and len(candidates) > 1:
+            project = self._project_of(source)
+            for candidate in candidates:
+                if self._project_of(candidate) == project:
+                    return candidate
+        return candidates[0]
+
+    def outlinks(self, doc: str) -> List[str]:
+        """
+        The documents a document links to.
+
+        Args:
+            doc (str): The path of the document.
+
+        Returns:
+            ([str]): Paths of linked documents, in order of the links.
+        """
+        return list(self._out.get(os.path.abspath(doc), ()))
+
+    def unresolved(self, doc: str) -> List[str]:
+        """
+        The link targets of a document which do not match any document.
+
+        Args:
+            doc (str): The path of the document.
+
+        Returns:
+            ([str]): The unresolved link targets.
+        """
+        doc = os.path.abspath(doc)
+        targets = self._docs[doc][2] if doc in self._docs else []
+        return [target for target in targets if self.resolve(target, doc) is None]
+
+    def backlinks(self, doc: str) -> List[str]:
+        """
+        The documents linking to a document.
+
+        Args:
+            doc (str): The path of the document.
+
+        Returns:
+            ([str]): Paths of linking documents, sorted.
+        """
+        return sorted(self._in.get(os.path.abspath(doc), ()))
+
+    def neighbors(self, doc: str) -> List[str]:
+        """
+        The documents linked to or from a document.
+
+        Args:
+            doc (str): The path of the document.
+
+        Returns:
+            ([str]): Paths of neighboring documents, sorted.
+        """
+        doc = os.path.abspath(doc)
+        return sorted(set(self._out.get(doc, ())) | self._in.get(doc, set()))
+
+    def orphans(self) -> List[str]:
+        """
+        The documents which neither link to nor are linked from any other document.
+
+        Returns:
+            ([str]): Paths of orphaned documents, sorted.
+        """
+        return sorted(doc for doc in self._docs if not self._out.get(doc) and not self._in.get(doc))
+
+    def _build(self) -> None:
+        # Resolution of link names and the forward and reverse adjacency are kept in memory only; they are rebuilt
+        # from the persisted links of each document without reading any files
+        self._by_key = {}
+        for doc in sorted(self._docs):
+            self._by_key.setdefault(link_key(doc), []).append(doc)
+
+        self._out: Dict[str, List[str]] = {}
+        self._in: Dict[str, Set[str]] = {}
+        for doc, (_, _, targets) in self._docs.items():
+            linked = []
+            for target in targets:
+                resolved = self.resolve(target, doc)
+                if resolved is not None and resolved != doc and resolved not in linked:
+                    linked.append(resolved)
+                    self._in.setdefault(resolved, set()).add(doc)
+            self._out[doc] = linked
+
+    def _project_of(self, doc: str) -> str:
+        # Documents are <root>/<project>/(tasks|notes)/..., so the project is the first dir below the root
+        relative = os.path.relpath(doc, self.root)
+        return relative.split(os.sep)[0]
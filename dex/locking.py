@@ -0,0 +1,98 @@
+import os
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (e.g., on Windows), so concurrent dex processes are not guarded against each other
+    fcntl = None
+
+from dex.constants import locks_dirname, project_lock_fname, inactive_subdir, journal_lock_fname
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive advisory (fcntl) lock on a lock file, waiting until no other process (or other open file in this
+    process) holds it. The lock file and its directory are created if needed and never removed; the lock is released
+    when the context exits, or when the process dies.
+
+    Locks are not re-entrant: locking the same file again while holding it waits forever.
+
+    Args:
+        path (str): The path of the lock file.
+
+    Returns:
+        None
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+def tasks_dir_of(path: str) -> str:
+    """
+    The tasks dir of a project holding a task file, whether the file is in the active or the inactive dir.
+
+    Args:
+        path (str): The path of the task file.
+
+    Returns:
+        (str): The tasks dir.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    return os.path.dirname(directory) if os.path.basename(directory) == inactive_subdir else directory
+
+
+def task_lock(path: str):
+    """
+    Lock a task (see Task._locked) against changes by other processes. The lock is keyed by the task's file name, which
+    does not change when the task's status moves its file between the active and inactive dirs, so changes of
+    different tasks never wait for each other.
+
+    Args:
+        path (str): The path of the task file.
+
+    Returns:
+        A context manager holding the lock.
+    """
+    return file_lock(os.path.join(tasks_dir_of(path), locks_dirname, f"{os.path.basename(path)}.lock"))
+
+
+def project_lock(tasks_dir: str):
+    """
+    Lock a project's tasks dir against other processes creating or renaming tasks in it at the same time, so they do
+    not allocate the same dexid or take the same file name. To avoid deadlocks, the project lock is always taken before
+    any task lock.
+
+    Args:
+        tasks_dir (str): The tasks dir of the project.
+
+    Returns:
+        A context manager holding the lock.
+    """
+    return file_lock(os.path.join(tasks_dir, locks_dirname, project_lock_fname))
+
+
+def journal_lock(path: str):
+    """
+    Lock a root's journal against other processes appending to or compacting it at the same time, so they do not
+    allocate the same seq or mark each other's changes compacted (see dex.journal.Journal.locked). The lock file is
+    kept in the root itself, not in a locks dir, since any directory in the root is taken for a project. To avoid
+    deadlocks, the journal lock is always taken before any project or task lock.
+
+    Args:
+        path (str): The path of the journal file.
+
+    Returns:
+        A context manager holding the lock.
+    """
+    return file_lock(os.path.join(os.path.dirname(os.path.abspath(path)), journal_lock_fname))
@@ -1,44 +1,113 @@
-import random
-from typing import List
+import heapq
+from typing import Callable, Iterable, List, Union
 
 from dex.task import Task
 from dex.util import AttrDict
 
 
-def rank_tasks(task_collection: AttrDict, limit: int = 0, include_inactive: bool = False) -> List[Task]:
+def rank_tasks(task_collection: AttrDict, limit: int = 0, include_inactive: bool = False, offset: int = 0,
+               is_blocked: Union[Callable[[Task], bool], None] = None) -> List[Task]:
     """
         Order a task collection
 
     1. remove abandoned and done tasks
     2. deprioritize held tasks
-    3. rank todo and ip tasks by computed priority
+    3. deprioritize blocked todo and ip tasks even further, if is_blocked is given
+    4. rank todo and ip tasks by computed priority
+
+    When a limit is given, only the top (offset + limit) tasks are ever selected, so the full collection does not need
+    to be sorted.
 
     Args:
         task_collection (AttrDict): A collection of Tasks in dict/attr format with keys of status primitives.
         limit (int): Max number of tasks to return 
         include_inactive (bool): If True, includes the inactive (abandoned+done) tasks in the returned list
+        offset (int): Number of top ranked tasks to skip (e.g., for pagination)
+        is_blocked (callable): Function of a task returning whether it is blocked by other tasks (see
+            dex.dependency.DependencyGraph.is_blocked). Blocked tasks are ranked after held tasks.
 
     Returns:
         [Task]: A list of ranked tasks.
     """
 
     # most important is low index
-
-    if include_inactive:
-        done_ordered = sorted(task_collection.done, key=lambda x: x.priority, reverse=True)
-        random.shuffle(task_collection.abandoned)
-        ordered = done_ordered + task_collection.abandoned
+    # Groups are (tasks, ranked by priority); abandoned tasks are ordered by dexid, so pages do not overlap
+    active = task_collection.todo + task_collection.ip
+    if is_blocked is None:
+        groups = [(active, True), (task_collection.hold, True)]
     else:
-        ordered = []
+        blocked = [t for t in active if is_blocked(t)]
+        unblocked = [t for t in active if not is_blocked(t)]
+        groups = [(unblocked, True), (task_collection.hold, True), (blocked, True)]
+    if include_inactive:
+        groups += [(task_collection.done, True), (task_collection.abandoned, False)]
 
-    hold_ordered = sorted(task_collection.hold, key=lambda x: x.priority, reverse=True)
-    ordered = hold_ordered + ordered
+    n_needed = offset + limit if limit else None
+    ordered = []
+    for tasks, by_priority in groups:
+        n_remaining = len(tasks) if n_needed is None else min(n_needed - len(ordered), len(tasks))
+        if n_remaining <= 0:
+            continue
+        if not by_priority:
+            ordered += sorted(tasks, key=lambda x: x.dexid)[:n_remaining]
+        elif n_remaining < len(tasks):
+            ordered += heapq.nlargest(n_remaining, tasks, key=lambda x: x.priority)
+        else:
+            ordered += sorted(tasks, key=lambda x: x.priority, reverse=True)
+    return ordered[offset:]
 
-    todo_and_ip = sorted(task_collection.todo + task_collection.ip, key=lambda x: x.priority, reverse=True)
 
-    ordered = todo_and_ip + ordered
+def select_tasks_within_budget(tasks: Iterable[Task], budget: int) -> List[Task]:
+    """
+    Select the set of tasks with the maximum total computed priority whose total effort fits within a budget
+    (a 0/1 knapsack over effort).
 
-    if limit:
-        return ordered[:limit]
-    else:
-        return ordered
\ No newline at end of file
+    Efforts are small integers, so candidates are first pruned by dominance: at most budget // e tasks of effort e can
+    ever be selected, and those are always the highest priority tasks of that effort. This bounds the candidates by
+    roughly 2.3 * budget regardless of how many tasks there are, before solving exactly with dynamic programming over
+    the budget.
+
+    Args:
+        tasks ([Task]): The candidate tasks.
+        budget (int): The maximum total effort of the selected tasks.
+
+    Returns:
+        [Task]: The selected tasks, ordered by computed priority.
+    """
+    if budget < 1:
+        return []
+
+    by_effort = {}
+    for t in tasks:
+        by_effort.setdefault(t.effort, []).append(t)
+    candidates = []
+    for effort, same_effort in by_effort.items():
+        if effort <= budget:
+            candidates += heapq.nlargest(budget // effort, same_effort, key=lambda x: x.priority)
+    candidates = [(t, t.priority) for t in candidates]
+    candidates = [(t, p) for t, p in candidates if p > 0]
+
+    # The table is never wider than the total effort of the candidates: a budget of at least that selects them all
+    if sum(t.effort for t, _ in candidates) <= budget:
+        return sorted((t for t, _ in candidates), key=lambda x: x.priority, reverse=True)
+
+    # best[b] is the max total priority using at most b effort; taken[i][b] records whether candidate i was used
+    best = [0.0] * (budget + 1)
+    taken = []
+    for t, priority in candidates:
+        took = bytearray(budget + 1)
+        for b in range(budget, t.effort - 1, -1):
+            with_t = best[b - t.effort] + priority
+            if with_t > best[b]:
+                best[b] = with_t
+                took[b] = 1
+        taken.append(took)
+
+    selected = []
+    b = budget
+    for i in range(len(candidates) - 1, -1, -1):
+        if taken[i][b]:
+            t = candidates[i][0]
+            selected.append(t)
+            b -= t.effort
+    return sorted(selected, key=lambda x: x.priority, reverse=True)
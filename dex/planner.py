@@ -0,0 +1,197 @@
+import bisect
+import datetime
+import itertools
+from typing import Callable, Iterable, List, Tuple, Union
+
+from dex.task import Task
+from dex.constants import executor_all_projects_key, ip_str, todo_str
+
+
+planned_statuses = (todo_str, ip_str)
+
+
+class Planner:
+    def __init__(self, executor_week: dict, capacity: int, project_ids: Iterable[str], days: int = 7,
+                 start: Union[datetime.date, None] = None):
+        """
+        A capacity-aware planner assigning active tasks to the days their project is scheduled on.
+
+        Tasks are placed in order of computed priority (ties broken by due date), each on the earliest day which is
+        scheduled for its project and still has enough capacity left for the task's effort. Because a task's placement
+        only depends on the tasks ranked above it, changing a single task (see update) only re-places the tasks from
+        that task's old or new rank onwards, instead of planning from scratch.
+
+        Args:
+            executor_week (dict): The weekly schedule of the executor, mapping day names to project ids (or "all").
+            capacity (int): The total effort which can be done each day.
+            project_ids ([str]): All the project ids (used for days scheduled as "all").
+            days (int): The number of days to plan, starting from the start date.
+            start (datetime.date): The first day of the plan. Defaults to today.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be a positive amount of effort per day, not {capacity}")
+        self.capacity = capacity
+        self.start = datetime.date.today() if start is None else start
+        self.dates = [self.start + datetime.timedelta(days=i) for i in range(days)]
+        self.today_ordinal = self.start.toordinal()
+
+        project_ids = list(project_ids)
+        self._project_days = {pid: [] for pid in project_ids}
+        for i, date in enumerate(self.dates):
+            scheduled = executor_week.get(date.strftime("%A"), [])
+            scheduled = project_ids if scheduled == executor_all_projects_key else scheduled
+            for pid in scheduled:
+                if pid in self._project_days:
+                    self._project_days[pid].append(i)
+
+        self._order = []         # sorted [(key, task id)], highest priority first
+        self._keys = {}          # task id: key in self._order
+        self._tasks = {}         # task id: task
+        self._project_ids = {}   # task id: project id
+        self._assignments = {}   # task id: day index, or None if the task could not be placed
+        self._placed_efforts = {}   # task id: effort taken from its day (tasks are already changed when notifying)
+        self._remaining = [capacity] * len(self.dates)
+
+    def __str__(self):
+        n_planned = sum(1 for day in self._assignments.values() if day is not None)
+        return f"<dex Planner {self.dates[0]} to {self.dates[-1]} | {n_planned}/{len(self._order)} tasks planned>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def plan(self, tasks: Iterable[Tuple[Task, str]]) -> None:
+        """
+        Plan tasks from scratch.
+
+        Args:
+            tasks ([(Task, str)]): (task, project id) pairs. Only todo and in-progress tasks are planned.
+
+        Returns:
+            None
+        """
+        self._order, self._keys, self._tasks, self._project_ids = [], {}, {}, {}
+        for task, project_id in tasks:
+            if task.status in planned_statuses:
+                self._order.append((self._track(task, project_id), id(task)))
+        self._order.sort()
+        self._assignments, self._placed_efforts = {}, {}
+        self._remaining = [self.capacity] * len(self.dates)
+        self._place_from(0)
+
+    def update(self, task: Task, project_id: Union[str, None] = None, select: Union[Callable, None] = None) -> None:
+        """
+        Replan incrementally after a single task has changed (or been created).
+
+        Args:
+            task (Task): The task, in its new state.
+            project_id (str): The task's project id. Only required for tasks not yet known to the planner.
+            select (callable): Function of (task, project id) returning whether the task should be planned at all.
+
+        Returns:
+            None
+        """
+        tid = id(task)
+        positions = []
+        if tid in self._keys:
+            old_position = bisect.bisect_left(self._order, (self._keys[tid], tid))
+            self._unplace_from(old_position)
+            del self._order[old_position]
+            del self._keys[tid]
+            positions.append(old_position)
+            project_id = self._project_ids.pop(tid)
+            del self._tasks[tid]
+
+        if task.status in planned_statuses and project_id is not None and \
+                (select is None or select(task, project_id)):
+            key = self._track(task, project_id)
+            new_position = bisect.bisect_left(self._order, (key, tid))
+            self._unplace_from(new_position)
+            self._order.insert(new_position, (key, tid))
+            positions.append(new_position)
+
+        if positions:
+            self._place_from(min(positions))
+
+    def listener(self, project_id: str, select: Union[Callable, None] = None):
+        """
+        Get a Task listener (see Task._notify) for a project, replanning whenever one of its tasks changes.
+
+        Args:
+            project_id (str): The project id
+            select (callable): Function of (task, project id) returning whether a task should be planned at all.
+
+        Returns:
+            callable
+        """
+        def listener(task, event, old, new):
+            # Deleted tasks are planned as if they were no longer selected
+            self.update(task, project_id, select=(lambda t, pid: False) if event == "deleted" else select)
+        return listener
+
+    @property
+    def days(self) -> List[Tuple[datetime.date, List[Task]]]:
+        """
+        The plan, day by day.
+
+        Returns:
+            [(datetime.date, [Task])]: Each date with the tasks planned on it, in order of priority.
+        """
+        days = [(date, []) for date in self.dates]
+        for _, tid in self._order:
+            day = self._assignments[tid]
+            if day is not None:
+                days[day][1].append(self._tasks[tid])
+        return days
+
+    @property
+    def unplanned(self) -> List[Task]:
+        """
+        Active tasks which did not fit in the plan, in order of priority.
+
+        Returns:
+            [Task]
+        """
+        return [self._tasks[tid] for _, tid in self._order if self._assignments[tid] is None]
+
+    def planned_date(self, task: Task) -> Union[datetime.date, None]:
+        day = self._assignments.get(id(task))
+        return None if day is None else self.dates[day]
+
+    def load(self, date: datetime.date) -> int:
+        """
+        The total effort planned on a date.
+        """
+        return self.capacity - self._remaining[self.dates.index(date)]
+
+    def _track(self, task: Task, project_id: str) -> tuple:
+        tid = id(task)
+        key = (-self._priority(task), task.due.toordinal(), task.dexid)
+        self._keys[tid] = key
+        self._tasks[tid] = task
+        self._project_ids[tid] = project_id
+        return key
+
+    def _priority(self, task: Task) -> float:
+        # Same as Task.priority for active tasks, with today fixed to the start of the plan
+        d = task.due.toordinal() - self.today_ordinal
+        d = 0.5 if d < 1 else d
+        s_factor = 1.2 if task.status == ip_str else 1
+        return task.importance ** 2 * s_factor * task.effort / d
+
+    def _place_from(self, position: int) -> None:
+        for _, tid in itertools.islice(self._order, position, None):
+            effort = self._tasks[tid].effort
+            for day in self._project_days.get(self._project_ids[tid], []):
+                if self._remaining[day] >= effort:
+                    self._remaining[day] -= effort
+                    self._assignments[tid] = day
+                    self._placed_efforts[tid] = effort
+                    break
+            else:
+                self._assignments[tid] = None
+
+    def _unplace_from(self, position: int) -> None:
+        for _, tid in itertools.islice(self._order, position, None):
+            day = self._assignments.pop(tid, None)
+            if day is not None:
+                self._remaining[day] += self._placed_efforts.pop(tid)
@@ -1,20 +1,27 @@
 import os
+import json
+import time
+import tempfile
 import datetime
 import copy
-from typing import List
+from typing import Iterable, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 
 from dex.util import AttrDict
 
 from dex.note import Note
-from dex.task import Task
-from dex.constants import abandoned_str, done_str, inactive_subdir, status_primitives, tasks_subdir, notes_subdir, \
-    valid_project_ids, task_extension, note_extension
-from dex.exceptions import DexException, FileOverwriteError, DexcodeException
+from dex.task import Task, check_flags_valid, check_name_valid, sync_directory, write_counts
+from dex.archive import Archive
+from dex.locking import project_lock
+from dex.constants import abandoned_str, done_str, todo_str, ip_str, hold_str, inactive_subdir, status_primitives, tasks_subdir, notes_subdir, \
+    valid_project_ids, task_extension, note_extension, effort_primitives, importance_primitives, bulk_write_workers, \
+    project_ids_fname, archive_fname
+from dex.exceptions import DexException, FileOverwriteError, DexcodeException, ReadOnlyException
 
 
 class Project:
-    def __init__(self, path: str, id: str, tasks: List[Task], notes: List[Note]):
+    def __init__(self, path: str, id: str, tasks: List[Task], notes: List[Note], read_only: bool = False):
         """
         The Project object, representing a long-standing collection of tasks and notes.
 
@@ -23,9 +30,11 @@ class Project:
             id (str): The alphabetic single character representing this project's id.
             tasks ([Task]): A list of task objects belonging to this project.
             notes ([Note]): A list of note objects belonging to this project.
+            read_only (bool): If True, the project never changes any files or directories: missing directories are not
+                created, and creating, renaming or changing tasks raises ReadOnlyException.
         """
         path = os.path.abspath(path)
-        if not os.path.isdir(path):
+        if not os.path.isdir(path) and not read_only:
             os.makedirs(path)
 
         self.path = os.path.abspath(path)
@@ -36,9 +45,31 @@ class Project:
         self._tasks = tasks
         self._notes = notes
 
+        self.read_only = read_only
+        for t in self._tasks:
+            t.read_only = read_only
+
+        # Dexids of tasks whose project id does not match this project's id, and which were not coerced to it
+        self.pid_mismatches = []
+        # Old dexid: new dexid of tasks which were coerced to this project's id
+        self.coerced_dexids = {}
+
+        # Listeners of changes to any of this project's tasks; see Task._notify
+        self.listeners = []
+        for t in self._tasks:
+            t.listeners = self.listeners
+
         self.notes_dir = os.path.join(self.path, notes_subdir)
         self.tasks_dir = os.path.join(self.path, tasks_subdir)
         self.inactive_dir = os.path.join(self.tasks_dir, inactive_subdir)
+        self._archive = None
+
+        # Whether the inactive tasks are loaded (see load_inactive), and whether to coerce their project ids then
+        self._inactive_loaded = True
+        self._coerce_pid_mismatches = False
+
+        # Stats of task files which could not be parsed on refresh, so they are not re-read until they change
+        self._unparsed_files = {}
 
     def __str__(self):
         n_tasks = len(self.tasks.all)
@@ -48,7 +79,7 @@ class Project:
         return self.__str__()
 
     @classmethod
-    def from_files(cls, path: str, id: str, coerce_pid_mismatches=False):
+    def from_files(cls, path: str, id: str, coerce_pid_mismatches=False, read_only=False, load_inactive=True):
         """
         Generate a Project object from existing files.
 
@@ -57,11 +88,14 @@ class Project:
             id (str): a single alphabetic character representing the project id. Must be unique
             coerce_pid_mismatches (bool): If True, will coerce existing tasks with mismatching project ids to match
                 this project's id.
+            read_only (bool): If True, nothing is written: missing subdirs are treated as empty instead of created,
+                and tasks with mismatching project ids are only reported (see pid_mismatches), never coerced.
+            load_inactive (bool): If False, the inactive (done and abandoned) tasks are not loaded until they are
+                first needed (see load_inactive).
 
         Returns:
             Project object
         """
-        tasks = []
         notes = []
 
         path = os.path.abspath(path)
@@ -69,20 +103,15 @@ class Project:
         notes_dir = os.path.join(path, notes_subdir)
         inactive_dir = os.path.join(tasks_dir, inactive_subdir)
 
-        for subdir in (notes_dir, inactive_dir):
-            if not os.path.exists(subdir):
-                os.makedirs(subdir, exist_ok=False)
+        if not read_only:
+            for subdir in (notes_dir, inactive_dir):
+                if not os.path.exists(subdir):
+                    os.makedirs(subdir, exist_ok=False)
 
-        for taskdir in (tasks_dir, inactive_dir):
-            for ft in os.listdir(taskdir):
-                f_full = os.path.abspath(os.path.join(taskdir, ft))
-                if f_full.endswith(task_extension):
-                    try:
-                        t = Task.from_file(f_full)
-                        tasks.append(t)
-                    except DexcodeException:
-                        warnings.warn(f"File {f_full} has no dexcode. Please remove this file or make it into a task.")
+        tasks = tasks_from_files(tasks_dir)
 
+        pid_mismatches = []
+        coerced_dexids = {}
         for task in tasks:
             project_id = task.dexid[0]
             number_task_id = int(task.dexid[1:])
@@ -90,17 +119,83 @@ class Project:
                 warnings.warn(
                     f"Task {task.dexid} does not have project id matching project {id}: {path}."
                 )
-                if coerce_pid_mismatches:
+                if coerce_pid_mismatches and not read_only:
                     warnings.warn(f"Converting task {task.dexid} to project {id}!")
+                    coerced_dexids[task.dexid] = f"{id}{number_task_id}"
                     task.set_dexid(f"{id}{number_task_id}")
+                else:
+                    pid_mismatches.append(task.dexid)
+
+        if os.path.isdir(notes_dir):
+            for fn in os.listdir(notes_dir):
+                n_full = os.path.abspath(os.path.join(notes_dir, fn))
+                if n_full.endswith(note_extension):
+                    n = Note.from_file(n_full)
+                    notes.append(n)
+
+        project = cls(path, id, tasks, notes, read_only=read_only)
+        project.pid_mismatches = pid_mismatches
+        project.coerced_dexids = coerced_dexids
+        project._inactive_loaded = False
+        project._coerce_pid_mismatches = coerce_pid_mismatches
+        if load_inactive:
+            project.load_inactive()
+        return project
+
+    def load_inactive(self) -> List[Task]:
+        """
+        Load the inactive (done and abandoned) tasks, if they were not loaded yet (see from_files): the task files in
+        the inactive dir are parsed, and archived tasks are read from the archive's index. Listeners are notified with
+        "created" for each task. Accessing the inactive tasks (e.g., tasks.done or tasks.all) loads them
+        automatically.
 
-        for fn in os.listdir(notes_dir):
-            n_full = os.path.abspath(os.path.join(notes_dir, fn))
-            if n_full.endswith(note_extension):
-                n = Note.from_file(n_full)
-                notes.append(n)
+        Returns:
+            ([Task]): The tasks loaded.
+        """
+        if self._inactive_loaded:
+            return []
+        self._inactive_loaded = True
+        tasks = tasks_from_files(self.inactive_dir)
+        # Archived tasks are only read from the archive's index. A task file with the same name takes precedence, in
+        # case dex stopped between writing an unarchived task's file and removing it from the archive.
+        filenames = {t.relative_filename for t in self._tasks + tasks}
+        tasks += self.archive.tasks(skip=filenames)
+        for t in tasks:
+            self._add_task(t, self._coerce_pid_mismatches)
+        return tasks
 
-        return cls(path, id, tasks, notes)
+    @property
+    def archive(self) -> Archive:
+        """
+        The archive of the project's archived inactive tasks (see archive_tasks). Its index is read on first access.
+        """
+        if self._archive is None:
+            self._archive = Archive(self.inactive_dir)
+        return self._archive
+
+    @property
+    def loaded_tasks(self) -> List[Task]:
+        """
+        The tasks loaded so far, without loading the inactive tasks (unlike tasks.all).
+        """
+        return list(self._tasks)
+
+    def get_task(self, dexid: str) -> Union[Task, None]:
+        """
+        Get a task by its dexid. The inactive tasks are only loaded if no loaded task has the dexid.
+
+        Args:
+            dexid (str): The dexid, e.g. "a3".
+
+        Returns:
+            (Task or None): The task, or None if no task has the dexid.
+        """
+        for t in self._tasks:
+            if t.dexid == dexid:
+                return t
+        if self.load_inactive():
+            return self.get_task(dexid)
+        return None
 
     @classmethod
     def new(cls, path: str, id: str):
@@ -126,7 +221,9 @@ class Project:
 
     def rename(self, new_name: str) -> None:
         """
-        Rename a project. Should be used atomically (i.e., called, then object remade using .from_files()
+        Rename a project. The paths of the loaded tasks and notes (and of the archive) are rebased in memory, so the
+        project can still be used afterwards without loading it again. Its id is kept, also when the root is loaded
+        again: the id assigned to its folder in the root (see read_project_ids) moves to the new name.
 
         Args:
             new_name (str): The name of the new project.
@@ -134,12 +231,90 @@ class Project:
         Returns:
             None
         """
-
-        # todo: this must be used atomically, as the states of all tasks will differ from files after...
-        containing_folder = os.path.join(self.path, os.pardir)
-        new_path = os.path.join(containing_folder, new_name)
-        os.rename(self.path, new_path)
+        self._check_writable()
+        if not new_name or os.sep in new_name:
+            raise DexException(f"'{new_name}' is not a valid project name.")
+        new_path = os.path.join(os.path.dirname(self.path), new_name)
+        if os.path.exists(new_path):
+            raise FileOverwriteError(f"Cannot rename project to {new_name}: {new_path} already exists.")
+        # Tasks are not created in the project while it moves
+        with project_lock(self.tasks_dir):
+            os.rename(self.path, new_path)
+        root = os.path.dirname(self.path)
+        project_ids = read_project_ids(root)
+        if project_ids is not None and self.name in project_ids:
+            project_ids = {new_name if name == self.name else name: pid for name, pid in project_ids.items()}
+            write_project_ids(root, project_ids)
+
+        old_path = self.path
         self.path = new_path
+        self.name = new_name
+        self.notes_dir = os.path.join(self.path, notes_subdir)
+        self.tasks_dir = os.path.join(self.path, tasks_subdir)
+        self.inactive_dir = os.path.join(self.tasks_dir, inactive_subdir)
+        if self._archive is not None:
+            self._archive.directory = self.inactive_dir
+            self._archive.path = os.path.join(self.inactive_dir, os.path.basename(self._archive.path))
+        for t in self._tasks:
+            t.path = rebase_path(t.path, old_path, new_path)
+            t.disk_path = rebase_path(t.disk_path, old_path, new_path)
+            t.prefix_path = rebase_path(t.prefix_path, old_path, new_path)
+        for n in self._notes:
+            n.path = rebase_path(n.path, old_path, new_path)
+
+    def move_task(self, task: Task, project) -> Task:
+        """
+        Move a task of this project to another project: its file is moved to the other project's tasks (or inactive)
+        dir and it gets a new dexid there, allocated as for create_new_task. The task object is kept; listeners of
+        this project are notified with "deleted" (with the old dexid) and listeners of the other project with
+        "created".
+
+        Both projects are locked (see dex.locking.project_lock), always in the same order (by path) so two processes
+        moving tasks in opposite directions cannot each wait for the other.
+
+        Args:
+            task (Task): The task.
+            project (Project): The project to move it to.
+
+        Returns:
+            (Task): The task.
+        """
+        self._check_writable()
+        project._check_writable()
+        if task not in self._tasks:
+            raise DexException(f"Task {task.dexid} is not in project {self.id}.")
+        if project is self:
+            raise DexException(f"Task {task.dexid} is already in project {self.id}.")
+        # The new dexid must not reuse the dexid of any inactive task
+        project.load_inactive()
+        if task.archive is not None:
+            task.flush()
+
+        first, second = sorted((self, project), key=lambda p: p.tasks_dir)
+        with project_lock(first.tasks_dir), project_lock(second.tasks_dir), task._locked():
+            is_inactive = task.status in (done_str, abandoned_str)
+            new_prefix_path = project.inactive_dir if is_inactive else project.tasks_dir
+            new_path = os.path.join(new_prefix_path, task.relative_filename)
+            taken = {t.relative_filename for t in project._tasks}
+            if task.relative_filename in taken or any(
+                    os.path.exists(os.path.join(d, task.relative_filename))
+                    for d in (project.tasks_dir, project.inactive_dir)):
+                raise FileOverwriteError(f"Task already exists with the name {task.name} in project {project.id}.")
+
+            all_task_numbers = [int(t.dexid[1:]) for t in project._tasks] + project._unloaded_task_numbers()
+            new_dexid = f"{project.id}{max(all_task_numbers) + 1 if all_task_numbers else 1}"
+            os.makedirs(new_prefix_path, exist_ok=True)
+            os.rename(task.disk_path, new_path)
+            # Removed before the dexid changes, so listeners can find the task by its old dexid
+            self._remove_task(task)
+            task.path = task.disk_path = new_path
+            task.prefix_path = new_prefix_path
+            task.dexid = new_dexid
+            task.flush()
+        project._tasks.append(task)
+        task.listeners = project.listeners
+        task._notify("created", None, task)
+        return task
 
     def create_new_task(self, name: str,
                         effort: int,
@@ -152,6 +327,11 @@ class Project:
         """
         Can be used non atomically. Arguments are mostly the same as for Task.
 
+        The project is locked (see dex.locking.project_lock) while the dexid is allocated and the task file is written,
+        so dex processes creating tasks at the same time never allocate the same dexid or name. Task files created by
+        other processes since the project was loaded are taken into account. With edit_content, the lock is held
+        while the editor is open.
+
         Args:
             name (str): The name of the new task. Will be converted to a path by Project for use with Task.
             effort:
@@ -165,23 +345,292 @@ class Project:
             Task (the created task).
         """
 
+        self._check_writable()
+        check_name_valid(name)
+        # New dexids must not reuse the dexid of any inactive task
+        self.load_inactive()
         fname = name + task_extension
         path = os.path.join(os.path.join(self.path, tasks_subdir), fname)
 
         if status in (abandoned_str, done_str):
             raise DexException("Cannot make a new task with an initially inactive status!")
 
-        if path in [t.path for t in self.tasks.all]:
-            raise FileOverwriteError(f"Task already exists with the name: {name}")
+        with project_lock(self.tasks_dir):
+            if path in [t.path for t in self.tasks.all] or os.path.exists(path):
+                raise FileOverwriteError(f"Task already exists with the name: {name}")
 
-        all_task_numbers = [int(copy.deepcopy(t.dexid).replace(self.id, "")) for t in self._tasks]
-        max_task_numbers = max(all_task_numbers) if all_task_numbers else 0
-        new_task_number = max_task_numbers + 1
-        new_task_id = f"{self.id}{new_task_number}"
-        t = Task.new(new_task_id, path, effort, due, importance, status, flags, edit_content=edit_content)
+            all_task_numbers = [int(copy.deepcopy(t.dexid).replace(self.id, "")) for t in self._tasks]
+            all_task_numbers += self._unloaded_task_numbers()
+            max_task_numbers = max(all_task_numbers) if all_task_numbers else 0
+            new_task_number = max_task_numbers + 1
+            new_task_id = f"{self.id}{new_task_number}"
+            t = Task.new(new_task_id, path, effort, due, importance, status, flags, edit_content=edit_content)
         self._tasks.append(t)
+        t.listeners = self.listeners
+        t._notify("created", None, t)
         return t
 
+    def bulk_create_tasks(self, specs: List[dict],
+                          workers: int = bulk_write_workers) -> List[Tuple[Union[Task, None], Union[str, None]]]:
+        """
+        Create many tasks at once (e.g., importing them from another tool, see dex.batch.run_import). Unlike calling
+        create_new_task for each task, every spec is validated before anything is written, the dexids of all the new
+        tasks are allocated in one step, the files are written by a pool of threads and each tasks directory is synced
+        to disk once at the end. Invalid specs do not stop the valid ones from being created.
+
+        Tasks may be created done or abandoned (e.g., to keep the history of an imported tool), in the inactive dir.
+        The project is locked (see dex.locking.project_lock) from allocating the dexids until all files are written.
+
+        Args:
+            specs ([dict]): The tasks, as dicts with keys "name", "effort", "due" (datetime.datetime), "importance",
+                and optionally "status" (todo if not given), "flags" (["n"] if not given) and "content".
+            workers (int): The number of threads writing files.
+
+        Returns:
+            [(Task or None, str or None)]: For each spec, in order, the created task, or None and an error message.
+        """
+        self._check_writable()
+        self.load_inactive()
+        errors = [self._check_task_spec(spec) for spec in specs]
+        seen = set()
+        for i, spec in enumerate(specs):
+            if errors[i] is None:
+                if spec["name"] in seen:
+                    errors[i] = f"Task '{spec['name']}' is given more than once."
+                seen.add(spec["name"])
+
+        tasks = [None] * len(specs)
+        with project_lock(self.tasks_dir):
+            existing = {os.path.splitext(t.relative_filename)[0] for t in self._tasks}
+            for taskdir in (self.tasks_dir, self.inactive_dir):
+                if os.path.isdir(taskdir):
+                    existing.update(os.path.splitext(fn)[0] for fn in os.listdir(taskdir)
+                                    if fn.endswith(task_extension))
+            for i, spec in enumerate(specs):
+                if errors[i] is None and spec["name"] in existing:
+                    errors[i] = f"Task already exists with the name: {spec['name']}"
+
+            all_task_numbers = [int(t.dexid[1:]) for t in self._tasks] + self._unloaded_task_numbers()
+            next_number = max(all_task_numbers) + 1 if all_task_numbers else 1
+            for i, spec in enumerate(specs):
+                if errors[i] is not None:
+                    continue
+                status = spec.get("status", todo_str)
+                taskdir = self.inactive_dir if status in (done_str, abandoned_str) else self.tasks_dir
+                path = os.path.join(taskdir, spec["name"] + task_extension)
+                t = Task(f"{self.id}{next_number}", path, spec["effort"], spec["due"], spec["importance"], status,
+                         spec.get("flags", ["n"]))
+                t.content = spec.get("content", "")
+                tasks[i] = t
+                next_number += 1
+
+            new_tasks = [t for t in tasks if t is not None]
+            dirs = {t.prefix_path for t in new_tasks}
+            for taskdir in dirs:
+                os.makedirs(taskdir, exist_ok=True)
+            # One chunk of tasks per thread, as submitting each file separately costs more than writing it
+            chunks = [new_tasks[i::workers] for i in range(workers)]
+            write_errors = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for chunk, chunk_errors in zip(chunks, pool.map(_write_new_tasks, chunks)):
+                    write_errors.update(zip(map(id, chunk), chunk_errors))
+            for taskdir in dirs:
+                sync_directory(taskdir)
+
+        results = []
+        for t, error in zip(tasks, errors):
+            if t is not None and write_errors[id(t)] is not None:
+                t, error = None, write_errors[id(t)]
+            results.append((t, error))
+        for t, _ in results:
+            if t is not None:
+                self._tasks.append(t)
+                t.listeners = self.listeners
+                t._notify("created", None, t)
+        write_counts["written"] += sum(t is not None for t, _ in results)
+        return results
+
+    @staticmethod
+    def _check_task_spec(spec: dict) -> Union[str, None]:
+        """
+        Validate the spec of a new task (see bulk_create_tasks).
+
+        Args:
+            spec (dict): The spec.
+
+        Returns:
+            (str): An error message, or None if the spec is valid.
+        """
+        missing = [k for k in ("name", "effort", "due", "importance") if spec.get(k) is None]
+        if missing:
+            return f"Missing {missing}."
+        try:
+            check_name_valid(spec["name"])
+        except ValueError as ve:
+            return str(ve)
+        if spec["effort"] not in effort_primitives:
+            return f"{spec['effort']} not a valid effort value {effort_primitives}"
+        if spec["importance"] not in importance_primitives:
+            return f"{spec['importance']} not a valid importance value {importance_primitives}"
+        if spec.get("status", todo_str) not in status_primitives:
+            return f"{spec['status']} not a valid status {status_primitives}"
+        if not isinstance(spec["due"], datetime.datetime):
+            return f"{spec['due']} is not a date."
+        if not spec.get("flags", ["n"]):
+            return "Tasks need at least one flag (\"n\" for none)."
+        try:
+            check_flags_valid(spec.get("flags", ["n"]))
+        except ValueError as ve:
+            return str(ve)
+        return None
+
+    def _unloaded_task_numbers(self) -> List[int]:
+        """
+        The dexid numbers of task files which are not tasks of this object, e.g. because another process created them
+        after the project was loaded. They are not added to the project (see refresh).
+
+        Returns:
+            ([int]): The numbers.
+        """
+        known = {t.disk_path for t in self._tasks}
+        numbers = []
+        for taskdir in (self.tasks_dir, self.inactive_dir):
+            if not os.path.isdir(taskdir):
+                continue
+            for fn in os.listdir(taskdir):
+                path = os.path.abspath(os.path.join(taskdir, fn))
+                if fn.endswith(task_extension) and path not in known and os.path.isfile(path):
+                    try:
+                        numbers.append(int(Task.from_file(path).dexid[1:]))
+                    except DexcodeException:
+                        continue
+        return numbers
+
+    def refresh(self, coerce_pid_mismatches: bool = False) -> bool:
+        """
+        Bring the project's tasks up to date with its files, after they were changed outside of this object (e.g., by
+        another dex process or an editor). Only the modification time and size of each file are checked; only files
+        which changed are re-read.
+
+        Changed tasks are reloaded in place (see Task.reload), new files are added as tasks (listeners are notified
+        with "created") and tasks whose files are gone are removed (listeners are notified with "deleted").
+
+        Args:
+            coerce_pid_mismatches (bool): If True, new tasks with mismatching project ids are coerced to this
+                project's id, as in from_files. Read-only projects only report them (see pid_mismatches).
+
+        Returns:
+            (bool): Whether anything changed.
+        """
+        on_disk = {}
+        for taskdir in (self.tasks_dir, self.inactive_dir):
+            if not os.path.isdir(taskdir):
+                continue
+            with os.scandir(taskdir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(task_extension) and entry.is_file():
+                        st = entry.stat()
+                        on_disk[os.path.abspath(entry.path)] = (st.st_mtime_ns, st.st_size)
+
+        # Another dex process may have archived or unarchived tasks
+        archive_changed = self._inactive_loaded and self.archive.changed_on_disk()
+        if archive_changed:
+            self.archive.load()
+
+        changed = False
+        for t in list(self._tasks):
+            if t.archive is not None:
+                if t.relative_filename not in self.archive:
+                    self._remove_task(t)
+                    changed = True
+            elif t.disk_path not in on_disk:
+                self._remove_task(t)
+                changed = True
+            elif on_disk[t.disk_path] != t.file_stat:
+                try:
+                    changed = t.reload() or changed
+                except DexcodeException:
+                    warnings.warn(f"File {t.path} has no dexcode anymore. Please fix this file or make it into a task.")
+                    t.file_stat = on_disk[t.disk_path]
+
+        known_paths = {t.disk_path for t in self._tasks if t.archive is None}
+        for path in sorted(set(on_disk.keys()) - known_paths):
+            if self._unparsed_files.get(path) == on_disk[path]:
+                continue
+            # New inactive task files are loaded with the other inactive tasks
+            if not self._inactive_loaded and os.path.dirname(path) == self.inactive_dir:
+                continue
+            try:
+                t = Task.from_file(path)
+            except DexcodeException:
+                warnings.warn(f"File {path} has no dexcode. Please remove this file or make it into a task.")
+                self._unparsed_files[path] = on_disk[path]
+                continue
+            self._unparsed_files.pop(path, None)
+            self._add_task(t, coerce_pid_mismatches)
+            changed = True
+
+        if archive_changed:
+            archived = {t.relative_filename for t in self._tasks if t.archive is not None}
+            filenames = {os.path.basename(path) for path in on_disk}
+            for t in self.archive.tasks(skip=archived | filenames):
+                self._add_task(t, coerce_pid_mismatches)
+                changed = True
+        return changed
+
+    def _add_task(self, t: Task, coerce_pid_mismatches: bool) -> None:
+        self._tasks.append(t)
+        t.listeners = self.listeners
+        t.read_only = self.read_only
+        t._notify("created", None, t)
+        if t.dexid[0] != self.id:
+            if coerce_pid_mismatches and not self.read_only:
+                warnings.warn(f"Converting task {t.dexid} to project {self.id}!")
+                self.coerced_dexids[t.dexid] = f"{self.id}{int(t.dexid[1:])}"
+                t.set_dexid(f"{self.id}{int(t.dexid[1:])}")
+            else:
+                warnings.warn(f"Task {t.dexid} does not have project id matching project {self.id}: {self.path}.")
+                self.pid_mismatches.append(t.dexid)
+
+    def _remove_task(self, t: Task) -> None:
+        self._tasks.remove(t)
+        if t.dexid in self.pid_mismatches:
+            self.pid_mismatches.remove(t.dexid)
+        t._notify("deleted", t, None)
+
+    def archive_tasks(self, days: int) -> List[Task]:
+        """
+        Archive the inactive (done and abandoned) tasks whose files were not modified for some days: their content is
+        packed into the project's archive (see dex.archive.Archive) and their files are removed. Archived tasks stay
+        in the project; changing one (e.g., reopening it) unarchives it.
+
+        Args:
+            days (int): Only tasks whose files are older than this number of days are archived.
+
+        Returns:
+            ([Task]): The tasks archived.
+        """
+        self._check_writable()
+        self.load_inactive()
+        cutoff = time.time() - days * 86400
+        with self.archive.locked():
+            # Only tasks whose files were not changed (or archived) by another dex process since they were read
+            tasks = [t for t in self._tasks if t.status in (done_str, abandoned_str) and t.archive is None
+                     and not t.dirty and t.disk_path == t.path and os.path.exists(t.path)
+                     and t.modification_time < cutoff and t._file_is_current()]
+            if not tasks:
+                return []
+            self.archive.add(tasks)
+            for t in tasks:
+                os.remove(t.path)
+                t.archive = self.archive
+                t.file_stat = None
+        return tasks
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ReadOnlyException(f"Project {self.id} was loaded read-only, so its files cannot be changed.")
+
     def create_new_note(self, *args, **kwargs) -> Note:
         pass
 
@@ -193,17 +642,19 @@ class Project:
 
         Returns:
             task_collection (AttrDict): A dict/attr collection of [Task] lists, corresponding to different status
-                primitives. Also includes a key for "all", which is an unordered list of all tasks.
+                primitives. Also includes a key for "all", which is an unordered list of all tasks. If the inactive
+                tasks are not loaded yet, they are loaded when "done", "abandoned" or "all" is first accessed.
 
         """
         # priority_dict = {priority: [] for priority in priority_primitives}
         task_dict = {status: [] for status in status_primitives}
         task_dict["all"] = self._tasks
-        task_collection = AttrDict(task_dict)
 
         for t in task_dict["all"]:
             task_dict[t.status].append(t)
-        return task_collection
+        if not self._inactive_loaded:
+            return InactiveLoadingCollection(self, {k: v for k, v in task_dict.items() if k in active_keys})
+        return AttrDict(task_dict)
 
 
     @property
@@ -218,6 +669,82 @@ class Project:
         return {t.dexid: t for t in self.tasks.all}
 
 
+# Keys of a task collection which do not need the inactive tasks
+active_keys = (todo_str, ip_str, hold_str)
+
+
+class InactiveLoadingCollection(AttrDict):
+    def __init__(self, project: Project, task_dict: dict):
+        """
+        A task collection (see Project.tasks) of a project whose inactive tasks are not loaded yet. The inactive tasks
+        are loaded (see Project.load_inactive) when a key needing them is first accessed.
+
+        Args:
+            project (Project): The project.
+            task_dict (dict): The collection of the loaded tasks, with only the keys of active statuses.
+        """
+        super().__init__(task_dict)
+        # Not an item, since attributes of an AttrDict are its items
+        object.__setattr__(self, "_project", project)
+
+    def __missing__(self, key):
+        if key not in status_primitives and key != "all":
+            raise KeyError(key)
+        self._project.load_inactive()
+        self.update(self._project.tasks)
+        return self[key]
+
+
+def _write_new_tasks(tasks: List[Task]) -> List[Union[str, None]]:
+    errors = []
+    for t in tasks:
+        try:
+            t._write_new()
+            errors.append(None)
+        except OSError as ose:
+            errors.append(str(ose))
+    return errors
+
+
+def rebase_path(path: str, old_base: str, new_base: str) -> str:
+    """
+    Change the base directory of a path, e.g. after the directory was renamed.
+
+    Args:
+        path (str): The path, in old_base.
+        old_base (str): The old base directory.
+        new_base (str): The new base directory.
+
+    Returns:
+        (str): The path in new_base.
+    """
+    return os.path.normpath(os.path.join(new_base, os.path.relpath(path, old_base)))
+
+
+def tasks_from_files(directory: str) -> List[Task]:
+    """
+    Load the tasks from the task files in a directory. Files without a dexcode are skipped with a warning.
+
+    Args:
+        directory (str): The directory. A missing directory has no tasks.
+
+    Returns:
+        ([Task]): The tasks.
+    """
+    tasks = []
+    if not os.path.isdir(directory):
+        return tasks
+    for ft in os.listdir(directory):
+        f_full = os.path.abspath(os.path.join(directory, ft))
+        if f_full.endswith(task_extension):
+            try:
+                t = Task.from_file(f_full)
+                tasks.append(t)
+            except DexcodeException:
+                warnings.warn(f"File {f_full} has no dexcode. Please remove this file or make it into a task.")
+    return tasks
+
+
 def process_project_id(proj_id: str) -> str:
     """
     Ensure the project ID is valid.
@@ -232,3 +759,94 @@ def process_project_id(proj_id: str) -> str:
     if proj_id not in valid_project_ids:
         raise ValueError(f"Project id must be single alphabetical character in lowercase: {valid_project_ids}")
     return proj_id
+
+
+def read_project_ids(root: str) -> Union[dict, None]:
+    """
+    Read the project ids assigned to the folders of a root (see assign_project_ids).
+
+    Args:
+        root (str): The path of the root.
+
+    Returns:
+        ({str: str} or None): Keys are folder names, values are project ids. None if the root has no ids assigned yet.
+    """
+    path = os.path.join(root, project_ids_fname)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_project_ids(root: str, project_ids: dict) -> None:
+    """
+    Write the project ids assigned to the folders of a root, replacing the file atomically.
+
+    Args:
+        root (str): The path of the root.
+        project_ids ({str: str}): Keys are folder names, values are project ids.
+
+    Returns:
+        None
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=root)
+    with os.fdopen(fd, "w") as f:
+        json.dump(project_ids, f, indent=4)
+    os.replace(tmp_path, os.path.join(root, project_ids_fname))
+
+
+def seed_project_ids(root: str, folder_names: Iterable[str]) -> dict:
+    """
+    The project ids of the folders of a root which has none assigned yet (see read_project_ids): each folder gets the
+    id most of its tasks have, so the tasks keep their dexids. If several folders have the same id, the one with the
+    most tasks with that id gets it. Folders without tasks get no id.
+
+    Args:
+        root (str): The path of the root.
+        folder_names ([str]): The names of the project folders.
+
+    Returns:
+        ({str: str}): Keys are folder names, values are project ids.
+    """
+    candidates = []
+    for name in sorted(folder_names):
+        tasks_dir = os.path.join(root, name, tasks_subdir)
+        inactive_dir = os.path.join(tasks_dir, inactive_subdir)
+        dexids = [t.dexid for t in tasks_from_files(tasks_dir) + tasks_from_files(inactive_dir)]
+        if os.path.exists(os.path.join(inactive_dir, archive_fname)):
+            dexids += [entry["dexcode"] for entry in Archive(inactive_dir).entries.values()]
+        ids = [dexid[0] for dexid in dexids]
+        if ids:
+            pid = max(sorted(set(ids)), key=ids.count)
+            candidates.append((-ids.count(pid), name, pid))
+    project_ids = {}
+    for _, name, pid in sorted(candidates):
+        if pid not in project_ids.values():
+            project_ids[name] = pid
+    return project_ids
+
+
+def assign_project_ids(folder_names: Iterable[str], assigned: Union[dict, None] = None) -> dict:
+    """
+    Assign project ids to the project folders of a root. Folders keep the ids assigned to them before, so adding,
+    removing or renaming (see Project.rename) a project does not change the ids of the others. Other folders get the
+    lowest free ids, in order of folder name. Folders left once all ids are taken get no id.
+
+    Args:
+        folder_names ([str]): The names of the project folders.
+        assigned ({str: str}): The ids assigned before (see read_project_ids).
+
+    Returns:
+        ({str: str}): Keys are folder names, values are project ids, in order of id.
+    """
+    assigned = assigned or {}
+    folder_names = sorted(folder_names)
+    project_ids = {}
+    for name in folder_names:
+        pid = assigned.get(name)
+        if pid in valid_project_ids and pid not in project_ids.values():
+            project_ids[name] = pid
+    free_ids = [pid for pid in valid_project_ids if pid not in project_ids.values()]
+    for name, pid in zip([n for n in folder_names if n not in project_ids], free_ids):
+        project_ids[name] = pid
+    return dict(sorted(project_ids.items(), key=lambda x: x[1]))
@@ -0,0 +1,429 @@
+"""
+A small filter language over task fields, compiled to predicates.
+
+Examples:
+    importance>=4 and due<=7 and recurring and project=b
+    status=todo or (status=ip and effort<3)
+    not held, name~"literature"
+
+Fields (and aliases):
+    status                      =, != against a status primitive (todo, ip, hold, done, abandoned)
+    effort (eff)                numeric comparison
+    importance (imp)            numeric comparison
+    days_till_due (days)        numeric comparison against the number of days until the task is due
+    due                         comparison against a date (YYYY-MM-DD, or "today"), or a number of days till due
+    recurrence                  numeric comparison against the number of days between recurrences
+    flag (flags)                =, != for flag membership; ~, !~ for a flag containing a string
+    project (proj)              =, != against a project id or name; ~, !~ for a project name containing a string
+    name                        =, != against the task name; ~, !~ for the name containing a string
+    dexid (id)                  =, != against the dex id
+
+Bare words can be used as boolean conditions: recurring, overdue, active, inactive, and any status (e.g., held,
+todo). Conditions are combined with "and" (or a comma, or just a space), "or", "not" and parentheses. String
+comparisons are case insensitive.
+"""
+import re
+import datetime
+import operator
+from typing import Callable, Union, Iterable, List
+
+from dex.constants import status_primitives, due_date_fmt, hold_str, todo_str, ip_str, done_str, abandoned_str
+from dex.exceptions import QueryException
+from dex.util import AttrDict
+
+
+token_regex = re.compile(
+    r"\s*(?:(?P<op><=|>=|!=|==|!~|[=<>~(),])|(?P<string>\"[^\"]*\"|'[^']*')|(?P<word>[^\s=<>!~(),\"']+))"
+)
+keywords = ("and", "or", "not")
+
+numeric_ops = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+equality_ops = ("=", "==", "!=")
+contains_ops = ("~", "!~")
+
+field_aliases = {
+    "eff": "effort",
+    "imp": "importance",
+    "days": "days_till_due",
+    "flags": "flag",
+    "proj": "project",
+    "id": "dexid",
+}
+boolean_words = {
+    "held": hold_str,
+    "in_progress": ip_str,
+}
+active_statuses = (hold_str, todo_str, ip_str)
+inactive_statuses = (done_str, abandoned_str)
+
+# Fields are evaluated in this order inside a conjunction: cheap attribute lookups first, computed fields last
+field_costs = {
+    "project": 0,
+    "status": 0,
+    "dexid": 1,
+    "effort": 1,
+    "importance": 1,
+    "flag": 2,
+    "recurrence": 2,
+    "name": 3,
+    "due": 4,
+    "days_till_due": 4,
+}
+
+
+class _Node:
+    def __init__(self, evaluate: Callable, fields: frozenset):
+        """
+        A compiled (sub)expression.
+
+        Args:
+            evaluate (callable): Function of (task, project) returning a bool.
+            fields (frozenset): The task fields this expression depends on.
+        """
+        self.evaluate = evaluate
+        self.fields = fields
+
+    @property
+    def cost(self) -> int:
+        return max([field_costs[f] for f in self.fields], default=0)
+
+
+class Query:
+    def __init__(self, expression: str, today: Union[datetime.datetime, None] = None):
+        """
+        A compiled task query. Call it with a task (and optionally its project) to evaluate it.
+
+        The top level conjunction of the query is split into conditions only depending on the project, conditions only
+        depending on the status, and conditions depending on the task itself, so that whole projects and status
+        collections can be skipped before any task is looked at.
+
+        Args:
+            expression (str): The query expression. See the module docstring for the syntax.
+            today (datetime.datetime): The time used for due date calculations, computed once for all tasks. Defaults
+                to now.
+        """
+        self.expression = expression
+        self.today = datetime.datetime.today() if today is None else today
+
+        root = _Parser(expression, self).parse()
+
+        conjuncts = _flatten_and(root)
+        self._project_conditions = [c for c in conjuncts if c.fields == {"project"}]
+        self._status_conditions = [c for c in conjuncts if c.fields == {"status"}]
+        self._task_conditions = sorted(
+            [c for c in conjuncts if c not in self._project_conditions and c not in self._status_conditions],
+            key=lambda c: c.cost
+        )
+
+    def __str__(self):
+        return f"<dex Query '{self.expression}'>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __call__(self, task, project=None) -> bool:
+        """
+        Evaluate the full query against a task.
+
+        Args:
+            task (Task): The task.
+            project (Project): The task's project. Only needed if the query uses project names.
+
+        Returns:
+            (bool): Whether the task matches the query.
+        """
+        return self.matches_project(project, task) and self.matches_status(task.status) and \
+            all(c.evaluate(task, project) for c in self._task_conditions)
+
+    def matches_project(self, project, task=None) -> bool:
+        """
+        Whether any task in a project could match the query, evaluating only the project conditions.
+
+        Args:
+            project (Project): The project. May be None if a task is given.
+            task (Task): Used for the project id if no project is given.
+
+        Returns:
+            (bool)
+        """
+        return all(c.evaluate(task, project) for c in self._project_conditions)
+
+    def matches_status(self, status: str) -> bool:
+        """
+        Whether any task with this status could match the query, evaluating only the status conditions.
+
+        Args:
+            status (str): A status primitive.
+
+        Returns:
+            (bool)
+        """
+        return all(c.evaluate(_StatusOnly(status), None) for c in self._status_conditions)
+
+    def filter(self, tasks: Iterable, project=None) -> List:
+        """
+        Filter tasks (all from the same project, if project is given) by the task level conditions of the query.
+
+        Status and project conditions are assumed to have been applied already via matches_status and
+        matches_project.
+
+        Args:
+            tasks ([Task]): The tasks to filter.
+            project (Project): The project of all the tasks.
+
+        Returns:
+            [Task]: Tasks matching the task level conditions.
+        """
+        conditions = [c.evaluate for c in self._task_conditions]
+        return [t for t in tasks if all(c(t, project) for c in conditions)]
+
+    def filter_collection(self, task_collection: AttrDict, project=None,
+                          statuses: Iterable[str] = status_primitives) -> AttrDict:
+        """
+        Filter a task collection (organized by status, e.g., Project.tasks) in order of cost: statuses which cannot
+        match are skipped entirely, and remaining tasks are filtered by the task level conditions.
+
+        Args:
+            task_collection (AttrDict): A collection of Tasks in dict/attr format with keys of status primitives.
+            project (Project): The project of all the tasks.
+            statuses ([str]): Only tasks of these statuses are considered (e.g., to not load inactive tasks).
+
+        Returns:
+            AttrDict: A collection with the same status keys, containing only matching tasks.
+        """
+        if project is not None and not self.matches_project(project):
+            return AttrDict({sp: [] for sp in status_primitives})
+        return AttrDict({
+            sp: self.filter(task_collection[sp], project) if sp in statuses and self.matches_status(sp) else []
+            for sp in status_primitives
+        })
+
+    def days_till_due(self, task) -> int:
+        return (task.due - self.today).days + 1
+
+
+class _StatusOnly:
+    def __init__(self, status: str):
+        self.status = status
+
+
+def compile_query(expression: str, today: Union[datetime.datetime, None] = None) -> Query:
+    """
+    Compile a query expression to a Query predicate.
+
+    Args:
+        expression (str): The query expression. See the dex.query module docstring for the syntax.
+        today (datetime.datetime): The time used for due date calculations. Defaults to now.
+
+    Returns:
+        Query
+    """
+    return Query(expression, today=today)
+
+
+def _flatten_and(node: _Node) -> List[_Node]:
+    return node.conjuncts if hasattr(node, "conjuncts") else [node]
+
+
+def _tokenize(expression: str) -> List[tuple]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = token_regex.match(expression, position)
+        if not match or match.end() == position:
+            raise QueryException(f"Could not parse query at '{expression[position:]}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1]
+        elif kind == "word" and value.lower() in keywords:
+            kind, value = "keyword", value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression: str, query: Query):
+        self.expression = expression
+        self.query = query
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def parse(self) -> _Node:
+        if not self.tokens:
+            raise QueryException("Empty query.")
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise QueryException(f"Unexpected '{self.tokens[self.position][1]}' in query '{self.expression}'")
+        return node
+
+    def _peek(self) -> tuple:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self) -> tuple:
+        token = self._peek()
+        if token == (None, None):
+            raise QueryException(f"Unexpected end of query '{self.expression}'")
+        self.position += 1
+        return token
+
+    def _or(self) -> _Node:
+        nodes = [self._and()]
+        while self._peek() == ("keyword", "or"):
+            self._next()
+            nodes.append(self._and())
+        if len(nodes) == 1:
+            return nodes[0]
+        evaluators = [n.evaluate for n in nodes]
+        return _Node(lambda t, p: any(e(t, p) for e in evaluators), frozenset().union(*[n.fields for n in nodes]))
+
+    def _and(self) -> _Node:
+        nodes = [self._not()]
+        while True:
+            token = self._peek()
+            if token in (("keyword", "and"), ("op", ",")):
+                self._next()
+            elif not (token[0] == "word" or token in (("keyword", "not"), ("op", "("))):
+                break
+            nodes.append(self._not())
+
+        conjuncts = []
+        for n in nodes:
+            conjuncts += _flatten_and(n)
+        if len(conjuncts) == 1:
+            return conjuncts[0]
+        evaluators = [n.evaluate for n in sorted(conjuncts, key=lambda c: c.cost)]
+        node = _Node(lambda t, p: all(e(t, p) for e in evaluators), frozenset().union(*[n.fields for n in conjuncts]))
+        node.conjuncts = conjuncts
+        return node
+
+    def _not(self) -> _Node:
+        if self._peek() == ("keyword", "not"):
+            self._next()
+            node = self._not()
+            evaluate = node.evaluate
+            return _Node(lambda t, p: not evaluate(t, p), node.fields)
+        return self._atom()
+
+    def _atom(self) -> _Node:
+        kind, value = self._next()
+        if (kind, value) == ("op", "("):
+            node = self._or()
+            if self._next() != ("op", ")"):
+                raise QueryException(f"Missing ')' in query '{self.expression}'")
+            return node
+        elif kind != "word":
+            raise QueryException(f"Unexpected '{value}' in query '{self.expression}'")
+
+        next_kind, next_value = self._peek()
+        if next_kind == "op" and next_value not in ("(", ")", ","):
+            self._next()
+            value_kind, operand = self._next()
+            if value_kind not in ("word", "string"):
+                raise QueryException(f"Expected a value after '{value}{next_value}' in query '{self.expression}'")
+            return self._comparison(value.lower(), next_value, operand)
+        return self._boolean(value.lower())
+
+    def _boolean(self, word: str) -> _Node:
+        status_field = frozenset(["status"])
+        if word in status_primitives or word in boolean_words:
+            status = boolean_words.get(word, word)
+            return _Node(lambda t, p: t.status == status, status_field)
+        elif word == "active":
+            return _Node(lambda t, p: t.status in active_statuses, status_field)
+        elif word == "inactive":
+            return _Node(lambda t, p: t.status in inactive_statuses, status_field)
+        elif word == "recurring":
+            return _Node(lambda t, p: t.recurrence[0], frozenset(["recurrence"]))
+        elif word == "overdue":
+            days_till_due = self.query.days_till_due
+            return _Node(lambda t, p: days_till_due(t) < 0, frozenset(["days_till_due"]))
+        else:
+            raise QueryException(f"Unknown condition '{word}' in query '{self.expression}'")
+
+    def _comparison(self, field: str, op: str, operand: str) -> _Node:
+        field = field_aliases.get(field, field)
+        if field not in field_costs:
+            raise QueryException(f"Unknown field '{field}'. Choose from {list(field_costs.keys())}")
+        fields = frozenset([field])
+
+        if field in ("effort", "importance", "recurrence", "days_till_due") or \
+                (field == "due" and _is_int(operand)):
+            if op not in numeric_ops:
+                raise QueryException(f"Operator '{op}' cannot be used with numeric field '{field}'")
+            if not _is_int(operand):
+                raise QueryException(f"Field '{field}' must be compared to a whole number, not '{operand}'")
+            compare, number = numeric_ops[op], int(operand)
+            if field == "recurrence":
+                return _Node(lambda t, p: t.recurrence[0] and compare(t.recurrence[1], number), fields)
+            elif field in ("due", "days_till_due"):
+                days_till_due = self.query.days_till_due
+                return _Node(lambda t, p: compare(days_till_due(t), number), frozenset(["days_till_due"]))
+            return _Node(lambda t, p: compare(getattr(t, field), number), fields)
+
+        elif field == "due":
+            if op not in numeric_ops:
+                raise QueryException(f"Operator '{op}' cannot be used with field 'due'")
+            if operand.lower() == "today":
+                date = self.query.today.date()
+            else:
+                try:
+                    date = datetime.datetime.strptime(operand, due_date_fmt).date()
+                except ValueError:
+                    raise QueryException(f"Due date '{operand}' must be 'today', a number of days, or {due_date_fmt}")
+            compare = numeric_ops[op]
+            return _Node(lambda t, p: compare(t.due.date(), date), fields)
+
+        if op not in equality_ops + contains_ops:
+            raise QueryException(f"Operator '{op}' cannot be used with field '{field}'")
+        negate = op in ("!=", "!~")
+        contains = op in contains_ops
+        operand = operand.lower()
+
+        if field == "status":
+            if contains:
+                raise QueryException("Status can only be compared with '=' or '!='")
+            status = boolean_words.get(operand, operand)
+            if status not in status_primitives:
+                raise QueryException(f"Status '{operand}' not a valid status primitive: {status_primitives}")
+            return _Node(lambda t, p: (t.status == status) != negate, fields)
+        elif field == "project":
+            if contains:
+                match = lambda t, p: p is not None and operand in p.name.lower()
+            else:
+                match = lambda t, p: (p.id if p is not None else t.dexid[0]) == operand or \
+                    (p is not None and p.name.lower() == operand)
+        elif field == "flag":
+            if contains:
+                match = lambda t, p: any(operand in f.lower() for f in t.flags)
+            else:
+                match = lambda t, p: operand in [f.lower() for f in t.flags]
+        elif field == "name":
+            if contains:
+                match = lambda t, p: operand in t.name.lower()
+            else:
+                match = lambda t, p: t.name.lower() == operand
+        else:
+            if contains:
+                match = lambda t, p: operand in t.dexid
+            else:
+                match = lambda t, p: t.dexid == operand
+        return _Node(lambda t, p: match(t, p) != negate, fields)
+
+
+def _is_int(string: str) -> bool:
+    try:
+        int(string)
+        return True
+    except ValueError:
+        return False
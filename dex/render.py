@@ -0,0 +1,111 @@
+import sys
+from typing import Iterable, Iterator, Tuple, Union, TextIO
+
+
+# Same box drawing characters treelib uses for its default ("ascii-ex") line type
+tree_branch = "├── "
+tree_last_branch = "└── "
+tree_vertical = "│   "
+tree_space = "    "
+
+default_chunk_size = 64
+
+
+def iter_with_last(iterable: Iterable) -> Iterator[Tuple[object, bool]]:
+    """
+    Iterate over an iterable while flagging the final item, with a lookahead of only one item.
+
+    Args:
+        iterable (Iterable): Any iterable, including (lazy) generators.
+
+    Returns:
+        Iterator of (item, is_last) 2-tuples.
+    """
+    iterator = iter(iterable)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def iter_tree_lines(label: str, children: Iterable = ()) -> Iterator[str]:
+    """
+    Lazily produce the lines of a tree, laid out identically to treelib.Tree.show.
+
+    Children are consumed one at a time, so the first lines are produced before later children are even computed.
+    Each child is either a string label (a leaf) or a 2-tuple of (label, children), where children is again an
+    iterable of the same form.
+
+    Args:
+        label (str): The label of the root node.
+        children (Iterable): The (possibly lazy) children of the root node.
+
+    Returns:
+        Iterator of lines (without newlines).
+    """
+    yield label
+    yield from _iter_children_lines(children, "")
+
+
+def _iter_children_lines(children: Iterable, prefix: str) -> Iterator[str]:
+    for child, is_last in iter_with_last(children):
+        if isinstance(child, tuple):
+            child_label, grandchildren = child
+        else:
+            child_label, grandchildren = child, ()
+        yield prefix + (tree_last_branch if is_last else tree_branch) + child_label
+        if grandchildren:
+            yield from _iter_children_lines(grandchildren, prefix + (tree_space if is_last else tree_vertical))
+
+
+def write_lines(lines: Iterable[str], stream: Union[TextIO, None] = None, chunk_size: int = default_chunk_size) -> int:
+    """
+    Write lines to a stream in buffered chunks, flushing after each chunk so output appears as it is produced.
+
+    Args:
+        lines (Iterable): Lines (without newlines) to write.
+        stream (file-like): The stream to write to. Defaults to sys.stdout.
+        chunk_size (int): Number of lines written per chunk.
+
+    Returns:
+        (int): The number of lines written.
+    """
+    stream = sys.stdout if stream is None else stream
+    buffer = []
+    n_written = 0
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            stream.write("\n".join(buffer) + "\n")
+            stream.flush()
+            n_written += len(buffer)
+            buffer = []
+    if buffer:
+        stream.write("\n".join(buffer) + "\n")
+        n_written += len(buffer)
+    stream.flush()
+    return n_written
+
+
+def show_tree(label: str, children: Iterable = (), stream: Union[TextIO, None] = None,
+              chunk_size: int = default_chunk_size) -> int:
+    """
+    Stream a tree to the terminal (or a stream). Drop-in replacement for building a treelib.Tree and calling .show().
+
+    Args:
+        label (str): The label of the root node.
+        children (Iterable): Children in the form accepted by iter_tree_lines.
+        stream (file-like): The stream to write to. Defaults to sys.stdout.
+        chunk_size (int): Number of lines written per chunk.
+
+    Returns:
+        (int): The number of tree lines written.
+    """
+    # treelib prints an empty line after the tree
+    n_written = write_lines(iter_tree_lines(label, children), stream=stream, chunk_size=chunk_size)
+    write_lines([""], stream=stream)
+    return n_written
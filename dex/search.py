@@ -0,0 +1,264 @@
+import os
+import re
+import math
+import sqlite3
+from collections import Counter, namedtuple
+from typing import Iterable, List, Tuple, Union
+
+from dex.cache import get_cache_dir, hash_str
+from dex.task import extract_dexcode_from_content, decode_dexcode
+from dex.exceptions import DexcodeException
+from dex.constants import search_cache_subdir, dexcode_header, task_extension, note_extension
+
+token_regex = re.compile(r"[a-z0-9]+")
+
+# One document matching a search. kind is "task" or "note"; dexid and status are None for notes.
+SearchResult = namedtuple("SearchResult", ["score", "kind", "path", "name", "dexid", "project", "status"])
+
+# BM25 parameters
+bm25_k1 = 1.2
+bm25_b = 0.75
+
+schema_version = 1
+schema = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    dexid TEXT,
+    project TEXT NOT NULL,
+    status TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (token, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        ([str]): The tokens, in order.
+    """
+    return token_regex.findall(text.lower())
+
+
+class SearchIndex:
+    def __init__(self, root: str, path: Union[str, None] = None):
+        """
+        An on-disk inverted index (token -> document postings) of the content of the tasks and notes of a root, for
+        full text search. The index is a sqlite database in the dex cache directory (one per root), so it is never
+        written inside the root itself.
+
+        The index is brought up to date incrementally with update: only files whose modification time or size changed
+        are re-read, and files which no longer exist are dropped. Searches are ranked with BM25.
+
+        Args:
+            root (str): The path of the root (executor) directory.
+            path (str): The path of the database. Defaults to a file named by the hash of the root in the "search" dir
+                of the dex cache directory.
+        """
+        self.root = os.path.abspath(root)
+        if path is None:
+            path = os.path.join(get_cache_dir(search_cache_subdir), hash_str(self.root) + ".sqlite")
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != schema_version:
+            self.conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS docs;")
+            self.conn.execute(f"PRAGMA user_version = {schema_version}")
+        self.conn.executescript(schema)
+        self.conn.commit()
+
+    def __str__(self):
+        return f"<dex SearchIndex {self.root} | {len(self)} documents>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def update(self, projects: Iterable) -> Tuple[int, int]:
+        """
+        Bring the index up to date with the task and note files of projects. Files are compared with the index by
+        modification time and size only, so an update of an unchanged root does not read any files.
+
+        Args:
+            projects ([Project]): The projects of the root. Files of projects not given are dropped from the index.
+
+        Returns:
+            (int, int): The number of documents (re)indexed and the number removed.
+        """
+        on_disk = {}
+        for p in projects:
+            for kind, directory, extension in (("task", p.tasks_dir, task_extension),
+                                               ("task", p.inactive_dir, task_extension),
+                                               ("note", p.notes_dir, note_extension)):
+                if not os.path.isdir(directory):
+                    continue
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(extension) and entry.is_file():
+                            st = entry.stat()
+                            on_disk[os.path.abspath(entry.path)] = (kind, p.path, st.st_mtime_ns, st.st_size)
+
+        indexed = {path: (doc, mtime_ns, size) for doc, path, mtime_ns, size in
+                   self.conn.execute("SELECT id, path, mtime_ns, size FROM docs")}
+
+        n_indexed, n_removed = 0, 0
+        with self.conn:
+            for path, (doc, mtime_ns, size) in indexed.items():
+                if path not in on_disk:
+                    self._remove_doc(doc)
+                    n_removed += 1
+            for path, (kind, project, mtime_ns, size) in on_disk.items():
+                if path in indexed:
+                    doc, indexed_mtime_ns, indexed_size = indexed[path]
+                    if (indexed_mtime_ns, indexed_size) == (mtime_ns, size):
+                        continue
+                    self._remove_doc(doc)
+                try:
+                    with open(path, "r") as f:
+                        content = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                self._add_doc(path, kind, project, mtime_ns, size, content)
+                n_indexed += 1
+        return n_indexed, n_removed
+
+    def search(self, query: str, n: int = 10, statuses: Union[Iterable[str], None] = None,
+               projects: Union[Iterable[str], None] = None) -> List[SearchResult]:
+        """
+        Search the index. Documents must contain every term of the query; a term ending in "*" matches any token
+        starting with it (e.g., "deploy*"). Results are ranked by BM25 score.
+
+        Args:
+            query (str): The search terms.
+            n (int): Max number of results. 0 returns all results.
+            statuses ([str]): If given, only tasks with these statuses are returned (notes have no status, so they
+                are excluded).
+            projects ([str]): If given, only documents in the projects with these paths are returned.
+
+        Returns:
+            ([SearchResult]): The results, best first.
+        """
+        terms = []
+        for raw in query.split():
+            tokens = tokenize(raw)
+            terms += [(t, raw.endswith("*") and i == len(tokens) - 1) for i, t in enumerate(tokens)]
+        if not terms:
+            return []
+
+        n_docs, avg_length = self.conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+        if not n_docs:
+            return []
+        avg_length = avg_length or 1
+
+        filters, filter_params = [], []
+        if statuses is not None:
+            statuses = list(statuses)
+            filters.append(f"docs.status IN ({','.join('?' * len(statuses))})")
+            filter_params += statuses
+        if projects is not None:
+            projects = [os.path.abspath(p) for p in projects]
+            filters.append(f"docs.project IN ({','.join('?' * len(projects))})")
+            filter_params += projects
+        filter_sql = "".join(f" AND {f}" for f in filters)
+
+        scores = None
+        for token, is_prefix in terms:
+            if is_prefix:
+                # Every token in [token, token + highest char) starts with token, so the primary key range is used
+                token_sql, token_params = "token >= ? AND token < ?", [token, token + "\uffff"]
+            else:
+                token_sql, token_params = "token = ?", [token]
+
+            dfs = dict(self.conn.execute(
+                f"SELECT token, COUNT(*) FROM postings WHERE {token_sql} GROUP BY token", token_params))
+            rows = self.conn.execute(
+                f"SELECT postings.token, postings.doc, postings.tf, docs.length FROM postings "
+                f"JOIN docs ON docs.id = postings.doc WHERE {token_sql}{filter_sql}", token_params + filter_params)
+
+            term_scores = {}
+            for t, doc, tf, length in rows:
+                idf = math.log(1 + (n_docs - dfs[t] + 0.5) / (dfs[t] + 0.5))
+                norm = tf + bm25_k1 * (1 - bm25_b + bm25_b * length / avg_length)
+                term_scores[doc] = term_scores.get(doc, 0.0) + idf * tf * (bm25_k1 + 1) / norm
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: s + term_scores[doc] for doc, s in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if n:
+            ranked = ranked[:n]
+        results = []
+        for doc, score in ranked:
+            kind, path, name, dexid, project, status = self.conn.execute(
+                "SELECT kind, path, name, dexid, project, status FROM docs WHERE id = ?", (doc,)).fetchone()
+            results.append(SearchResult(score, kind, path, name, dexid, project, status))
+        return results
+
+    def clear(self) -> None:
+        """
+        Remove all documents from the index.
+
+        Returns:
+            None
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM docs")
+
+    def _add_doc(self, path: str, kind: str, project: str, mtime_ns: int, size: int, content: str) -> None:
+        name = os.path.splitext(os.path.basename(path))[0]
+        dexid, status = None, None
+        if kind == "task":
+            try:
+                dexid, _, _, _, status, _ = decode_dexcode(extract_dexcode_from_content(content))
+            except (DexcodeException, ValueError):
+                pass
+            # The dexcode line is metadata, not content
+            content = "\n".join(line for line in content.split("\n") if dexcode_header not in line)
+
+        counts = Counter(tokenize(name))
+        counts.update(tokenize(content))
+        cursor = self.conn.execute(
+            "INSERT INTO docs (path, kind, name, dexid, project, status, mtime_ns, size, length) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, kind, name, dexid, project, status, mtime_ns, size, sum(counts.values()))
+        )
+        doc = cursor.lastrowid
+        self.conn.executemany("INSERT INTO postings (token, doc, tf) VALUES (?, ?, ?)",
+                              ((token, doc, tf) for token, tf in counts.items()))
+
+    def _remove_doc(self, doc: int) -> None:
+        self.conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        self.conn.execute("DELETE FROM docs WHERE id = ?", (doc,))
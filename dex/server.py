@@ -0,0 +1,272 @@
+import re
+import json
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from dex.executor import Executor
+from dex.task import write_counts, check_name_valid, check_flags_valid, name_is_taken
+from dex.exceptions import DexException, FileOverwriteError
+from dex.constants import importance_primitives, effort_primitives, status_primitives, due_date_fmt, todo_str, \
+    server_default_host, server_default_port, server_default_workers, server_keepalive_timeout
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, msg: str):
+        self.status = status
+        self.msg = msg
+
+
+class DexServer(HTTPServer):
+    def __init__(self, executor: Executor, host: str = server_default_host, port: int = server_default_port,
+                 workers: int = server_default_workers, verbose: bool = False):
+        """
+        A local HTTP/JSON server holding one warm Executor, so other processes can query and change tasks without
+        each parsing the whole root.
+
+        Requests are handled on a fixed pool of threads. Connections are kept alive (HTTP/1.1) until idle for
+        server_keepalive_timeout seconds. Access to the executor is serialized with a lock (the journal's lock if the
+        root has a journal, so background compaction does not run during a request). Responses carry an ETag
+        made from the executor's generation (which changes on every task change) and today's date (which changes
+        priorities), so clients can make conditional requests with If-None-Match and get a 304 if nothing changed.
+
+        Endpoints:
+            GET  /tasks                     Ranked tasks. Query params: n, offset, where, today, inactive, held.
+            GET  /tasks/<dexid>             A single task.
+            POST /tasks/<dexid>             Change a task. JSON body of any of: status, importance, effort, due, flags,
+                                            name (renames the task file).
+            GET  /projects                  All projects.
+            POST /projects/<id>/tasks       Create a task. JSON body: name, effort, due, importance, (status, flags).
+            GET  /stats                     Task counts by status and project, and task file write counts.
+
+        Args:
+            executor (Executor): The executor to serve.
+            host (str): The host to bind. Defaults to localhost only.
+            port (int): The port to bind. 0 picks any free port (see server_address).
+            workers (int): Number of threads handling requests.
+            verbose (bool): If True, log every request to stderr.
+        """
+        self.executor = executor
+        self.lock = executor.journal.lock if executor.journal is not None else threading.RLock()
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        super().__init__((host, port), DexRequestHandler)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request_in_pool, request, client_address)
+
+    def _process_request_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.executor.generation}-{datetime.date.today().isoformat()}"'
+
+
+class DexRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = server_keepalive_timeout
+
+    routes = [
+        ("GET", re.compile(r"^/tasks$"), "get_tasks"),
+        ("GET", re.compile(r"^/tasks/(\w+)$"), "get_task"),
+        ("POST", re.compile(r"^/tasks/(\w+)$"), "post_task"),
+        ("GET", re.compile(r"^/projects$"), "get_projects"),
+        ("POST", re.compile(r"^/projects/([a-z])/tasks$"), "post_project_task"),
+        ("GET", re.compile(r"^/stats$"), "get_stats"),
+    ]
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        try:
+            body = self._read_body()
+            for route_method, pattern, name in self.routes:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    break
+            else:
+                raise HTTPError(404, f"No {method} endpoint at '{url.path}'.")
+
+            with self.server.lock:
+                # Tasks may have been changed by the CLI, an editor or another process since the last request
+                self.server.executor.refresh()
+                etag = self.server.etag
+                if method == "GET" and self.headers.get("If-None-Match") == etag:
+                    self._respond(304, None, etag)
+                    return
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                payload = getattr(self, name)(params, body, *match.groups())
+                status = 201 if name == "post_project_task" else 200
+                self._respond(status, payload, self.server.etag)
+        except HTTPError as he:
+            self._respond(he.status, {"error": he.msg})
+        except (DexException, ValueError, TypeError) as e:
+            self._respond(400, {"error": str(e)})
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            # The rest of the request cannot be told from the next one
+            self.close_connection = True
+            raise HTTPError(400, f"Content-Length '{self.headers['Content-Length']}' is not an integer.")
+        if not length:
+            return {}
+        raw = self.rfile.read(length)
+        try:
+            body = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def _respond(self, status: int, payload, etag: str = None) -> None:
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    # Endpoints
+    ###########
+
+    def get_tasks(self, params, body):
+        e = self.server.executor
+        tasks = e.get_n_highest_priority_tasks(
+            _int_param(params, "n", 0),
+            only_today=params.get("today") == "1",
+            include_inactive=params.get("inactive") == "1",
+            offset=_int_param(params, "offset", 0),
+            include_held=params.get("held") != "0",
+            where=params.get("where")
+        )
+        return {"tasks": [_task_dict(e, t) for t in tasks]}
+
+    def get_task(self, params, body, dexid):
+        return _task_dict(self.server.executor, self._find_task(dexid))
+
+    def post_task(self, params, body, dexid):
+        t = self._find_task(dexid)
+        changes = _validate_task_body(body, required=())
+        name = changes.pop("name", t.name)
+        # Checked before anything is written, so a failing rename does not leave the task partly changed
+        if name != t.name and name_is_taken(t.disk_path, name):
+            raise FileOverwriteError(f"Task already exists with the name {name}.")
+        t.update(**changes)
+        t.rename(name)
+        return _task_dict(self.server.executor, t)
+
+    def get_projects(self, params, body):
+        projects = []
+        for p in self.server.executor.projects:
+            collection = p.tasks
+            counts = {sp: len(collection[sp]) for sp in status_primitives}
+            projects.append({"id": p.id, "name": p.name, "path": p.path, "n_tasks": counts})
+        return {"projects": projects}
+
+    def post_project_task(self, params, body, project_id):
+        e = self.server.executor
+        project = e.project_map.get(project_id)
+        if project is None:
+            raise HTTPError(404, f"No project '{project_id}'.")
+        t = _validate_task_body(body, required=("name", "effort", "due", "importance"))
+        t = project.create_new_task(t["name"], t["effort"], t["due"], t["importance"], t.get("status", todo_str),
+                                    t.get("flags", ["n"]))
+        return _task_dict(e, t)
+
+    def get_stats(self, params, body):
+        e = self.server.executor
+        by_project = {}
+        for p in e.projects:
+            collection = p.tasks
+            by_project[p.id] = {sp: len(collection[sp]) for sp in status_primitives}
+        return {
+            "generation": e.generation,
+            "n_tasks": len(e.index),
+            "by_status": {sp: e.index.count("status", sp) for sp in status_primitives},
+            "by_project": by_project,
+            "writes": dict(write_counts)
+        }
+
+    def _find_task(self, dexid):
+        t = self.server.executor.get_task(dexid)
+        if t is None:
+            raise HTTPError(404, f"No task '{dexid}'.")
+        return t
+
+
+def _task_dict(executor: Executor, task) -> dict:
+    d = task.to_dict()
+    d["project_id"] = executor.index.project_id(task)
+    return d
+
+
+def _int_param(params: dict, name: str, default: int) -> int:
+    if name not in params:
+        return default
+    try:
+        return int(params[name])
+    except ValueError:
+        raise HTTPError(400, f"Parameter '{name}' must be an integer, not '{params[name]}'.")
+
+
+def _validate_task_body(body, required: tuple) -> dict:
+    if body is None:
+        raise HTTPError(400, "Request body must be a JSON object.")
+    missing = [k for k in required if k not in body]
+    if missing:
+        raise HTTPError(400, f"Missing fields: {missing}")
+    valid = {"name", "effort", "due", "importance", "status", "flags"}
+    unknown = [k for k in body if k not in valid]
+    if unknown:
+        raise HTTPError(400, f"Unknown fields: {unknown}")
+
+    checked = dict(body)
+    for k, primitives in (("importance", importance_primitives), ("effort", effort_primitives),
+                          ("status", status_primitives)):
+        if k in body and body[k] not in primitives:
+            raise HTTPError(400, f"{body[k]} not a valid {k} {primitives}")
+    if "due" in body:
+        try:
+            checked["due"] = datetime.datetime.strptime(str(body["due"]), due_date_fmt)
+        except ValueError:
+            raise HTTPError(400, f"Due date '{body['due']}' is not of the form {due_date_fmt}.")
+    if "name" in body:
+        try:
+            check_name_valid(body["name"])
+        except ValueError as ve:
+            raise HTTPError(400, str(ve))
+    if "flags" in body:
+        flags = body["flags"]
+        if not isinstance(flags, list) or not flags or not all(isinstance(f, str) for f in flags):
+            raise HTTPError(400, "Flags must be a non-empty list of strings (e.g., [\"n\"] for none).")
+        try:
+            check_flags_valid(flags)
+        except ValueError as ve:
+            raise HTTPError(400, str(ve))
+    return checked
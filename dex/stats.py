@@ -0,0 +1,128 @@
+import datetime
+from typing import Iterable, Union
+
+import numpy as np
+
+from dex.constants import status_primitives_ints_inverted, done_str, ip_str
+
+done_int = status_primitives_ints_inverted[done_str]
+ip_int = status_primitives_ints_inverted[ip_str]
+seconds_per_day = 86400.0
+
+
+def task_keys(events: np.ndarray) -> np.ndarray:
+    """
+    One integer per event identifying its task (project id and task number), for grouping events by task.
+
+    Args:
+        events (numpy.ndarray): Events, as read by dex.events.EventLog.array.
+
+    Returns:
+        (numpy.ndarray): The keys, as int64.
+    """
+    project = np.ascontiguousarray(events["project"]).view(np.uint8).astype(np.int64)
+    return (project << 32) | events["number"].astype(np.int64)
+
+
+def cycle_times(events: np.ndarray) -> np.ndarray:
+    """
+    The cycle time of each completion: the days from the last time its task was started (set to ip) to its
+    completion. A completion has no cycle time (NaN) if its task was not started since its previous completion (or
+    since the log began), as are all events which are not completions.
+
+    The events are sorted by task and time once; the last start and the previous completion before each event are
+    then found with running maxima over the event indices, so no Python loop runs over the events.
+
+    Args:
+        events (numpy.ndarray): Events, as read by dex.events.EventLog.array.
+
+    Returns:
+        (numpy.ndarray): Cycle times in days (float), aligned with the events.
+    """
+    out = np.full(len(events), np.nan)
+    if not len(events):
+        return out
+
+    keys = task_keys(events)
+    order = np.lexsort((events["ts"], keys))
+    keys = keys[order]
+    ts = events["ts"][order]
+    new = events["new"][order]
+    idx = np.arange(len(order))
+
+    group_start = np.maximum.accumulate(np.where(np.r_[True, keys[1:] != keys[:-1]], idx, 0))
+    last_start = np.maximum.accumulate(np.where(new == ip_int, idx, -1))
+    last_done = np.maximum.accumulate(np.where(new == done_int, idx, -1))
+    previous_done = np.r_[-1, last_done[:-1]]
+
+    valid = (new == done_int) & (last_start >= group_start) & (last_start > previous_done)
+    out[order[valid]] = (ts[valid] - ts[last_start[valid]]) / seconds_per_day
+    return out
+
+
+def summarize(events: np.ndarray, start: Union[datetime.date, None] = None, end: Union[datetime.date, None] = None,
+              project_ids: Union[Iterable[str], None] = None, percentiles: Iterable[float] = (50, 90)) -> dict:
+    """
+    Aggregate the completions in a log of status transitions.
+
+    Args:
+        events (numpy.ndarray): Events, as read by dex.events.EventLog.array.
+        start (datetime.date): Only completions on or after this day. All completions if None.
+        end (datetime.date): Only completions on or before this day. All completions if None.
+        project_ids ([str]): Only completions of tasks in these projects. All projects if None.
+        percentiles ([float]): The percentiles of cycle time to compute.
+
+    Returns:
+        (dict): With keys:
+            "completions" (int): The number of completions.
+            "effort" (int): The total effort of the completed tasks.
+            "per_day" ({datetime.date: int}): Completions per day, for days with any completions.
+            "per_week" ({datetime.date: int}): Completions per week (keyed by its Monday), for weeks with any.
+            "per_project" ({str: int}): Completions per project id.
+            "cycle_time" (dict): "n", the number of completions with a known cycle time (see cycle_times), their
+                "mean" and "percentiles" ({float: float}), in days. The mean and percentiles are None if n is 0.
+            "overdue_rate" (float): The fraction of completions done after their due date, None without completions.
+            "overdue_rate_per_project" ({str: float}): The overdue rate per project id.
+    """
+    cycle = cycle_times(events)
+
+    mask = events["new"] == done_int
+    if start is not None:
+        mask &= events["day"] >= start.toordinal()
+    if end is not None:
+        mask &= events["day"] <= end.toordinal()
+    if project_ids is not None:
+        mask &= np.isin(events["project"], [pid.encode("ascii") for pid in project_ids])
+
+    days = events["day"][mask]
+    projects = events["project"][mask]
+    overdue = days > events["due"][mask]
+    cycle = cycle[mask]
+    cycle = cycle[~np.isnan(cycle)]
+    percentiles = list(percentiles)
+
+    weeks = days - (days - 1) % 7
+    project_ids, project_inverse, project_counts = np.unique(projects, return_inverse=True, return_counts=True)
+    project_overdue = np.bincount(project_inverse.ravel(), weights=overdue, minlength=len(project_ids))
+
+    return {
+        "completions": int(mask.sum()),
+        "effort": int(events["effort"][mask].sum()),
+        "per_day": _counts_by_day(days),
+        "per_week": _counts_by_day(weeks),
+        "per_project": {pid.decode("ascii"): int(n) for pid, n in zip(project_ids, project_counts)},
+        "cycle_time": {
+            "n": len(cycle),
+            "mean": float(cycle.mean()) if len(cycle) else None,
+            "percentiles": dict(zip(percentiles, (float(p) for p in np.percentile(cycle, percentiles))))
+            if len(cycle) else {p: None for p in percentiles}
+        },
+        "overdue_rate": float(overdue.mean()) if len(overdue) else None,
+        "overdue_rate_per_project": {pid.decode("ascii"): float(o / n)
+                                     for pid, o, n in zip(project_ids, project_overdue, project_counts)}
+    }
+
+
+def _counts_by_day(ordinals: np.ndarray) -> dict:
+    values, counts = np.unique(ordinals, return_counts=True)
+    return {datetime.date.fromordinal(int(v)): int(n) for v, n in zip(values, counts)}
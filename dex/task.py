@@ -1,14 +1,24 @@
 import os
+import uuid
+import shutil
 import datetime
+import contextlib
+from typing import List, Union
 
 import mdv
 
 from dex.constants import dexcode_delimiter_left as ddl, dexcode_delimiter_mid as ddm, dexcode_delimiter_right as ddr, \
     status_primitives_ints as spi, status_primitives_ints_inverted as spi_inverted, effort_primitives, \
     importance_primitives, due_date_fmt, flags_primitives, dexcode_delimiter_flag, dexcode_header, \
-    hold_str, done_str, ip_str, abandoned_str, todo_str, task_extension, inactive_subdir
+    hold_str, done_str, ip_str, abandoned_str, todo_str, task_extension, inactive_subdir, recurring_flag, no_flags, \
+    dependency_flag
 from dex.util import initiate_editor
-from dex.exceptions import DexcodeException
+from dex.cache import RenderCache, hash_str
+from dex.exceptions import DexcodeException, ReadOnlyException, ConflictException, FileOverwriteError
+from dex.locking import task_lock, project_lock, tasks_dir_of
+
+# Number of task file writes made, and skipped because the file already had the same content, by this process
+write_counts = {"written": 0, "skipped": 0}
 
 
 class Task:
@@ -42,7 +52,26 @@ class Task:
         self.effort = effort
         self.importance = importance
         self.status = status
-        self.flags = list(set(flags))
+        # Deduplicated, keeping the order of the file so an unchanged task encodes to the same dexcode
+        self.flags = list(dict.fromkeys(flags))
+        self._recurrence = None
+
+        # Callables of (task, event, old, new), called after the task changes. Shared between tasks of a project.
+        self.listeners = []
+
+        # If True, changes are not written to the file until flush is called (see dex.journal.Journal). The file
+        # stays at disk_path until then, even if path changed (e.g., its status moved it to the inactive dir).
+        self.journaled = False
+        self.dirty = False
+        # If True (e.g., the task was loaded by a read-only Executor), writing or renaming the file raises
+        self.read_only = False
+        # The dex.archive.Archive holding the task if it is archived (it has no file then); see from_archive
+        self.archive = None
+        # How many times this task's lock is held by this object (see _locked), so it can be taken again while held
+        self._lock_depth = 0
+        # True while the task is re-read from its file (see reload), so listeners can tell changes made by another
+        # process (e.g., found by _sync) from changes made through this object
+        self.reloading = False
 
         if not self.path.endswith(".md"):
             raise TypeError("Task files must be markdown, and must end in '.md'.")
@@ -51,15 +80,22 @@ class Task:
 
         self.prefix_path = os.path.dirname(self.path)
         self.relative_filename = os.path.basename(self.path)
+        self.disk_path = self.path
         self.name = os.path.splitext(self.relative_filename)[0]
 
         if edit_content:
             initiate_editor(self.path)
 
         content = ""
+        # (mtime, size) of the file when it was last read or written, so changes made outside dex can be detected
+        self.file_stat = None
+        # Hash of the file's content when it was last read or written, so unchanged files are not rewritten
+        self._state_hash = None
         if os.path.exists(self.path):
             with open(self.path, "r") as f:
                 content = f.read()
+            self.file_stat = file_stat(self.path)
+            self._state_hash = hash_str(content)
         try:
             extract_dexcode_from_content(content)
             content = "\n".join(content.split("\n")[:-1])
@@ -96,6 +132,27 @@ class Task:
         dexid, effort, due, importance, status, flags = decode_dexcode(dexcode)
         return cls(dexid, path, effort, due, importance, status, flags)
 
+    @classmethod
+    def from_archive(cls, archive, filename: str, dexcode: str):
+        """
+        Create a Task object for a task archived in a project's pack file (see dex.archive.Archive), without reading
+        its content, which is read from the pack when first accessed. When the task is changed, it is unarchived:
+        written back to a task file and removed from the pack.
+
+        Args:
+            archive (dex.archive.Archive): The archive holding the task.
+            filename (str): The file name of the task (in the archive's directory).
+            dexcode (str): The dexcode of the task.
+
+        Returns:
+            Task object
+        """
+        dexid, effort, due, importance, status, flags = decode_dexcode(dexcode)
+        t = cls(dexid, os.path.join(archive.directory, filename), effort, due, importance, status, flags)
+        t.archive = archive
+        t._content = None
+        return t
+
     @classmethod
     def new(cls, *args, **kwargs):
         """
@@ -115,14 +172,172 @@ class Task:
 
     def _write_state(self) -> None:
         """
-        Write the state of the object to the state of the file.
+        Write the state of the object to the state of the file, moving the file to its path first if needed. The file
+        is not rewritten (so its modification time is kept) if it already has exactly this content; see write_counts.
+
+        If the task is journaled, the task is only marked dirty; see flush.
+
+        Returns:
+            (None)
+        """
+        self._check_writable()
+        if self.journaled:
+            self.dirty = True
+            return
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the state of the task to its file now, even if it is journaled. Archived tasks are unarchived.
 
         Returns:
             (None)
         """
-        with open(self.path, "w") as f:
-            f.write(self.content)
-            f.write(f"\n{dexcode_header} {self.dexcode}")
+        self._check_writable()
+        with self._locked():
+            # Archived tasks have no file; their content is read from the pack before they are unarchived
+            state = f"{self.content}\n{dexcode_header} {self.dexcode}"
+            archive = self.archive
+            if archive is not None:
+                self.disk_path = self.path
+                self.archive = None
+            elif self.disk_path != self.path:
+                os.rename(self.disk_path, self.path)
+                self.disk_path = self.path
+            self.dirty = False
+            state_hash = hash_str(state)
+            if self._is_on_disk(state, state_hash):
+                write_counts["skipped"] += 1
+            else:
+                write_atomically(self.path, state)
+                self.file_stat = file_stat(self.path)
+                self._state_hash = state_hash
+                write_counts["written"] += 1
+            # Removed from the pack only once the file is written, so a crash in between cannot lose the task
+            if archive is not None:
+                archive.remove([self.relative_filename])
+
+    def _write_new(self) -> None:
+        """
+        Create the file of a task which has none yet, in one write and without taking the task's lock or writing a
+        temporary file first (see Project.bulk_create_tasks, which holds the project lock so no other dex process
+        creates a file with the same name). Raises FileExistsError instead of overwriting a file. Not counted in
+        write_counts.
+
+        Returns:
+            (None)
+        """
+        self._check_writable()
+        state = f"{self.content}\n{dexcode_header} {self.dexcode}"
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        with os.fdopen(fd, "w") as f:
+            f.write(state)
+            f.flush()
+            st = os.fstat(fd)
+        self.file_stat = (st.st_mtime_ns, st.st_size)
+        self._state_hash = hash_str(state)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Hold the task's lock (see dex.locking.task_lock) while the task is changed and written, so changes made by
+        other dex processes at the same time are not lost. The file is re-read first if another process changed it
+        since this object last read or wrote it (see _sync), so the change is made to its current state.
+
+        The lock can be taken again while it is held (e.g., set_recurrence changing flags one at a time). Read-only,
+        journaled and archived tasks are not locked: they are not written, written only by compacting the journal, or
+        written to a new file, respectively.
+
+        Returns:
+            None
+        """
+        if self._lock_depth or self.read_only or self.journaled or self.archive is not None:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        with task_lock(self.disk_path):
+            self._lock_depth += 1
+            try:
+                self._sync()
+                yield
+            finally:
+                self._lock_depth -= 1
+
+    def _sync(self) -> None:
+        """
+        Re-read the task (see reload) if another process changed its file since this object last read or wrote it,
+        following the file if its status moved it between the active and inactive dirs. Only called with the task's
+        lock held, so the file cannot change again before the task is written.
+
+        Returns:
+            None
+        """
+        if self.file_stat is None or self.dirty:
+            # Not written yet, or its unwritten changes would be lost
+            return
+        if not os.path.exists(self.disk_path):
+            directory = os.path.dirname(self.disk_path)
+            tasks_dir = tasks_dir_of(self.disk_path)
+            other_dir = os.path.join(tasks_dir, inactive_subdir) if directory == tasks_dir else tasks_dir
+            moved = os.path.join(other_dir, self.relative_filename)
+            if not os.path.exists(moved):
+                raise ConflictException(f"Task {self.dexid} was renamed or removed by another process: "
+                                        f"{self.disk_path} no longer exists.")
+            self.prefix_path = other_dir
+            self.path = self.disk_path = moved
+        # The content is compared, since the modification time may not change between quick writes
+        with open(self.disk_path, "r") as f:
+            on_disk = f.read()
+        if hash_str(on_disk) != self._state_hash:
+            try:
+                self.reload()
+            except DexcodeException:
+                # No longer a valid task file (e.g., its dexcode was deleted by hand), so it is written over
+                pass
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ReadOnlyException(f"Task {self.dexid} was loaded read-only, so its file cannot be changed.")
+
+    def _is_on_disk(self, state: str, state_hash: str) -> bool:
+        """
+        Whether the task's file already has exactly some content. If the file was not changed since it was last read
+        or written (same modification time and size), the hash of its content is compared without reading it.
+
+        Args:
+            state (str): The content.
+            state_hash (str): The hash of the content.
+
+        Returns:
+            (bool)
+        """
+        try:
+            current_stat = file_stat(self.path)
+        except FileNotFoundError:
+            return False
+        if current_stat == self.file_stat and self._state_hash is not None:
+            return state_hash == self._state_hash
+        with open(self.path, "r") as f:
+            on_disk = f.read()
+        if on_disk != state:
+            return False
+        self.file_stat = current_stat
+        self._state_hash = state_hash
+        return True
+
+    def _file_is_current(self) -> bool:
+        """
+        Whether the task's file has the state of this object, i.e., it was not changed (e.g., by another dex process)
+        since it was last read or written.
+
+        Returns:
+            (bool)
+        """
+        state = f"{self.content}\n{dexcode_header} {self.dexcode}"
+        return self._is_on_disk(state, hash_str(state))
 
     def edit(self) -> None:
         """
@@ -131,17 +346,79 @@ class Task:
         Returns:
             None
         """
-        initiate_editor(self.path)
+        # The editor must see the pending (journaled) changes of the task, and archived tasks need a file to edit
+        if self.dirty or self.archive is not None:
+            self.flush()
+        initiate_editor(self.disk_path)
 
-    def view(self) -> str:
+    def view(self, cache: Union[RenderCache, None] = None) -> str:
         """
         View the task in the terminal as colored/stylized output.
 
+        Args:
+            cache (RenderCache): If specified, rendered output is read from and stored in this cache, so viewing an
+                unchanged task does not render it again.
+
         Returns:
             str
         """
         content = "File has no content." if not self.content else self.content
-        return mdv.main(content)
+        if cache is None:
+            return mdv.main(content)
+        return cache.get_or_render(content, mdv.main, source=self.path)
+
+    def to_dict(self) -> dict:
+        """
+        The task as a JSON-serializable dict, e.g. for scripts and the HTTP server.
+
+        Returns:
+            (dict): The task's attributes, plus its computed priority and recurrence.
+        """
+        is_recurring, days_recurring = self.recurrence
+        return {
+            "dexid": self.dexid,
+            "name": self.name,
+            "status": self.status,
+            "due": self.due.strftime(due_date_fmt),
+            "effort": self.effort,
+            "importance": self.importance,
+            "flags": sorted(self.flags),
+            "recurring": days_recurring if is_recurring else None,
+            "priority": self.priority,
+            "path": self.path,
+        }
+
+    def reload(self) -> bool:
+        """
+        Re-read the task from its file, e.g. after the file was changed outside of dex. Listeners are notified of each
+        changed attribute, with reloading set.
+
+        Returns:
+            (bool): Whether anything changed.
+        """
+        fresh = Task.from_file(self.disk_path)
+        changed = fresh.content != self.content
+        self.content = fresh.content
+        self.file_stat = fresh.file_stat
+        self._state_hash = fresh._state_hash
+        self.reloading = True
+        try:
+            for attr in ("dexid", "due", "effort", "importance", "status"):
+                old, new = getattr(self, attr), getattr(fresh, attr)
+                if old != new:
+                    # one attribute at a time, so listeners see consistent old and current values
+                    setattr(self, attr, new)
+                    self._notify(attr, old, new)
+                    changed = True
+            if sorted(fresh.flags) != sorted(self.flags):
+                old_flags = list(self.flags)
+                self.flags = fresh.flags
+                self._recurrence = None
+                self._notify("flags", old_flags, list(self.flags))
+                changed = True
+        finally:
+            self.reloading = False
+        return changed
 
     # File state change methods
     ###########################
@@ -159,12 +436,24 @@ class Task:
         if new_name == self.name:
             return False
 
-        new_filename = f"{new_name}{task_extension}"  # since the name will not end with .md
-        new_path = os.path.join(self.prefix_path, new_filename)
-        os.rename(self.path, new_path)
-        self.path = new_path
-        self.relative_filename = new_filename
-        self.name = new_name
+        self._check_writable()
+        check_name_valid(new_name)
+        if self.archive is not None:
+            self.flush()
+        # The project lock keeps other processes from taking the new name at the same time
+        with project_lock(tasks_dir_of(self.disk_path)), self._locked():
+            old_name = self.name
+            new_filename = f"{new_name}{task_extension}"  # since the name will not end with .md
+            new_path = os.path.join(self.prefix_path, new_filename)
+            new_disk_path = os.path.join(os.path.dirname(self.disk_path), new_filename)
+            if name_is_taken(self.disk_path, new_name):
+                raise FileOverwriteError(f"Task already exists with the name {new_name}.")
+            os.rename(self.disk_path, new_disk_path)
+            self.path = new_path
+            self.disk_path = new_disk_path
+            self.relative_filename = new_filename
+            self.name = new_name
+            self._notify("name", old_name, new_name)
         return True
 
     def set_status(self, new_status: str) -> bool:
@@ -177,71 +466,250 @@ class Task:
         Returns:
             (bool): Whether the status was changed or not
         """
-        if new_status == self.status:
-            return False
+        with self._locked():
+            if new_status == self.status:
+                return False
+
+            self._check_writable()
+            events = self._change_status(new_status)
+            self._write_state()
+            for event in events:
+                self._notify(*event)
+        return True
+
+    def update(self, importance: Union[int, None] = None, effort: Union[int, None] = None,
+               due: Union[datetime.datetime, None] = None, status: Union[str, None] = None,
+               flags: Union[List[str], None] = None, recurring: Union[int, None] = None) -> bool:
+        """
+        Change several attributes of the task at once, writing the task's file only once. Attributes which are None
+        are not changed.
+
+        Args:
+            importance (int): The new importance.
+            effort (int): The new effort.
+            due (datetime.datetime): The new due date.
+            status (str): The new status (see set_status).
+            flags ([str]): The new flags (see set_flags), changed after the status, so a recurring task being done
+                recurs as before.
+            recurring (int): The new number of days until the task recurs (see set_recurrence), changed after the
+                flags.
 
+        Returns:
+            (bool): Whether anything was changed.
+        """
+        self._check_writable()
+        if flags is not None:
+            check_flags_valid(flags)
+            flags = list(dict.fromkeys(flags))
+        with self._locked():
+            events = []
+            for attr, value in (("importance", importance), ("effort", effort), ("due", due)):
+                if value is not None and value != getattr(self, attr):
+                    events.append((attr, getattr(self, attr), value))
+                    setattr(self, attr, value)
+            if status is not None and status != self.status:
+                events += self._change_status(status)
+            if recurring is not None:
+                flags = flags_with_recurrence(self.flags if flags is None else flags, recurring)
+            if flags is not None and flags != self.flags:
+                events.append(("flags", list(self.flags), list(flags)))
+                self.flags = flags
+                self._recurrence = None
+            if events:
+                self._write_state()
+                for event in events:
+                    self._notify(*event)
+        return bool(events)
+
+    def _change_status(self, new_status: str) -> list:
+        """
+        Change the status of the task and its path (between the active and inactive dirs) as needed, without
+        writing its state (which moves the file) or notifying listeners.
+
+        Args:
+            new_status (str): A status primitive as defined in constants.py
+
+        Returns:
+            [(str, object, object)]: The (event, old, new) notifications for the changes made.
+        """
         # For incomplete recurring tasks, keep the due date as it was previously (will go negative)
         # For recurring tasks being set to "done", move the due date to the current due date + recurrence time
         is_recurring, days_recurring = self.recurrence
 
+        old_due = self.due
         if new_status == done_str and is_recurring:
             # The status for a recurring task will remain undone
             self.due = self.due + datetime.timedelta(days=days_recurring)
             new_status = todo_str
 
+        old_status = self.status
+        self._apply("status", new_status)
+        events = []
+        if self.due != old_due:
+            events.append(("due", old_due, self.due))
+            # The status of a completed recurring task does not change, so tell listeners about the completion itself
+            events.append(("completed", old_due, self.due))
+        if self.status != old_status:
+            events.append(("status", old_status, self.status))
+        return events
+
+    def _apply(self, attribute: str, value) -> None:
+        """
+        Set an attribute (e.g., from a journal record) without writing the file or notifying listeners. Unlike
+        set_status, setting the status has no side effects other than changing the task's path as needed.
 
-        active_statuses = [ip_str, todo_str, hold_str]
-        inactive_statuses = [abandoned_str, done_str]
-        if (new_status in inactive_statuses and self.status in active_statuses) or \
-                (new_status in active_statuses and self.status in inactive_statuses):
-
-            if new_status in active_statuses and self.status in inactive_statuses:
-                appendage = os.pardir
-            elif new_status in inactive_statuses and self.status in active_statuses:
-                appendage = inactive_subdir
-            else:
-                raise ValueError("Conflict between new status and old status activity!")
-
-            new_prefix_path = os.path.abspath(os.path.join(self.prefix_path, appendage))
-            new_path = os.path.join(new_prefix_path, self.relative_filename)
-            os.rename(self.path, new_path)
-            self.prefix_path = new_prefix_path
-            self.path = new_path
-
+        Args:
+            attribute (str): One of "status", "due", "effort", "importance", "flags" or "dexid".
+            value: The new value.
 
-        self.status = new_status
-        self._write_state()
-        return True
+        Returns:
+            None
+        """
+        if attribute == "status":
+            if (value in (done_str, abandoned_str)) != (self.status in (done_str, abandoned_str)):
+                appendage = inactive_subdir if value in (done_str, abandoned_str) else os.pardir
+                self.prefix_path = os.path.abspath(os.path.join(self.prefix_path, appendage))
+                self.path = os.path.join(self.prefix_path, self.relative_filename)
+            self.status = value
+        elif attribute == "flags":
+            self.flags = list(value)
+            self._recurrence = None
+        elif attribute in ("due", "effort", "importance", "dexid"):
+            setattr(self, attribute, value)
+        else:
+            raise ValueError(f"Attribute '{attribute}' cannot be applied to a task.")
 
     def set_effort(self, new_effort: int) -> None:
-        self.effort = new_effort
-        self._write_state()
+        with self._locked():
+            if new_effort == self.effort:
+                return
+            self._check_writable()
+            old_effort = self.effort
+            self.effort = new_effort
+            self._write_state()
+            self._notify("effort", old_effort, new_effort)
 
     def set_importance(self, new_importance: int) -> None:
-        self.importance = new_importance
-        self._write_state()
+        with self._locked():
+            if new_importance == self.importance:
+                return
+            self._check_writable()
+            old_importance = self.importance
+            self.importance = new_importance
+            self._write_state()
+            self._notify("importance", old_importance, new_importance)
 
     def add_flag(self, flag: str) -> None:
-        if flag in self.flags:
-            raise ValueError(f"Flag '{flag}' already in flags: '{self.flags}")
-        else:
-            self.flags.append(flag)
-        self._write_state()
+        with self._locked():
+            if flag in self.flags:
+                raise ValueError(f"Flag '{flag}' already in flags: '{self.flags}")
+            else:
+                self._check_writable()
+                old_flags = list(self.flags)
+                self.flags.append(flag)
+                self._recurrence = None
+            self._write_state()
+            self._notify("flags", old_flags, list(self.flags))
 
     def rm_flag(self, flag: str) -> None:
-        if flag in self.flags:
-            self.flags.remove(flag)
-        else:
-            raise ValueError(f"Flag '{flag}' not in flags: '{self.flags}")
-        self._write_state()
+        with self._locked():
+            if flag in self.flags:
+                self._check_writable()
+                old_flags = list(self.flags)
+                self.flags.remove(flag)
+                self._recurrence = None
+            else:
+                raise ValueError(f"Flag '{flag}' not in flags: '{self.flags}")
+            self._write_state()
+            self._notify("flags", old_flags, list(self.flags))
+
+    def set_flags(self, flags: list) -> None:
+        """
+        Replace all the flags of the task, with a single write of its file.
+
+        Args:
+            flags ([str]): The new flags (duplicates are removed). Use ["n"] for no flags.
+
+        Returns:
+            None
+        """
+        check_flags_valid(flags)
+        flags = list(dict.fromkeys(flags))
+        with self._locked():
+            if flags == self.flags:
+                return
+            self._check_writable()
+            old_flags = list(self.flags)
+            self.flags = flags
+            self._recurrence = None
+            self._write_state()
+            self._notify("flags", old_flags, list(self.flags))
+
+    def set_recurrence(self, days: int) -> None:
+        """
+        Make the task recur every number of days after it is done, or make it non-recurring.
+
+        Args:
+            days (int): The number of days until the task recurs. 0 makes the task not recurring.
+
+        Returns:
+            None
+        """
+        with self._locked():
+            self.set_flags(flags_with_recurrence(self.flags, days))
+
+    def add_dependency(self, dexid: str) -> None:
+        """
+        Make this task depend on (be blocked by) another task, until the other task is done or abandoned.
+
+        Args:
+            dexid (str): The dexid of the task this task depends on.
+
+        Returns:
+            None
+        """
+        if dexid == self.dexid:
+            raise ValueError(f"Task {self.dexid} cannot depend on itself.")
+        self.add_flag(f"{dependency_flag}{dexid}")
+
+    def rm_dependency(self, dexid: str) -> None:
+        self.rm_flag(f"{dependency_flag}{dexid}")
 
     def set_due(self, due: datetime.datetime) -> None:
-        self.due = due
-        self._write_state()
+        with self._locked():
+            if due == self.due:
+                return
+            self._check_writable()
+            old_due = self.due
+            self.due = due
+            self._write_state()
+            self._notify("due", old_due, due)
 
     def set_dexid(self, dexid: str) -> None:
-        self.dexid = dexid
-        self._write_state()
+        with self._locked():
+            if dexid == self.dexid:
+                return
+            self._check_writable()
+            old_dexid = self.dexid
+            self.dexid = dexid
+            self._write_state()
+            self._notify("dexid", old_dexid, dexid)
+
+    def _notify(self, event: str, old, new) -> None:
+        """
+        Tell listeners (e.g., indexes held by the Executor) about a change to this task.
+
+        Args:
+            event (str): The name of the changed attribute (e.g., "status", "due"), "created" for new tasks, or
+                "completed" for completions of recurring tasks (whose status does not change).
+            old: The previous value.
+            new: The new value.
+
+        Returns:
+            None
+        """
+        for listener in self.listeners:
+            listener(self, event, old, new)
 
     # Properties
     ############
@@ -297,25 +765,44 @@ class Task:
 
     @property
     def modification_time(self):
-        return os.path.getmtime(self.path)
+        if self.archive is not None:
+            return self.archive.entries[self.relative_filename]["mtime"]
+        return os.path.getmtime(self.disk_path)
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = self.archive.read(self.relative_filename)
+        return self._content
+
+    @content.setter
+    def content(self, content: str) -> None:
+        self._content = content
 
     # Properties based on flags
     @property
     def recurrence(self) -> tuple:
         """
-        Determine recurrence and time period of recurrence
+        Determine recurrence and time period of recurrence. Parsed from the flags once, and again only after the
+        flags are changed with add_flag or rm_flag.
 
         Returns:
             tuple(bool, (int or None)): 2-tuple of the recurrence (True if recurrent) and the
             time period of recurrence (None if not recurrent).
         """
-        for flag in self.flags:
-            if "r" in flag:
-                days_str = flag.replace("r", "").strip()
-                days = int(days_str)
-                return True, days
-        else:
-            return False, None
+        if self._recurrence is None:
+            self._recurrence = parse_recurrence(self.flags)
+        return self._recurrence
+
+    @property
+    def dependencies(self) -> list:
+        """
+        The dexids of the tasks this task depends on, parsed from its dependency flags (e.g., "da3").
+
+        Returns:
+            ([str]): The dexids, sorted.
+        """
+        return parse_dependencies(self.flags)
 
     @property
     def dexcode(self) -> str:
@@ -328,6 +815,70 @@ class Task:
         return encode_dexcode(self.dexid, self.effort, self.due, self.importance, self.status, self.flags)
 
 
+def write_atomically(path: str, content: str) -> None:
+    """
+    Write a file by writing a temporary file next to it and replacing the file with it, so other processes reading the
+    file (e.g., loading tasks without taking their locks) never see it half written.
+
+    Args:
+        path (str): The path of the file.
+        content (str): The content.
+
+    Returns:
+        None
+    """
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    # Created like open(path, "w") would (permissions from the umask), keeping the permissions of an existing file
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def sync_directory(path: str) -> None:
+    """
+    Flush a directory's entries (e.g., files just created in it) to disk. Does nothing on platforms which cannot open
+    directories (e.g., Windows).
+
+    Args:
+        path (str): The path of the directory.
+
+    Returns:
+        None
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def file_stat(path: str) -> tuple:
+    """
+    Get the modification time (ns) and size of a file, for detecting whether it changed.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        (int, int): The mtime in nanoseconds and the size in bytes.
+    """
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
 def encode_dexcode(dexid: str, effort: int, due: datetime.datetime, importance: int, status: str, flags: list) -> str:
     """
     Create a dexcode from python objects which are easy to work with.
@@ -382,7 +933,8 @@ def decode_dexcode(dexcode: str) -> list:
             if not reqchar in code:
                 raise ValueError(f"Required token '{reqchar}' not found in '{code}' token string.")
 
-            c = code.replace(reqchar, "")
+            # Only strip the token's prefix, since flags may contain the same character (e.g., a dependency on "f2")
+            c = code.replace(reqchar, "", 1)
 
             if reqchar in ["e", "i", "s"]:
                 try:
@@ -439,6 +991,63 @@ def extract_dexcode_from_content(content: str) -> str:
         raise DexcodeException("Content missing required dexcode header on last line.")
 
 
+def parse_recurrence(flags: list) -> tuple:
+    """
+    Parse the recurrence from a list of task flags.
+
+    Args:
+        flags ([str]): List of flags
+
+    Returns:
+        tuple(bool, (int or None)): 2-tuple of the recurrence (True if recurrent) and the
+        time period of recurrence (None if not recurrent).
+    """
+    for flag in flags:
+        if flag.startswith(recurring_flag):
+            days = int(flag[len(recurring_flag):].strip())
+            return True, days
+    return False, None
+
+
+def flags_with_recurrence(flags: list, days: int) -> list:
+    """
+    Change the recurrence in a list of task flags, keeping the other flags.
+
+    Args:
+        flags ([str]): List of flags
+        days (int): The number of days until the task recurs. 0 makes the task not recurring.
+
+    Returns:
+        ([str]): The new list of flags.
+    """
+    flags = [f for f in flags if not f.startswith(recurring_flag)]
+    # if days is 0, all the recurrences have been removed, so only add one if days != 0
+    if days == 0 and no_flags not in flags:
+        flags.append(no_flags)
+    if days != 0:
+        flags.append(f"{recurring_flag}{days}")
+    return flags
+
+
+def parse_dependencies(flags: list) -> list:
+    """
+    Parse the dexids of dependencies from a list of task flags.
+
+    Args:
+        flags ([str]): List of flags
+
+    Returns:
+        ([str]): The dexids of the dependencies, sorted.
+    """
+    dexids = []
+    for flag in flags:
+        if flag.startswith(dependency_flag):
+            dexid = flag[len(dependency_flag):].strip()
+            if dexid[:1].isalpha() and dexid[1:].isdigit():
+                dexids.append(dexid)
+    return sorted(dexids)
+
+
 def check_flags_valid(flags: list) -> None:
     """
     Ensure list of task flags are valid
@@ -455,3 +1064,37 @@ def check_flags_valid(flags: list) -> None:
             raise ValueError(
                 f"Flags strings '{flags}' not containing all valid flags primitives: '{flags_primitives}'"
             )
+
+
+def check_name_valid(name: str) -> None:
+    """
+    Ensure a task name can be used as a file name in a tasks dir, i.e. it is not empty, has no path separators (so
+    the file cannot end up outside the dir) and does not start with "." (hidden files, "..").
+
+    Args:
+        name (str): The name of the task.
+
+    Returns:
+        None (throws exception if invalid)
+    """
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("Empty or space-only names not allowed.")
+    separators = [sep for sep in (os.sep, os.altsep) if sep]
+    if any(sep in name for sep in separators) or name.startswith("."):
+        raise ValueError(f"'{name}' is not a valid task name: names cannot contain {separators} or start with '.'.")
+
+
+def name_is_taken(path: str, name: str) -> bool:
+    """
+    Whether a task with a name exists in the project of a task file, in its active or inactive dir.
+
+    Args:
+        path (str): The path of a task file of the project.
+        name (str): The task name.
+
+    Returns:
+        (bool)
+    """
+    tasks_dir = tasks_dir_of(path)
+    filename = f"{name}{task_extension}"
+    return any(os.path.exists(os.path.join(d, filename)) for d in (tasks_dir, os.path.join(tasks_dir, inactive_subdir)))
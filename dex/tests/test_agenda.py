@@ -0,0 +1,50 @@
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.task import Task
+from dex.agenda import build_agenda, iter_occurrences
+
+
+class TestAgenda(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "task_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "task_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        # due 2020-07-25, recurring every 5 days
+        self.recurring = Task.from_file(os.path.join(self.test_dir, "recurring task.md"))
+        # due 2020-07-21, non-recurring
+        self.example = Task.from_file(os.path.join(self.test_dir, "example task.md"))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_iter_occurrences(self):
+        start, end = datetime.date(2020, 7, 20), datetime.date(2020, 8, 4)
+        occurrences = [(o.date.day, o.task.name, o.n) for o in
+                       iter_occurrences([self.recurring, self.example], start, end)]
+        self.assertListEqual(occurrences, [
+            (21, "example task", 0),
+            (25, "recurring task", 0),
+            (30, "recurring task", 1),
+            (4, "recurring task", 2)
+        ])
+
+    def test_build_agenda(self):
+        overdue, by_day = build_agenda([self.example, self.recurring], 10, start=datetime.date(2020, 7, 28))
+        self.assertListEqual([o.task for o in overdue], [self.example, self.recurring])
+        by_day = list(by_day)
+        self.assertListEqual([date for date, _ in by_day], [datetime.date(2020, 7, 30), datetime.date(2020, 8, 4)])
+        self.assertListEqual([o.n for _, occurrences in by_day for o in occurrences], [1, 2])
+
+        # recurrence is re-parsed only when flags change
+        self.recurring.rm_flag("r5")
+        self.recurring.add_flag("r20")
+        overdue, by_day = build_agenda([self.recurring], 30, start=datetime.date(2020, 7, 28))
+        self.assertListEqual([date for date, _ in by_day], [datetime.date(2020, 8, 14)])
+
+
+if __name__ == "__main__":
+    unittest.main()
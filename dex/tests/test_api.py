@@ -0,0 +1,61 @@
+import os
+import shutil
+import unittest
+
+from dex.api import iter_projects, iter_tasks, iter_ranked, lookup
+from dex.executor import Executor
+from dex.exceptions import ReadOnlyException
+from dex.constants import done_str, todo_str, ip_str
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.ignored = ["ignored_directory"]
+
+        self.executor = Executor(self.test_dir, ignored_dirs=self.ignored)
+        self.tasks = {t.name: t for t in self.executor.all_tasks}
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_iter_tasks(self):
+        projects = list(iter_projects(self.test_dir, ignored_dirs=self.ignored))
+        self.assertListEqual([(p.id, p.name) for p in projects], [("a", "project b"), ("b", "project a")])
+
+        tasks = list(iter_tasks(self.test_dir, ignored_dirs=self.ignored))
+        self.assertEqual({t.dexid for t in tasks}, {t.dexid for t in self.tasks.values()})
+
+        active = list(iter_tasks(self.test_dir, statuses=[todo_str, ip_str], ignored_dirs=self.ignored))
+        self.assertEqual({t.name for t in active}, {"example task", "weekly recurring?"})
+        done = iter_tasks(self.test_dir, projects=["project b"], statuses=[done_str], ignored_dirs=self.ignored)
+        self.assertListEqual([t.name for t in done], ["done task"])
+        self.assertListEqual(list(iter_tasks(self.test_dir, projects=["c"], ignored_dirs=self.ignored)), [])
+
+        # Tasks are read-only
+        self.assertRaises(ReadOnlyException, active[0].set_status, done_str)
+
+    def test_iter_ranked(self):
+        expected = [t.dexid for t in self.executor.get_n_highest_priority_tasks(0, include_inactive=True)]
+        ranked = iter_ranked(self.test_dir, include_inactive=True, ignored_dirs=self.ignored)
+        self.assertListEqual([t.dexid for t in ranked], expected)
+        self.assertListEqual([t.dexid for t in iter_ranked(self.test_dir, ignored_dirs=self.ignored)], expected[:2])
+
+        paged = iter_ranked(self.test_dir, n=2, offset=1, include_inactive=True, ignored_dirs=self.ignored)
+        self.assertListEqual([t.dexid for t in paged], expected[1:3])
+
+    def test_lookup_and_journal(self):
+        t_done = self.tasks["done task"]
+        self.assertEqual(lookup(self.test_dir, t_done.dexid, ignored_dirs=self.ignored).name, "done task")
+        self.assertIsNone(lookup(self.test_dir, "z1", ignored_dirs=self.ignored))
+
+        # Pending journaled changes are applied, even though the task file is not moved yet
+        self.executor.enable_journal()
+        t_example = self.tasks["example task"]
+        t_example.set_status(done_str)
+        self.assertEqual(lookup(self.test_dir, t_example.dexid, ignored_dirs=self.ignored).status, done_str)
+        done = iter_tasks(self.test_dir, statuses=[done_str], ignored_dirs=self.ignored)
+        self.assertEqual({t.name for t in done}, {"done task", "example task"})
@@ -0,0 +1,113 @@
+import os
+import time
+import shutil
+import unittest
+
+from dex.executor import Executor
+from dex.archive import Archive
+from dex.exceptions import ArchiveException
+from dex.constants import done_str, todo_str, archive_fname
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for t in self.executor.all_tasks}
+        self.t_done = tasks["done task"]
+        self.t_abandoned = tasks["abandoned task"]
+        self.contents = {t.name: t.content for t in (self.t_done, self.t_abandoned)}
+
+        # Only the done task is old enough to be archived
+        old = time.time() - 40 * 86400
+        os.utime(self.t_done.path, (old, old))
+        os.utime(self.t_abandoned.path, None)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def reload(self) -> Executor:
+        return Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+
+    def test_archive_and_load(self):
+        path = self.t_done.path
+        pack = os.path.join(os.path.dirname(path), archive_fname)
+        archived = self.executor.archive(30)
+        self.assertListEqual([t for tasks in archived.values() for t in tasks], [self.t_done])
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(pack))
+        self.assertTrue(os.path.exists(self.t_abandoned.path))
+        self.assertEqual(self.executor.archive(30), {"a": [], "b": []})
+
+        # Archived tasks are loaded from the index only; their content is read when needed
+        reloaded = self.reload()
+        t = reloaded.get_task(self.t_done.dexid)
+        self.assertIsNotNone(t.archive)
+        self.assertEqual(t.status, done_str)
+        self.assertIsNone(t._content)
+        self.assertEqual(t.content, self.contents["done task"])
+        self.assertIn(t, reloaded.get_tasks_by_due(include_inactive=True))
+        self.assertAlmostEqual(t.modification_time, time.time() - 40 * 86400, delta=60)
+
+    def test_unarchive_on_change(self):
+        self.executor.archive(30)
+        reloaded = self.reload()
+        t = reloaded.get_task(self.t_done.dexid)
+        pack = t.archive.path
+
+        # Reopening the task writes it back to a task file and removes it from the archive (and the empty pack)
+        t.set_status(todo_str)
+        self.assertIsNone(t.archive)
+        self.assertTrue(os.path.exists(t.path))
+        self.assertNotEqual(os.path.dirname(t.path), os.path.dirname(pack))
+        self.assertFalse(os.path.exists(pack))
+        with open(t.path, "r") as f:
+            self.assertTrue(f.read().startswith(self.contents["done task"]))
+
+        # The first executor picks up the unarchived task file on refresh
+        self.assertTrue(self.executor.refresh())
+        self.assertEqual(self.executor.get_task(self.t_done.dexid).status, todo_str)
+
+    def test_concurrent_rewrites(self):
+        other = self.reload()
+        other.all_tasks
+        self.executor.archive(30)
+
+        # Tasks archived by another executor since they were loaded are skipped
+        self.assertEqual(other.archive(30), {"a": [], "b": []})
+        directory = os.path.dirname(self.executor.get_task(self.t_done.dexid).path)
+        self.assertListEqual(list(Archive(directory).entries), ["done task.md"])
+
+        # Rewriting a pack keeps the tasks added to it since it was read
+        first, second = Archive(directory), Archive(directory)
+        weekly = [t for t in self.executor.all_tasks if t.name == "weekly recurring?"][0]
+        first.add([weekly])
+        second.remove(["done task.md"])
+        self.assertListEqual(list(second.entries), ["weekly recurring?.md"])
+        self.assertListEqual(list(Archive(directory).entries), ["weekly recurring?.md"])
+
+    def test_refresh(self):
+        other = self.reload()
+        other.archive(30)
+        self.assertTrue(self.executor.refresh())
+        t = self.executor.get_task(self.t_done.dexid)
+        self.assertIsNotNone(t.archive)
+        self.assertEqual(t.content, self.contents["done task"])
+        self.assertFalse(self.executor.refresh())
+
+    def test_pack(self):
+        directory = os.path.dirname(self.t_done.path)
+        archive = Archive(directory)
+        archive.add([self.t_done, self.t_abandoned])
+        archive.remove([self.t_done.relative_filename])
+        archive = Archive(directory)
+        self.assertEqual(len(archive), 1)
+        self.assertEqual(archive.read(self.t_abandoned.relative_filename), self.contents["abandoned task"])
+        self.assertRaises(ArchiveException, archive.read, self.t_done.relative_filename)
+
+        # A task file takes precedence over an archived task with the same name
+        self.assertListEqual(archive.tasks(skip=[self.t_abandoned.relative_filename]), [])
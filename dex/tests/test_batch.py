@@ -0,0 +1,116 @@
+import io
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.batch import parse_batch_line, run_batch, apply_changes, read_import_rows, run_import
+from dex.exceptions import BatchException
+from dex.constants import done_str, hold_str, abandoned_str, todo_str, inactive_subdir
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.tasks = {t.name: t for p in self.executor.projects for t in p.tasks.all}
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_batch_line(self):
+        self.assertEqual(parse_batch_line("a3 a7 b12 done"), (["a3", "a7", "b12"], {"status": done_str}))
+        self.assertEqual(parse_batch_line("b2 imp 4"), (["b2"], {"importance": 4}))
+        self.assertEqual(parse_batch_line("a4 set -s hold --effort 2"), (["a4"], {"status": hold_str, "effort": 2}))
+        dexids, changes = parse_batch_line("c1 due 2020-09-01 -r 7")
+        self.assertEqual(changes, {"due": datetime.datetime(2020, 9, 1), "recurring": 7})
+        self.assertEqual(parse_batch_line('{"ids": ["a3", "a7"], "action": "aban"}'),
+                         (["a3", "a7"], {"status": abandoned_str}))
+        self.assertEqual(parse_batch_line('{"id": "b2", "importance": 1}'), (["b2"], {"importance": 1}))
+
+        for bad_line in ("done", "a3 finish", "a3 imp 9", "a3 due", "a3 set -x 1", '{"action": "done"}',
+                         '{"id": "a3", "color": "red"}', "{not json"):
+            with self.assertRaises(BatchException):
+                parse_batch_line(bad_line)
+
+    def test_run_batch(self):
+        example, recurring = self.tasks["example task"], self.tasks["weekly recurring?"]
+        done = self.tasks["done task"]
+        lines = [
+            f"{example.dexid} {recurring.dexid} imp 3",
+            "# a comment",
+            f"{example.dexid} done",
+            f"z99 done",
+            f"{done.dexid} set -s todo -e 1",
+            "nonsense",
+        ]
+        results = run_batch(self.executor, lines)
+        self.assertListEqual([(r.item, r.dexid, r.ok) for r in results], [
+            (1, example.dexid, True), (1, recurring.dexid, True), (3, example.dexid, True), (4, "z99", False),
+            (5, done.dexid, True), (6, None, False)
+        ])
+        self.assertEqual(example.importance, 3)
+        self.assertEqual(example.status, done_str)
+        self.assertEqual(os.path.basename(example.prefix_path), inactive_subdir)
+        self.assertEqual(recurring.importance, 3)
+        self.assertEqual((done.status, done.effort), (todo_str, 1))
+        self.assertNotEqual(os.path.basename(done.prefix_path), inactive_subdir)
+
+        # changes were written to the files, and the executor's index was kept up to date
+        reloaded = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(reloaded.get_task(example.dexid).status, done_str)
+        self.assertEqual(self.executor.index.count("status", done_str), 1)
+
+    def test_apply_changes_writes_once(self):
+        example = self.tasks["example task"]
+        writes = []
+        original_write_state = example._write_state
+        example._write_state = lambda: writes.append(1) or original_write_state()
+        results = apply_changes([(example, {"importance": 1, "effort": 1}), (example, {"status": hold_str}),
+                                 (example, {"recurring": 3})])
+        self.assertListEqual(results, [(example, None)])
+        self.assertEqual(len(writes), 1)
+        self.assertTupleEqual((example.status, example.recurrence), (hold_str, (True, 3)))
+        self.assertEqual((example.importance, example.effort, example.status), (1, 1, hold_str))
+
+    def test_run_import(self):
+        project = self.executor.project_map[self.tasks["example task"].dexid[0]]
+        max_number = max(int(t.dexid[1:]) for t in project.tasks.all)
+        rows = "\n".join([
+            "name,effort,importance,due,status,recurring,content",
+            "first,3,4,2020-09-01,,,some notes",
+            "bad effort,9,4,2020-09-01,,,",
+            "example task,1,1,2020-09-01,,,",
+            "old,1,1,2020-09-01,done,,",
+            "first,1,1,2020-09-01,,,",
+            "weekly,2,2,0,,7,",
+        ])
+        results = run_import(project, read_import_rows(io.StringIO(rows), "csv"))
+        self.assertListEqual([(r.item, r.ok) for r in results],
+                             [(2, True), (3, False), (4, False), (5, True), (6, False), (7, True)])
+        # Dexids are allocated consecutively, in order of rows
+        self.assertListEqual([r.dexid for r in results if r.ok],
+                             [f"{project.id}{max_number + i}" for i in (1, 2, 3)])
+
+        first, old, weekly = (project.get_task(r.dexid) for r in results if r.ok)
+        self.assertEqual((first.effort, first.importance, first.due, first.content),
+                         (3, 4, datetime.datetime(2020, 9, 1), "some notes"))
+        self.assertEqual(os.path.basename(old.prefix_path), inactive_subdir)
+        self.assertEqual(weekly.flags, ["r7"])
+        self.assertEqual(self.executor.get_task(weekly.dexid), weekly)
+
+        reloaded = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(reloaded.get_task(first.dexid).content, "some notes")
+        self.assertEqual(reloaded.get_task(old.dexid).status, done_str)
+
+        jsonl = '{"name": "from json", "effort": 1, "importance": 5, "due": 3, "flags": "n"}\n\n[1, 2]\n'
+        results = run_import(project, read_import_rows(io.StringIO(jsonl), "jsonl"))
+        self.assertListEqual([(r.item, r.ok) for r in results], [(1, True), (3, False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
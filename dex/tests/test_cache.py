@@ -0,0 +1,85 @@
+import os
+import shutil
+import unittest
+
+from dex.cache import RenderCache
+from dex.task import Task
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "task_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "task_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.cache_dir = os.path.join(self.test_dir, "render_cache")
+        self.n_renders = 0
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def renderer(self, content):
+        self.n_renders += 1
+        return content.upper()
+
+    def test_get_or_render(self):
+        cache = RenderCache(self.cache_dir)
+        self.assertEqual(cache.get_or_render("some *content*", self.renderer), "SOME *CONTENT*")
+        self.assertEqual(cache.get_or_render("some *content*", self.renderer), "SOME *CONTENT*")
+        self.assertEqual(self.n_renders, 1)
+
+        # changing the content of a source invalidates its previous entry
+        source = os.path.join(self.test_dir, "example task.md")
+        cache.get_or_render("version 1", self.renderer, source=source)
+        old_key = cache.key("version 1")
+        cache.get_or_render("version 2", self.renderer, source=source)
+        self.assertIsNone(cache.get(old_key))
+        self.assertEqual(cache.get(cache.key("version 2")), "VERSION 2")
+
+    def test_lru_eviction(self):
+        cache = RenderCache(self.cache_dir)
+        keys = []
+        for i in range(5):
+            content = f"{i}" * 100
+            cache.get_or_render(content, self.renderer)
+            keys.append(cache.key(content))
+            os.utime(os.path.join(self.cache_dir, keys[-1] + ".txt"), (i, i))
+
+        # touch the oldest entry so it becomes the most recently used
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.max_bytes = 250
+        self.assertEqual(cache.evict(), 3)
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[4]))
+        for key in keys[1:4]:
+            self.assertIsNone(cache.get(key))
+
+    def test_source_eviction(self):
+        cache = RenderCache(self.cache_dir)
+        keys = []
+        for i in range(3):
+            content = f"{i}" * 100
+            cache.get_or_render(content, self.renderer, source=os.path.join(self.test_dir, f"task {i}.md"))
+            keys.append(cache.key(content))
+            os.utime(os.path.join(self.cache_dir, keys[-1] + ".txt"), (i, i))
+
+        # The records of the sources count toward the size, and are removed with their entries
+        def n_sources():
+            return len([fn for fn in os.listdir(self.cache_dir) if fn.endswith(".src")])
+
+        self.assertEqual(n_sources(), 3)
+        cache.max_bytes = 300
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(n_sources(), 2)
+
+    def test_task_view(self):
+        t = Task.from_file(os.path.join(self.test_dir, "recurring task.md"))
+        t.content = "# Some *content*"
+        cache = RenderCache(self.cache_dir)
+        cache.put(cache.key(t.content), "rendered task")
+        self.assertEqual(t.view(cache=cache), "rendered task")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.dependency import DependencyGraph
+from dex.task import Task, encode_dexcode, decode_dexcode
+from dex.exceptions import DependencyException
+from dex.constants import abandoned_str, todo_str, ip_str
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for p in self.executor.projects for t in p.tasks.all}
+        self.t_example = tasks["example task"]
+        self.t_weekly = tasks["weekly recurring?"]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_dependency_flags(self):
+        due = datetime.datetime(2020, 7, 21)
+        dexcode = encode_dexcode("a1", 2, due, 3, todo_str, ["n", "df2", "da10"])
+        self.assertListEqual(decode_dexcode(dexcode)[5], ["n", "df2", "da10"])
+
+        path = os.path.join(self.test_dir, "dependent.md")
+        t = Task("a1", path, 2, due, 3, todo_str, ["n", "df2", "da10"])
+        self.assertListEqual(t.dependencies, ["a10", "f2"])
+        self.assertRaises(ValueError, t.add_dependency, "a1")
+
+    def test_blocking(self):
+        e = self.executor
+        e_id, w_id = self.t_example.dexid, self.t_weekly.dexid
+        self.assertFalse(e.dependencies.is_blocked(self.t_example))
+
+        # Both tasks are active; the weekly task has the higher priority
+        ranked = e.get_n_highest_priority_tasks(2)
+        self.assertListEqual(ranked, [self.t_weekly, self.t_example])
+
+        e.add_dependency(w_id, e_id)
+        self.assertTrue(e.dependencies.is_blocked(self.t_weekly))
+        self.assertListEqual(e.dependencies.blockers(self.t_weekly), [self.t_example])
+        self.assertListEqual(e.dependencies.dependents(self.t_example), [self.t_weekly])
+        ranked = e.get_n_highest_priority_tasks(2)
+        self.assertListEqual(ranked, [self.t_example, self.t_weekly])
+        self.assertNotIn(self.t_weekly, e.get_tasks_within_budget(20))
+
+        # Cycles, unknown tasks and duplicates are rejected
+        self.assertTrue(e.dependencies.would_cycle(e_id, w_id))
+        self.assertRaises(DependencyException, e.add_dependency, e_id, w_id)
+        self.assertRaises(DependencyException, e.add_dependency, e_id, "z1")
+        self.assertRaises(DependencyException, e.add_dependency, w_id, e_id)
+
+        # Finishing the dependency unblocks the task, and reopening it blocks it again
+        self.t_example.set_status(abandoned_str)
+        self.assertFalse(e.dependencies.is_blocked(self.t_weekly))
+        self.t_example.set_status(ip_str)
+        self.assertTrue(e.dependencies.is_blocked(self.t_weekly))
+
+        # Dependencies are read back from the files
+        reloaded = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        t_weekly = reloaded.get_task(w_id)
+        self.assertListEqual(t_weekly.dependencies, [e_id])
+        self.assertTrue(reloaded.dependencies.is_blocked(t_weekly))
+
+        self.t_weekly.rm_dependency(e_id)
+        self.assertFalse(e.dependencies.is_blocked(self.t_weekly))
+        self.assertListEqual(e.dependencies.dependents(self.t_example), [])
+
+    def test_created_and_deleted(self):
+        graph = DependencyGraph([self.t_example, self.t_weekly])
+        path = os.path.join(os.path.dirname(self.t_example.path), "new task.md")
+        new = Task.new("a9", path, 1, datetime.datetime(2020, 7, 21), 1, todo_str, ["n"])
+
+        # A dependency on a task which does not exist yet does not block until the task is created
+        self.t_example.add_dependency("a9")
+        graph.update(self.t_example, "flags", [], self.t_example.flags)
+        self.assertFalse(graph.is_blocked(self.t_example))
+        graph.update(new, "created", None, new)
+        self.assertTrue(graph.is_blocked(self.t_example))
+        graph.update(new, "deleted", new, None)
+        self.assertFalse(graph.is_blocked(self.t_example))
+
+    def test_cycles_in_files(self):
+        self.t_example.add_dependency(self.t_weekly.dexid)
+        self.t_weekly.add_dependency(self.t_example.dexid)
+        graph = DependencyGraph([self.t_example, self.t_weekly])
+        self.assertEqual(len(graph.cycles), 1)
+        self.assertEqual(int(graph.is_blocked(self.t_example)) + int(graph.is_blocked(self.t_weekly)), 1)
+
+    def test_order(self):
+        self.t_example.add_dependency(self.t_weekly.dexid)
+        graph = DependencyGraph([self.t_example, self.t_weekly])
+        self.assertListEqual(graph.order([self.t_example, self.t_weekly]), [self.t_weekly, self.t_example])
@@ -5,7 +5,9 @@ import unittest
 import datetime
 
 from dex.executor import Executor
-from dex.constants import executor_fname, default_executor, status_primitives
+from dex.task import write_counts
+from dex.exceptions import ReadOnlyException, FileOverwriteError
+from dex.constants import executor_fname, default_executor, status_primitives, done_str, inactive_subdir
 
 
 class TestExecutor(unittest.TestCase):
@@ -32,6 +34,115 @@ class TestExecutor(unittest.TestCase):
             def_ex_week = json.load(f)
         self.assertDictEqual(def_ex_week, default_executor)
 
+    def test_loading_does_not_write(self):
+        Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        written = write_counts["written"]
+        # Project ids are kept in the root, so tasks are not coerced (rewritten) again
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(write_counts["written"], written)
+        self.assertListEqual([p.name for p in executor.projects], ["project b", "project a"])
+
+    def add_stray_task(self):
+        # A task of "project b" (id a) with the dexid of a task of "project a" (id b), on which the weekly task depends
+        tasks_dir = os.path.join(self.test_dir, "project b", "tasks")
+        with open(os.path.join(tasks_dir, "weekly recurring?.md"), "r") as f:
+            content = f.read()
+        with open(os.path.join(tasks_dir, "stray task.md"), "w") as f:
+            f.write(content.replace("a401", "b900"))
+        with open(os.path.join(tasks_dir, "weekly recurring?.md"), "w") as f:
+            f.write(content.replace(".fr7]}", ".fr7&db900&db211]}"))
+
+    def test_project_ids(self):
+        # A root from before ids were kept: the ids of its projects are seeded from the dexids of their tasks
+        week = dict(default_executor, Monday=["b"], Tuesday=["a", "b"])
+        with open(os.path.join(self.test_dir, executor_fname), "w") as f:
+            json.dump(week, f)
+        written = write_counts["written"]
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        executor.all_tasks
+        self.assertEqual(write_counts["written"], written)
+        self.assertListEqual([(p.id, p.name) for p in executor.projects], [("a", "project b"), ("b", "project a")])
+        self.assertListEqual(sorted(t.dexid for t in executor.all_tasks), ["a19", "a401", "b211", "b63"])
+        self.assertDictEqual(executor.executor_week, week)
+
+        # Ids are kept when a project is added before the others in order of folder name
+        os.makedirs(os.path.join(self.test_dir, "0 project", "tasks"))
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(write_counts["written"], written)
+        self.assertListEqual([(p.id, p.name) for p in executor.projects],
+                             [("a", "project b"), ("b", "project a"), ("c", "0 project")])
+
+    def test_coerced_dependencies(self):
+        self.add_stray_task()
+        written = write_counts["written"]
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+
+        # Only the stray task is coerced, and the dependency on it follows; the one on the example task is kept
+        self.assertEqual(write_counts["written"], written + 2)
+        self.assertEqual(executor.get_task("a900").name, "stray task")
+        weekly = executor.get_task("a401")
+        self.assertListEqual(weekly.dependencies, ["a900", "b211"])
+        self.assertListEqual([t.name for t in executor.dependencies.blockers(weekly)], ["stray task", "example task"])
+
+    def test_read_only(self):
+        shutil.rmtree(os.path.join(self.test_dir, "project b", "notes"))
+
+        def snapshot():
+            files = {}
+            for dirpath, dirnames, filenames in os.walk(self.test_dir):
+                files[dirpath] = None
+                for fn in filenames:
+                    path = os.path.join(dirpath, fn)
+                    with open(path, "r") as f:
+                        files[path] = (os.path.getmtime(path), f.read())
+            return files
+
+        self.add_stray_task()
+        before = snapshot()
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"], read_only=True)
+        executor.refresh()
+        executor.all_tasks
+        self.assertDictEqual(snapshot(), before)
+        self.assertDictEqual(executor.executor_week, default_executor)
+
+        # Tasks with mismatching project ids are reported instead of coerced
+        mismatches = {pid: sorted(dexids) for pid, dexids in executor.pid_mismatches.items()}
+        self.assertDictEqual(mismatches, {"a": ["b900"]})
+
+        t = executor.get_n_highest_priority_tasks(1)[0]
+        status = t.status
+        self.assertRaises(ReadOnlyException, t.set_status, done_str)
+        self.assertEqual(t.status, status)
+        self.assertRaises(ReadOnlyException, t.rename, "new name")
+        self.assertRaises(ReadOnlyException, executor.projects[0].create_new_task, "new task", 1,
+                          datetime.datetime(2020, 7, 21), 1, "todo", ["n"])
+        self.assertDictEqual(snapshot(), before)
+
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertDictEqual(executor.pid_mismatches, {})
+
+    def test_lazy_inactive(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(len(executor.loaded_tasks), 2)
+
+        # Default views and active collections do not load the inactive tasks
+        self.assertEqual(len(executor.get_n_highest_priority_tasks(10)), 2)
+        self.assertEqual(len(executor.get_tasks_by_due()), 2)
+        self.assertEqual(sum(len(p.tasks.todo) + len(p.tasks.ip) for p in executor.projects), 2)
+        self.assertEqual(len(executor.loaded_tasks), 2)
+
+        # Inactive tasks are loaded on first access, and added to the index
+        self.assertEqual(len(executor.get_n_highest_priority_tasks(10, include_inactive=True)), 4)
+        self.assertEqual(len(executor.index), 4)
+
+        done = [t for p in executor.projects for t in p.tasks.done]
+        self.assertEqual(len(done), 1)
+
+        # Getting an inactive task only loads the inactive tasks of its project
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(executor.get_task(done[0].dexid).status, "done")
+        self.assertEqual(len(executor.index), 3)
+
     def test_task_prios(self):
         executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
         tasks_conglomerated = executor.get_tasks(only_today=False)
@@ -43,6 +154,94 @@ class TestExecutor(unittest.TestCase):
         tasks = executor.get_n_highest_priority_tasks(100, include_inactive=True)
         self.assertEqual(len(tasks), 4)
 
+    def test_task_pagination(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        ranked = executor.get_n_highest_priority_tasks(100, include_inactive=True)
+        self.assertListEqual(executor.get_n_highest_priority_tasks(2), ranked[:2])
+        paged = executor.get_n_highest_priority_tasks(1, offset=1, include_inactive=True)
+        self.assertListEqual(paged, ranked[1:2])
+        self.assertListEqual(executor.get_n_highest_priority_tasks(5, offset=10), [])
+
+        # Held tasks are removed before ranking, not after
+        for t in executor.get_n_highest_priority_tasks(100, include_held=False):
+            self.assertFalse(t.hold)
 
+    def test_refresh(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        other = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertFalse(executor.refresh())
 
+        task = other.get_n_highest_priority_tasks(1)[0]
+        task.set_status("done")
+        self.assertTrue(executor.refresh())
+        self.assertEqual(executor.get_task(task.dexid).status, task.status)
+        self.assertEqual(executor.index.count("status", task.status), 2 if task.status == "done" else 1)
 
+        os.makedirs(os.path.join(self.test_dir, "project c", "tasks"))
+        self.assertTrue(executor.refresh())
+        self.assertEqual(len(executor.projects), 3)
+        self.assertEqual(len(executor.get_tasks_by_due(include_inactive=True)), 4)
+
+    def test_move_task(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for t in executor.all_tasks}
+        example, weekly, done = tasks["example task"], tasks["weekly recurring?"], tasks["done task"]
+        weekly.add_dependency(example.dexid)
+        source, target = executor.project_map[example.dexid[0]], executor.project_map[weekly.dexid[0]]
+        old_dexid, old_path = example.dexid, example.path
+        new_number = max(int(t.dexid[1:]) for t in target.tasks.all) + 1
+
+        written = write_counts["written"]
+        moved = executor.move_task(old_dexid, target.id)
+        # The moved task and its dependent are each written once
+        self.assertEqual(write_counts["written"], written + 2)
+        self.assertIs(moved, example)
+        self.assertEqual(example.dexid, f"{target.id}{new_number}")
+        self.assertEqual(example.prefix_path, target.tasks_dir)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertIsNone(executor.get_task(old_dexid))
+        self.assertIs(executor.get_task(example.dexid), example)
+        self.assertNotIn(example, source.tasks.all)
+        self.assertEqual(executor.index.project_id(example), target.id)
+        # The dependent task follows the new dexid, and is still blocked
+        self.assertListEqual(weekly.dependencies, [example.dexid])
+        self.assertListEqual(executor.dependencies.blockers(weekly), [example])
+
+        # Inactive tasks move to the inactive dir
+        executor.move_task(done.dexid, source.id)
+        self.assertEqual(os.path.basename(done.prefix_path), inactive_subdir)
+        self.assertEqual(os.path.dirname(done.prefix_path), source.tasks_dir)
+
+        reloaded = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(reloaded.get_task(example.dexid).name, "example task")
+        self.assertEqual(reloaded.get_task(done.dexid).name, "done task")
+        self.assertListEqual(reloaded.get_task(weekly.dexid).dependencies, [example.dexid])
+
+        # A task with the same name in the other project is not overwritten
+        target.create_new_task("done task", 1, example.due, 1, "todo", ["n"])
+        self.assertRaises(FileOverwriteError, executor.move_task, done.dexid, target.id)
+        self.assertIs(executor.get_task(done.dexid), done)
+
+    def test_rename_project(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for t in executor.all_tasks}
+        example, weekly = tasks["example task"], tasks["weekly recurring?"]
+        weekly.add_dependency(example.dexid)
+        written = write_counts["written"]
+
+        # Renaming changes the order of the folders, but not the ids
+        executor.project_map["b"].rename("z project")
+        os.makedirs(os.path.join(self.test_dir, "new project", "tasks"))
+        reloaded = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.assertEqual(write_counts["written"], written)
+        self.assertListEqual([(p.id, p.name) for p in reloaded.projects],
+                             [("a", "project b"), ("b", "z project"), ("c", "new project")])
+        weekly = reloaded.get_task(weekly.dexid)
+        self.assertListEqual([t.name for t in reloaded.dependencies.blockers(weekly)], ["example task"])
+
+    def test_tasks_within_budget(self):
+        executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        # only active tasks are candidates: "weekly recurring?" (effort 2) and "example task" (effort 4)
+        self.assertListEqual([t.name for t in executor.get_tasks_within_budget(3)], ["weekly recurring?"])
+        self.assertEqual(len(executor.get_tasks_within_budget(6)), 2)
+        self.assertListEqual(executor.get_tasks_within_budget(1), [])
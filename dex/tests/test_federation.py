@@ -0,0 +1,53 @@
+import os
+import shutil
+import unittest
+
+from dex.federation import FederatedExecutor, federated_dexid, split_federated_dexid
+from dex.exceptions import FederationException
+
+
+class TestFederatedExecutor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        self.roots = {}
+        for name in ("work", "home"):
+            path = os.path.join(self.test_dir, name)
+            shutil.copytree(self.originals_dir, path)
+            self.roots[name] = (path, ["ignored_directory"])
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_merged_ranking(self):
+        fe = FederatedExecutor(self.roots)
+        self.assertListEqual(list(fe.executors.keys()), ["work", "home"])
+
+        ranked = fe.get_n_highest_priority_tasks(4)
+        self.assertEqual(len(ranked), 4)
+        self.assertListEqual([t.name for _, t in ranked],
+                             ["weekly recurring?", "weekly recurring?", "example task", "example task"])
+        self.assertSetEqual({root for root, _ in ranked[:2]}, {"work", "home"})
+        self.assertEqual(len(fe.get_n_highest_priority_tasks(100, include_inactive=True)), 8)
+        self.assertEqual(len(fe.get_n_highest_priority_tasks(0, include_inactive=True)), 8)
+
+        root, task = ranked[0]
+        namespaced = federated_dexid(root, task)
+        self.assertTupleEqual(split_federated_dexid(namespaced), (root, task.dexid))
+        self.assertEqual(fe.get_task(namespaced), (root, task))
+
+        with self.assertRaises(FederationException):
+            fe.get_task("nowhere:a1")
+        with self.assertRaises(FederationException):
+            split_federated_dexid("a1")
+
+    def test_invalid_roots(self):
+        with self.assertRaises(FederationException):
+            FederatedExecutor({})
+        with self.assertRaises(FederationException):
+            FederatedExecutor({"missing": (os.path.join(self.test_dir, "missing"), [])})
+
+
+if __name__ == "__main__":
+    unittest.main()
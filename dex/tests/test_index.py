@@ -0,0 +1,65 @@
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.constants import done_str, todo_str
+
+
+class TestTaskIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.tasks = {t.name: t for p in self.executor.projects for t in p.tasks.all}
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_views(self):
+        e = self.executor
+        self.assertEqual(len(e.index), 4)
+        by_due = [t.name for t in e.get_tasks_by_due(include_inactive=True)]
+        self.assertListEqual(by_due, ["weekly recurring?", "done task", "abandoned task", "example task"])
+        self.assertListEqual([t.name for t in e.get_tasks_by_due(1, offset=1)], ["example task"])
+
+        by_importance = [t.name for t in e.get_tasks_by_attribute("importance", include_inactive=True)]
+        self.assertEqual(by_importance[:2], ["weekly recurring?", "done task"])
+        self.assertListEqual([t.name for t in e.get_tasks_by_attribute("effort", where="status=todo")],
+                             ["weekly recurring?"])
+        self.assertEqual(e.index.count("status", done_str), 1)
+
+        with self.assertRaises(ValueError):
+            e.index.iter_by_attribute("status")
+
+    def test_updated_on_mutation(self):
+        e = self.executor
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        example_task = self.tasks["example task"]
+        example_task.set_due(today + datetime.timedelta(days=2))
+        self.assertListEqual(e.get_tasks_due_within(3), [example_task])
+        self.assertListEqual(e.get_tasks_due_within(1), [])
+        self.assertEqual(e.get_tasks_by_due()[-1], example_task)
+
+        example_task.set_importance(5)
+        example_task.set_dexid(example_task.dexid + "0")
+        self.assertEqual(e.index.count("importance", 5), 2)
+        self.assertListEqual(e.get_tasks_due_within(3), [example_task])
+
+        done_task = self.tasks["done task"]
+        done_task.set_status(todo_str)
+        self.assertEqual(e.index.count("status", done_str), 0)
+        self.assertIn(done_task, e.get_tasks_by_due())
+
+        project = e.projects[0]
+        new_task = project.create_new_task("new task", 1, today, 1, todo_str, ["n"])
+        self.assertListEqual(e.get_tasks_due_within(0), [new_task])
+        self.assertEqual(len(e.index), 5)
+        self.assertGreater(e.generation, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import json
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.journal import Journal
+from dex.exceptions import JournalException
+from dex.constants import done_str, ip_str, todo_str, inactive_subdir, journal_fname
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.journal_path = os.path.join(self.test_dir, journal_fname)
+
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for t in self.executor.all_tasks}
+        self.executor.enable_journal()
+        self.t_example = tasks["example task"]
+        self.t_weekly = tasks["weekly recurring?"]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def reload(self) -> Executor:
+        return Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+
+    def test_changes_are_journaled(self):
+        path = self.t_example.path
+        with open(path, "r") as f:
+            original = f.read()
+
+        self.t_example.set_importance(1)
+        self.t_example.set_status(done_str)
+        self.assertTrue(self.t_example.dirty)
+
+        # The task file is neither rewritten nor moved until compaction
+        self.assertTrue(os.path.exists(path))
+        with open(path, "r") as f:
+            self.assertEqual(f.read(), original)
+        self.assertListEqual([r["attr"] for r in self.executor.journal.pending], ["importance", "status"])
+
+        # Another executor replays the pending changes
+        reloaded = self.reload()
+        t = reloaded.get_task(self.t_example.dexid)
+        self.assertEqual(t.importance, 1)
+        self.assertEqual(t.status, done_str)
+        self.assertIn(t, reloaded.get_tasks_by_due(include_inactive=True))
+        self.assertNotIn(t, reloaded.get_tasks_by_due())
+
+        self.assertEqual(self.executor.compact(), 1)
+        self.assertFalse(self.t_example.dirty)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(self.t_example.path))
+        self.assertEqual(os.path.basename(os.path.dirname(self.t_example.path)), inactive_subdir)
+        self.assertListEqual(self.executor.journal.pending, [])
+
+        # Nothing is pending, so the files alone give the current state
+        reloaded = self.reload()
+        t = reloaded.get_task(self.t_example.dexid)
+        self.assertEqual(t.importance, 1)
+        self.assertEqual(t.status, done_str)
+
+    def test_undo(self):
+        old_due = self.t_weekly.due
+        self.t_example.set_status(done_str)
+        self.t_weekly.set_due(datetime.datetime(2030, 1, 1))
+        self.executor.compact()
+
+        t, record = self.executor.undo()
+        self.assertIs(t, self.t_weekly)
+        self.assertEqual(record["attr"], "due")
+        self.assertEqual(self.t_weekly.due, old_due)
+        self.assertEqual(self.executor.journal.pending[-1]["undoes"], record["seq"])
+
+        t, record = self.executor.undo()
+        self.assertIs(t, self.t_example)
+        self.assertEqual(self.t_example.status, ip_str)
+        self.assertIn(self.t_example, self.executor.get_tasks_by_due())
+        self.assertRaises(JournalException, self.executor.undo)
+
+        reloaded = self.reload()
+        self.assertEqual(reloaded.get_task(self.t_example.dexid).status, ip_str)
+        self.assertEqual(reloaded.get_task(self.t_weekly.dexid).due, old_due)
+
+    def test_load(self):
+        self.t_weekly.set_status(ip_str)
+        self.t_weekly.set_effort(5)
+        self.executor.compact()
+        self.t_weekly.set_status(todo_str)
+
+        # A torn last line is ignored
+        with open(self.journal_path, "a") as f:
+            f.write('{"seq": 4, "ts": 15')
+        journal = Journal(self.journal_path)
+        self.assertEqual(journal.seq, 3)
+        self.assertEqual(len(journal.records), 3)
+        self.assertListEqual([r["new"] for r in journal.pending], [todo_str])
+
+        # Compaction trims the history to the most recent records
+        journal.history_max = 2
+        journal.compact(self.executor.all_tasks)
+        journal = Journal(self.journal_path)
+        self.assertListEqual([r["seq"] for r in journal.records], [2, 3])
+        self.assertEqual(journal.compacted_seq, 3)
+        with open(self.journal_path, "r") as f:
+            self.assertDictEqual(json.loads(f.readlines()[-1]), {"compacted": 3})
+
+    def test_shared_journal(self):
+        other = self.reload()
+        self.t_weekly.set_effort(5)
+        other.get_task(self.t_example.dexid).set_importance(1)
+        self.t_weekly.set_importance(2)
+
+        # Seqs are allocated from the journal file, and changes of the other executor are applied in memory
+        self.assertListEqual([r["seq"] for r in Journal(self.journal_path).records], [1, 2, 3])
+        self.assertEqual(self.t_example.importance, 1)
+        self.assertEqual(other.get_task(self.t_weekly.dexid).effort, 5)
+
+        # Compaction writes the changes of both executors
+        self.executor.compact()
+        self.assertListEqual(Journal(self.journal_path).pending, [])
+        reloaded = self.reload()
+        self.assertEqual(reloaded.get_task(self.t_example.dexid).importance, 1)
+        self.assertEqual(reloaded.get_task(self.t_weekly.dexid).importance, 2)
+
+        # Changes of tasks which were not written are not marked compacted
+        other.get_task(self.t_weekly.dexid).set_status(ip_str)
+        self.executor.journal.compact([self.t_example])
+        self.assertListEqual([r["seq"] for r in Journal(self.journal_path).pending], [4])
+        self.assertEqual(self.reload().get_task(self.t_weekly.dexid).status, ip_str)
+        self.assertTrue(self.executor.refresh())
+        self.assertEqual(self.executor.get_task(self.t_weekly.dexid).status, ip_str)
+
+    def test_disable(self):
+        self.t_example.set_status(done_str)
+        self.executor.disable_journal()
+        self.assertFalse(os.path.exists(self.journal_path))
+        self.assertTrue(os.path.exists(self.t_example.path))
+
+        # Without a journal, changes are written right away
+        self.t_weekly.set_effort(5)
+        self.assertFalse(self.t_weekly.dirty)
+        self.assertEqual(self.reload().get_task(self.t_weekly.dexid).effort, 5)
+        self.assertRaises(JournalException, self.executor.undo)
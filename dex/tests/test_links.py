@@ -0,0 +1,71 @@
+import os
+import shutil
+import unittest
+
+from dex.executor import Executor
+from dex.links import LinkGraph, parse_links, link_key
+
+
+class TestLinkGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.graph_path = os.path.join(self.test_dir, "ignored_directory", "links.json")
+
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        pmap = {p.name: p for p in self.executor.projects}
+        self.a = pmap["project a"]
+        self.b = pmap["project b"]
+        self.t_example = [t for t in self.a.tasks.all if t.name == "example task"][0]
+        self.t_done = [t for t in self.b.tasks.all if t.name == "done task"][0]
+        self.t_weekly = [t for t in self.b.tasks.all if t.name == "weekly recurring?"][0]
+        self.t_abandoned = [t for t in self.a.tasks.all if t.name == "abandoned task"][0]
+        self.note_a = os.path.join(self.a.notes_dir, "unused_file.md")
+        self.note_b = os.path.join(self.b.notes_dir, "unused_file.md")
+
+        self.t_example.content = "See [[Done Task]] and [[unused_file|the notes]], and [[missing page]]."
+        self.t_example._write_state()
+        self.t_done.content = "Back to [[example task#heading]]."
+        self.t_done._write_state()
+        with open(self.note_b, "w") as f:
+            f.write("Embedded: ![[done task]]")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_links(self):
+        content = "[[a]] [[b|alias]] [[c#section|alias]] ![[d]] [[a]] [[ ]] [not a link]"
+        self.assertListEqual(parse_links(content), ["a", "b", "c", "d"])
+        self.assertEqual(link_key("folder/Some Note.md"), "some note")
+
+    def test_graph(self):
+        graph = self.executor.get_link_graph(LinkGraph(self.test_dir, path=self.graph_path))
+        self.assertEqual(len(graph), 6)
+
+        # Links to a name shared by notes in both projects resolve to the note in the same project
+        self.assertListEqual(graph.outlinks(self.t_example.path), [self.t_done.path, self.note_a])
+        self.assertListEqual(graph.unresolved(self.t_example.path), ["missing page"])
+        self.assertListEqual(graph.backlinks(self.t_done.path), sorted([self.t_example.path, self.note_b]))
+        self.assertListEqual(graph.backlinks(self.t_example.path), [self.t_done.path])
+        self.assertListEqual(graph.neighbors(self.t_example.path), sorted([self.t_done.path, self.note_a]))
+        self.assertListEqual(graph.orphans(), sorted([self.t_weekly.path, self.t_abandoned.path]))
+
+    def test_incremental_update(self):
+        graph = LinkGraph(self.test_dir, path=self.graph_path)
+        self.assertTupleEqual(graph.update(self.executor.projects), (6, 0))
+        self.assertTupleEqual(graph.update(self.executor.projects), (0, 0))
+
+        # The links are persisted, so a new graph does not re-read any files
+        graph = LinkGraph(self.test_dir, path=self.graph_path)
+        self.assertTupleEqual(graph.update(self.executor.projects), (0, 0))
+        self.assertListEqual(graph.backlinks(self.t_example.path), [self.t_done.path])
+
+        self.t_weekly.content = "Related to [[example task]]"
+        self.t_weekly._write_state()
+        os.remove(self.note_b)
+        self.assertTupleEqual(graph.update(self.executor.projects), (1, 1))
+        self.assertListEqual(graph.backlinks(self.t_example.path), sorted([self.t_done.path, self.t_weekly.path]))
+        self.assertListEqual(graph.backlinks(self.t_done.path), [self.t_example.path])
+        self.assertNotIn(self.note_b, graph)
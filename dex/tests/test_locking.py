@@ -0,0 +1,84 @@
+import os
+import shutil
+import unittest
+import multiprocessing
+
+from dex.task import Task
+from dex.project import Project
+from dex.executor import Executor
+from dex.locking import fcntl
+from dex.exceptions import ConflictException
+from dex.constants import done_str, todo_str, locks_dirname
+
+n_processes = 4
+n_changes = 15
+
+
+def add_flags(path: str, worker: int) -> None:
+    # A stale task object: every change must first pick up the changes of the other processes
+    t = Task.from_file(path)
+    for i in range(n_changes):
+        t.add_flag(f"da{1000 * (worker + 1) + i}")
+
+
+def create_tasks(project_path: str, worker: int) -> None:
+    p = Project.from_files(project_path, "a")
+    for i in range(n_changes):
+        p.create_new_task(f"worker {worker} task {i}", 1, p.tasks.all[0].due, 1, todo_str, ["n"])
+
+
+@unittest.skipIf(fcntl is None, "No fcntl file locks on this platform.")
+class TestLocking(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+
+        # Coerce the project ids of the fixture tasks once, so the workers do not rewrite them
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.tasks = {t.name: t for t in self.executor.all_tasks}
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def run_workers(self, target, arg) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=target, args=(arg, w)) for w in range(n_processes)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join(timeout=120)
+            self.assertEqual(w.exitcode, 0)
+
+    def test_concurrent_changes_are_not_lost(self):
+        t = self.tasks["example task"]
+        flags = list(t.flags)
+        self.run_workers(add_flags, t.path)
+        expected = flags + [f"da{1000 * (w + 1) + i}" for w in range(n_processes) for i in range(n_changes)]
+        self.assertEqual(sorted(Task.from_file(t.path).flags), sorted(expected))
+        self.assertTrue(os.path.exists(os.path.join(os.path.dirname(t.path), locks_dirname)))
+
+    def test_concurrent_creation(self):
+        project = self.executor.project_map["a"]
+        self.run_workers(create_tasks, project.path)
+        project = Project.from_files(project.path, "a")
+        dexids = [t.dexid for t in project.tasks.all]
+        self.assertEqual(len(dexids), 2 + n_processes * n_changes)
+        self.assertEqual(len(set(dexids)), len(dexids))
+
+    def test_stale_task_is_reread(self):
+        t = self.tasks["example task"]
+        other = Task.from_file(t.path)
+        other.set_importance(1)
+        other.set_status(done_str)
+
+        # The stale object follows the file to the inactive dir, and keeps the other change
+        t.set_effort(5)
+        self.assertEqual(t.status, done_str)
+        self.assertEqual(os.path.dirname(t.path), os.path.dirname(other.path))
+        fresh = Task.from_file(other.path)
+        self.assertEqual((fresh.importance, fresh.effort, fresh.status), (1, 5, done_str))
+
+        os.remove(other.path)
+        self.assertRaises(ConflictException, t.set_effort, 4)
@@ -0,0 +1,48 @@
+import random
+import itertools
+import unittest
+from types import SimpleNamespace
+
+from dex.logic import select_tasks_within_budget, rank_tasks
+from dex.util import AttrDict
+
+
+class TestSelectTasksWithinBudget(unittest.TestCase):
+    def test_matches_exhaustive_search(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            tasks = [SimpleNamespace(effort=rng.randint(1, 5), priority=rng.uniform(0.1, 50)) for _ in range(10)]
+            budget = rng.randint(1, 15)
+            best = max(sum(t.priority for t in subset)
+                       for n in range(len(tasks) + 1) for subset in itertools.combinations(tasks, n)
+                       if sum(t.effort for t in subset) <= budget)
+            selected = select_tasks_within_budget(tasks, budget)
+            self.assertLessEqual(sum(t.effort for t in selected), budget)
+            self.assertAlmostEqual(sum(t.priority for t in selected), best)
+            self.assertListEqual(selected, sorted(selected, key=lambda t: t.priority, reverse=True))
+
+    def test_many_tasks(self):
+        rng = random.Random(1)
+        tasks = [SimpleNamespace(effort=rng.randint(1, 5), priority=rng.uniform(0.1, 50)) for _ in range(5000)]
+        selected = select_tasks_within_budget(tasks, 40)
+        self.assertLessEqual(sum(t.effort for t in selected), 40)
+        self.assertListEqual(select_tasks_within_budget(tasks, 0), [])
+
+        # A budget larger than the total effort of the tasks selects them all, without a table that wide
+        selected = select_tasks_within_budget(tasks[:100], 10 ** 9)
+        self.assertListEqual(selected, sorted(tasks[:100], key=lambda t: t.priority, reverse=True))
+
+
+
+class TestRankTasks(unittest.TestCase):
+    def test_abandoned_order(self):
+        abandoned = [SimpleNamespace(dexid=f"a{i}", priority=0.0) for i in (3, 1, 2)]
+        collection = AttrDict(todo=[], ip=[], hold=[], done=[], abandoned=abandoned)
+
+        # Abandoned tasks are ordered by dexid, so pages of the ranking do not overlap
+        pages = [rank_tasks(collection, limit=1, offset=i, include_inactive=True) for i in range(3)]
+        self.assertListEqual([t.dexid for page in pages for t in page], ["a1", "a2", "a3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.planner import Planner
+from dex.constants import hold_str
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.tasks = {t.name: t for p in self.executor.projects for t in p.tasks.all}
+        self.monday = datetime.date(2020, 7, 20)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_executor_plan(self):
+        # every project is scheduled every day by default; the effort 4 task never fits
+        planner = self.executor.plan(2, start=self.monday)
+        self.assertListEqual([t.name for t in planner.days[0][1]], ["weekly recurring?"])
+        self.assertTrue(all(not planned for _, planned in planner.days[1:]))
+        self.assertListEqual([t.name for t in planner.unplanned], ["example task"])
+        self.assertEqual(planner.load(self.monday), 2)
+
+    def test_incremental_replan(self):
+        e = self.executor
+        recurring, example = self.tasks["weekly recurring?"], self.tasks["example task"]
+        recurring_pid, example_pid = e.index.project_id(recurring), e.index.project_id(example)
+        week = {"Monday": [recurring_pid], "Tuesday": "all"}
+        planner = Planner(week, 4, e.project_map.keys(), start=self.monday)
+        planner.plan((t, e.index.project_id(t)) for t in e.index.iter_by_due())
+        for p in e.projects:
+            p.listeners.append(planner.listener(p.id))
+
+        # inactive tasks are never planned; each task only goes on days its project is scheduled
+        self.assertEqual(planner.planned_date(recurring), self.monday)
+        self.assertEqual(planner.planned_date(example), self.monday + datetime.timedelta(days=1))
+        self.assertIsNone(planner.planned_date(self.tasks["done task"]))
+
+        example.set_effort(5)
+        self.assertListEqual(planner.unplanned, [example])
+        recurring.set_status(hold_str)
+        self.assertIsNone(planner.planned_date(recurring))
+        example.set_effort(1)
+        self.assertEqual(planner.planned_date(example), self.monday + datetime.timedelta(days=1))
+        new_task = e.project_map[example_pid].create_new_task("new task", 3, datetime.datetime(2020, 7, 20), 5,
+                                                             "todo", ["n"])
+        self.assertEqual(planner.planned_date(new_task), self.monday + datetime.timedelta(days=1))
+        self.assertListEqual(planner.days[1][1], [new_task, example])
+
+        # incremental replanning gives the same plan as planning from scratch
+        from_scratch = Planner(week, 4, e.project_map.keys(), start=self.monday)
+        from_scratch.plan((t, e.index.project_id(t)) for t in e.index.iter_by_due())
+        self.assertListEqual(planner.days, from_scratch.days)
+        self.assertListEqual(planner.unplanned, from_scratch.unplanned)
+
+        with self.assertRaises(ValueError):
+            Planner(week, 0, e.project_map.keys())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,8 +53,17 @@ class TestProject(unittest.TestCase):
         new_project_path = os.path.join(self.test_dir, new_project_name)
         proj.rename(new_project_name)
 
+        # The loaded tasks are rebased, so they can still be changed without loading the project again
+        self.assertEqual(proj.path, new_project_path)
+        for t in proj.tasks.all:
+            self.assertTrue(t.path.startswith(new_project_path + os.sep))
+            self.assertTrue(os.path.exists(t.path))
+            t.set_importance(1)
+        self.assertTrue(os.path.exists(proj.notes_dir))
+
         proj = Project.from_files(new_project_path, "a")
         self.assertEqual(proj.name, new_project_name)
+        self.assertTrue(all(t.importance == 1 for t in proj.tasks.all))
 
     def test_task_behavior(self):
         test_projdir = os.path.join(self.test_dir, "project a")
@@ -88,6 +97,28 @@ class TestProject(unittest.TestCase):
         for dexid, task in proj.task_map.items():
             self.assertEqual(dexid, task.dexid)
 
+    def test_refresh(self):
+        test_projdir = os.path.join(self.test_dir, "project a")
+        proj = Project.from_files(test_projdir, "a")
+        # Another process with its own view of the same files
+        other = Project.from_files(test_projdir, "a")
+        events = []
+        proj.listeners.append(lambda t, event, old, new: events.append((t.dexid, event)))
+        self.assertFalse(proj.refresh())
+
+        other.task_map["a401"].update(importance=1, status="hold")
+        new_task = other.create_new_task("new task", 1, datetime.datetime(2099, 1, 1), 3, "todo", ["n"])
+        os.remove(other.task_map["a41"].path)
+
+        self.assertTrue(proj.refresh())
+        self.assertEqual(proj.task_map["a401"].importance, 1)
+        self.assertEqual(proj.task_map["a401"].status, "hold")
+        self.assertIn(new_task.dexid, proj.task_map)
+        self.assertNotIn("a41", proj.task_map)
+        self.assertSetEqual(set(events), {("a401", "importance"), ("a401", "status"), ("a41", "deleted"),
+                                          (new_task.dexid, "created")})
+        self.assertFalse(proj.refresh())
+
     def test_process_project_id(self):
 
         for expr in ["AL", "1", "One", "::"]:
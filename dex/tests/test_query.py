@@ -0,0 +1,58 @@
+import os
+import shutil
+import unittest
+import datetime
+
+from dex.executor import Executor
+from dex.query import compile_query
+from dex.constants import due_date_fmt
+from dex.exceptions import QueryException
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.today = datetime.datetime.strptime("2020-07-18", due_date_fmt)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def matching_names(self, expression):
+        query = compile_query(expression, today=self.today)
+        tasks = self.executor.get_tasks(only_today=False, where=query)
+        return sorted(t.name for sp in tasks for t in tasks[sp])
+
+    def test_comparisons(self):
+        self.assertListEqual(self.matching_names("importance>=4"), ["done task", "weekly recurring?"])
+        self.assertListEqual(self.matching_names("importance>=4 and due<=7 and recurring"), ["weekly recurring?"])
+        self.assertListEqual(self.matching_names("due>2021-08-10"), ["example task"])
+        self.assertListEqual(self.matching_names("eff=2, flag=n"), ["abandoned task"])
+        self.assertListEqual(self.matching_names("name~'TASK' and not inactive"), ["example task"])
+        self.assertListEqual(self.matching_names("status=ip or (held or recurrence<=7)"),
+                             ["example task", "weekly recurring?"])
+        self.assertListEqual(self.matching_names("project~'project a'"), ["abandoned task", "example task"])
+
+    def test_pushdown(self):
+        query = compile_query("project=zzz and status=todo and effort>1")
+        for p in self.executor.projects:
+            self.assertFalse(query.matches_project(p))
+        self.assertTrue(query.matches_status("todo"))
+        self.assertFalse(query.matches_status("ip"))
+
+        ranked = self.executor.get_n_highest_priority_tasks(10, include_inactive=True, where="active")
+        self.assertEqual(len(ranked), 2)
+        self.assertTrue(all(t.status in ("todo", "ip") for t in ranked))
+
+    def test_invalid_queries(self):
+        for expression in ["", "importance>", "importance>>4", "status<todo", "(recurring", "colour=red",
+                           "effort=high", "due<=tomorrow", "frobnicated"]:
+            with self.assertRaises(QueryException):
+                compile_query(expression)
+
+
+if __name__ == "__main__":
+    unittest.main()
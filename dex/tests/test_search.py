@@ -0,0 +1,107 @@
+import os
+import shutil
+import unittest
+
+from dex.executor import Executor
+from dex.search import SearchIndex, tokenize
+from dex.constants import todo_str, done_str
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.index_path = os.path.join(self.test_dir, "ignored_directory", "search.sqlite")
+
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        pmap = {p.name: p for p in self.executor.projects}
+        self.a = pmap["project a"]
+        self.b = pmap["project b"]
+        self.t_example = [t for t in self.a.tasks.all if t.name == "example task"][0]
+        self.t_done = [t for t in self.b.tasks.all if t.name == "done task"][0]
+
+        self.t_example.content = "Deploy the server.\nThe server needs a new certificate before deploying."
+        self.t_example._write_state()
+        self.t_done.content = "Server maintenance notes: rotate logs."
+        self.t_done._write_state()
+        with open(os.path.join(self.a.notes_dir, "unused_file.md"), "w") as f:
+            f.write("Deployment checklist for the staging server")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_tokenize(self):
+        self.assertListEqual(tokenize("Deploy the SERVER, v2!"), ["deploy", "the", "server", "v2"])
+
+    def test_search(self):
+        with SearchIndex(self.test_dir, path=self.index_path) as index:
+            n_indexed, n_removed = index.update(self.executor.projects)
+            self.assertEqual(n_indexed, 6)
+            self.assertEqual(n_removed, 0)
+
+            results = index.search("server")
+            self.assertEqual(len(results), 3)
+            # The example task mentions the server twice
+            self.assertEqual(results[0].dexid, self.t_example.dexid)
+            self.assertEqual(results[0].status, self.t_example.status)
+            self.assertEqual({r.kind for r in results}, {"task", "note"})
+            self.assertTrue(all(results[i].score >= results[i + 1].score for i in range(len(results) - 1)))
+
+            # All terms must match
+            self.assertListEqual([r.dexid for r in index.search("server rotate")], [self.t_done.dexid])
+            self.assertListEqual(index.search("server nonexistent"), [])
+            self.assertListEqual(index.search(""), [])
+
+            # Prefix terms
+            results = index.search("deploy*")
+            self.assertEqual(len(results), 2)
+            self.assertEqual({r.kind for r in results}, {"task", "note"})
+
+            # The dexcode is not indexed, but task names are
+            self.assertListEqual(index.search("dexcode"), [])
+            self.assertListEqual([r.dexid for r in index.search("example")], [self.t_example.dexid])
+
+            # Filters
+            results = index.search("server", statuses=[done_str])
+            self.assertListEqual([r.dexid for r in results], [self.t_done.dexid])
+            results = index.search("server", projects=[self.a.path])
+            self.assertEqual(len(results), 2)
+            self.assertTrue(all(r.project == self.a.path for r in results))
+            self.assertEqual(len(index.search("server", n=1)), 1)
+
+    def test_incremental_update(self):
+        with SearchIndex(self.test_dir, path=self.index_path) as index:
+            index.update(self.executor.projects)
+
+            # Nothing changed, nothing is reindexed
+            self.assertTupleEqual(index.update(self.executor.projects), (0, 0))
+
+            # Only changed files are reindexed, with their new content and status. The task moved out of the inactive
+            # dir, so its old path is removed
+            self.t_done.content = "Nothing to see here."
+            self.t_done.set_status(todo_str)
+            self.assertTupleEqual(index.update(self.executor.projects), (1, 1))
+            self.assertListEqual(index.search("rotate"), [])
+            results = index.search("nothing")
+            self.assertEqual(results[0].status, todo_str)
+            self.assertEqual(results[0].path, self.t_done.path)
+
+            os.remove(os.path.join(self.a.notes_dir, "unused_file.md"))
+            self.assertTupleEqual(index.update(self.executor.projects), (0, 1))
+            self.assertEqual(len(index), 5)
+            self.assertListEqual(index.search("checklist"), [])
+
+        # The index persists on disk
+        with SearchIndex(self.test_dir, path=self.index_path) as index:
+            self.assertEqual(len(index), 5)
+            self.assertTupleEqual(index.update(self.executor.projects), (0, 0))
+
+    def test_executor_search(self):
+        index = SearchIndex(self.test_dir, path=self.index_path)
+        results = self.executor.search("server", project_ids=[self.b.id], index=index)
+        self.assertListEqual([r.dexid for r in results], [self.t_done.dexid])
+        results = self.executor.search("server", statuses=[self.t_example.status], index=index)
+        self.assertListEqual([r.dexid for r in results], [self.t_example.dexid])
+        index.close()
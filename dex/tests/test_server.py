@@ -0,0 +1,125 @@
+import os
+import shutil
+import threading
+import unittest
+import http.client
+
+from dex.executor import Executor
+from dex.task import write_counts
+from dex.server import DexServer
+from dex.client import DexClient
+from dex.exceptions import ClientException
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        self.server = DexServer(self.executor, port=0, workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = DexClient(port=self.server.server_address[1])
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def test_queries(self):
+        c = self.client
+        tasks = c.tasks()
+        self.assertListEqual([t["name"] for t in tasks], ["weekly recurring?", "example task"])
+        self.assertEqual(tasks[0]["recurring"], 7)
+        self.assertEqual(len(c.tasks(include_inactive=True)), 4)
+        self.assertListEqual([t["name"] for t in c.tasks(n=1, offset=1)], ["example task"])
+        self.assertListEqual([t["name"] for t in c.tasks(where="status=ip")], ["example task"])
+        self.assertEqual(c.task(tasks[1]["dexid"])["status"], "ip")
+        self.assertSetEqual({p["name"] for p in c.projects()}, {"project a", "project b"})
+        self.assertEqual(c.stats()["n_tasks"], 4)
+
+        with self.assertRaises(ClientException) as cm:
+            c.task("z99")
+        self.assertEqual(cm.exception.status, 404)
+        with self.assertRaises(ClientException) as cm:
+            c.tasks(where="importance>>")
+        self.assertEqual(cm.exception.status, 400)
+
+        # Only the most recently used responses are cached
+        with DexClient(port=self.server.server_address[1], max_cached=1) as small:
+            small.tasks()
+            small.projects()
+            self.assertListEqual(list(small._cache), ["/projects"])
+
+    def test_mutations_and_conditional_requests(self):
+        c = self.client
+        example = c.tasks(where="status=ip")[0]
+        generation = c.stats()["generation"]
+        # unchanged, so the cached response is revalidated rather than re-sent
+        self.assertEqual(c.stats()["generation"], generation)
+
+        updated = c.update_task(example["dexid"], importance=5, due="2021-01-01")
+        self.assertEqual(updated["importance"], 5)
+        self.assertEqual(self.executor.get_task(example["dexid"]).importance, 5)
+        self.assertGreater(c.stats()["generation"], generation)
+        with self.assertRaises(ClientException):
+            c.update_task(example["dexid"], importance=10)
+
+        created = c.create_task(example["project_id"], "new task", 2, "2021-02-01", 3, flags=["r7"])
+        self.assertEqual(created["recurring"], 7)
+        self.assertEqual(len(c.tasks()), 3)
+        with self.assertRaises(ClientException):
+            c.create_task(example["project_id"], "new task", 2, "2021-02-01", 3)
+
+        # Names which would put the file outside the tasks dir, and empty flags, are rejected
+        for name in ("../../escaped", "sub/task", "..", ".hidden"):
+            with self.assertRaises(ClientException):
+                c.create_task(example["project_id"], name, 2, "2021-02-01", 3)
+        with self.assertRaises(ClientException):
+            c._request("POST", f"/projects/{example['project_id']}/tasks",
+                       {"name": "no flags", "effort": 1, "due": "2021-02-01", "importance": 1, "flags": []})
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, os.pardir, "escaped.md")))
+
+        # Flags and name can be changed too
+        updated = c.update_task(example["dexid"], flags=["r3"], name="renamed task")
+        self.assertEqual((updated["name"], updated["recurring"]), ("renamed task", 3))
+        self.assertEqual(self.executor.get_task(example["dexid"]).name, "renamed task")
+        with self.assertRaises(ClientException):
+            c.update_task(example["dexid"], name="../renamed")
+
+        # All field changes are written at once, and nothing is changed if the new name is taken
+        written = write_counts["written"]
+        c.update_task(example["dexid"], importance=1, effort=1, status="todo", flags=["n"])
+        self.assertEqual(write_counts["written"], written + 1)
+        with self.assertRaises(ClientException) as cm:
+            c.update_task(example["dexid"], importance=3, name="new task")
+        self.assertEqual(cm.exception.status, 400)
+        self.assertEqual(c.task(example["dexid"])["importance"], 1)
+        self.assertEqual(self.executor.get_task(example["dexid"]).name, "renamed task")
+
+    def test_external_changes(self):
+        c = self.client
+        example = c.tasks(where="status=ip")[0]
+        etag = self.client._cache[f"/tasks?n=0&offset=0&where=status%3Dip"][0]
+
+        # Changed by another process, e.g. the CLI
+        other = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        other.get_task(example["dexid"]).set_importance(1)
+        self.assertEqual(c.task(example["dexid"])["importance"], 1)
+        self.assertEqual(c.tasks(where="status=ip")[0]["importance"], 1)
+        self.assertNotEqual(self.client._cache[f"/tasks?n=0&offset=0&where=status%3Dip"][0], etag)
+
+    def test_bad_content_length(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        conn.putrequest("POST", "/tasks/a1")
+        conn.putheader("Content-Length", "many")
+        conn.endheaders()
+        self.assertEqual(conn.getresponse().status, 400)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import datetime
+import unittest
+
+import numpy as np
+
+from dex.executor import Executor
+from dex.events import EventLog, event_dtype_fields
+from dex.stats import summarize, cycle_times
+from dex.constants import done_str, ip_str, todo_str, events_fname, status_primitives_ints_inverted as status_ints
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        self.originals_dir = os.path.join(self.this_dir, "executor_files/originals/")
+        self.test_dir = os.path.join(self.this_dir, "executor_files/for_tests")
+        shutil.copytree(self.originals_dir, self.test_dir)
+        self.events_path = os.path.join(self.test_dir, events_fname)
+
+        self.executor = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        tasks = {t.name: t for t in self.executor.all_tasks}
+        self.t_example = tasks["example task"]
+        self.t_weekly = tasks["weekly recurring?"]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_transitions_are_logged(self):
+        self.assertFalse(os.path.exists(self.events_path))
+        due = self.t_weekly.due
+        self.t_example.set_status(done_str)
+        self.t_weekly.set_status(ip_str)
+        # Completing a recurring task leaves it todo, but is logged as a completion
+        self.t_weekly.set_status(done_str)
+        self.assertEqual(self.t_weekly.status, todo_str)
+
+        events = EventLog(self.events_path).array()
+        self.assertEqual(len(events), 4)
+        self.assertListEqual([e.decode() for e in events["project"]], [self.t_example.dexid[0]] + [self.t_weekly.dexid[0]] * 3)
+        self.assertListEqual(list(events["new"]), [status_ints[s] for s in (done_str, ip_str, done_str, todo_str)])
+        self.assertEqual(events["due"][2], due.toordinal())
+
+        s = self.executor.stats(days=7)
+        self.assertEqual(s["completions"], 2)
+        self.assertDictEqual(s["per_day"], {datetime.date.today(): 2})
+        self.assertDictEqual(s["per_project"], {self.t_example.dexid[0]: 1, self.t_weekly.dexid[0]: 1})
+        # The example task was started before the log began, so only the weekly task has a cycle time
+        self.assertEqual(s["cycle_time"]["n"], 1)
+        self.assertAlmostEqual(s["cycle_time"]["percentiles"][50], 0, places=3)
+        self.assertEqual(self.executor.stats(project_ids=[self.t_example.dexid[0]])["completions"], 1)
+
+    def test_refresh_and_read_only(self):
+        other = Executor(self.test_dir, ignored_dirs=["ignored_directory"])
+        other.get_task(self.t_example.dexid).set_status(done_str)
+        self.assertEqual(len(EventLog(self.events_path)), 1)
+
+        # Changes made (and logged) by another process are not logged again
+        self.assertTrue(self.executor.refresh())
+        self.assertEqual(len(EventLog(self.events_path)), 1)
+
+        # Nor are those picked up by re-reading a task before changing it
+        other.get_task(self.t_weekly.dexid).set_status(ip_str)
+        self.t_weekly.set_importance(2)
+        self.assertEqual(self.t_weekly.status, ip_str)
+        self.assertEqual(len(EventLog(self.events_path)), 2)
+
+        # A torn last record is ignored
+        with open(self.events_path, "ab") as f:
+            f.write(b"\x00" * 5)
+        self.assertEqual(len(EventLog(self.events_path).array()), 2)
+
+        read_only = Executor(self.test_dir, ignored_dirs=["ignored_directory"], read_only=True)
+        self.assertIsNone(read_only.events)
+        self.assertEqual(read_only.stats()["completions"], 1)
+
+    def test_summarize(self):
+        dtype = np.dtype(event_dtype_fields)
+        day = datetime.date(2020, 8, 5).toordinal()  # a Wednesday
+        ip, done, todo = status_ints[ip_str], status_ints[done_str], status_ints[todo_str]
+        rows = [
+            # ts, day, project, number, old, new, due, effort
+            (0.0, day, b"a", 1, todo, ip, day + 10, 1),
+            (86400.0, day + 1, b"a", 1, ip, done, day + 10, 1),
+            # completed again without being started again: no cycle time
+            (2 * 86400.0, day + 2, b"a", 1, done, todo, day + 10, 1),
+            (3 * 86400.0, day + 3, b"a", 1, todo, done, day + 10, 1),
+            (0.0, day, b"b", 1, todo, ip, day, 3),
+            (3 * 86400.0, day + 7, b"b", 1, ip, done, day, 3),
+        ]
+        events = np.array(rows, dtype=dtype)
+
+        ct = cycle_times(events)
+        self.assertListEqual(list(np.isnan(ct)), [True, False, True, True, True, False])
+        self.assertListEqual(list(ct[[1, 5]]), [1.0, 3.0])
+
+        s = summarize(events, percentiles=(50,))
+        self.assertEqual(s["completions"], 3)
+        self.assertEqual(s["effort"], 5)
+        monday = datetime.date(2020, 8, 3)
+        self.assertDictEqual(s["per_week"], {monday: 2, monday + datetime.timedelta(days=7): 1})
+        self.assertDictEqual(s["per_project"], {"a": 2, "b": 1})
+        self.assertEqual(s["cycle_time"]["n"], 2)
+        self.assertEqual(s["cycle_time"]["mean"], 2.0)
+        self.assertDictEqual(s["cycle_time"]["percentiles"], {50: 2.0})
+        self.assertAlmostEqual(s["overdue_rate"], 1 / 3)
+        self.assertDictEqual(s["overdue_rate_per_project"], {"a": 0.0, "b": 1.0})
+
+        s = summarize(events, start=datetime.date.fromordinal(day + 2), project_ids=["a"])
+        self.assertEqual(s["completions"], 1)
+        self.assertEqual(s["cycle_time"]["n"], 0)
+        self.assertIsNone(s["cycle_time"]["mean"])
+        self.assertIsNone(summarize(events[:0])["overdue_rate"])
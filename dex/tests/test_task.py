@@ -4,7 +4,8 @@ import unittest
 import datetime
 
 
-from dex.task import Task, encode_dexcode, decode_dexcode, extract_dexcode_from_content, check_flags_valid
+from dex.task import Task, encode_dexcode, decode_dexcode, extract_dexcode_from_content, check_flags_valid, \
+    write_counts
 from dex.constants import due_date_fmt, task_extension, todo_str, ip_str, done_str, hold_str, abandoned_str, \
     inactive_subdir, dexcode_header
 from dex.exceptions import DexcodeException
@@ -162,6 +163,52 @@ class TestTask(unittest.TestCase):
         t = Task.from_file(test_file)
         self.assertEqual(t.dexid, "f421")
 
+    def test_no_op_writes(self):
+        test_file = os.path.join(self.test_dir, 'example task.md')
+        t = Task.from_file(test_file)
+        # The original file is not laid out exactly as dex writes files, so it is rewritten once
+        t._write_state()
+        events = []
+        t.listeners.append(lambda task, event, old, new: events.append(event))
+        mtime_ns = os.stat(test_file).st_mtime_ns
+        written, skipped = write_counts["written"], write_counts["skipped"]
+
+        # Setting the current values does nothing
+        t.set_due(t.due)
+        t.set_importance(t.importance)
+        t.set_effort(t.effort)
+        t.set_dexid(t.dexid)
+        self.assertFalse(t.update(importance=t.importance, status=t.status))
+        self.assertListEqual(events, [])
+
+        # Rewriting the same state does not touch the file
+        t._write_state()
+        self.assertEqual(write_counts["written"], written)
+        self.assertEqual(write_counts["skipped"], skipped + 1)
+        self.assertEqual(os.stat(test_file).st_mtime_ns, mtime_ns)
+
+        # Changes are written
+        t.set_effort(5 if t.effort != 5 else 4)
+        self.assertEqual(write_counts["written"], written + 1)
+        self.assertListEqual(events, ["effort"])
+
+        # The file is compared by content if it was changed outside of this object
+        with open(test_file, "r") as f:
+            state = f.read()
+        with open(test_file, "w") as f:
+            f.write("changed")
+        with open(test_file, "w") as f:
+            f.write(state)
+        t._write_state()
+        self.assertEqual(write_counts["written"], written + 1)
+        self.assertEqual(write_counts["skipped"], skipped + 2)
+
+        with open(test_file, "w") as f:
+            f.write("other content")
+        t._write_state()
+        self.assertEqual(write_counts["written"], written + 2)
+        self.assertEqual(Task.from_file(test_file).effort, t.effort)
+
     def test_flag_setting(self):
         test_file = os.path.join(self.test_dir, 'example task.md')
         t = Task.from_file(test_file)
@@ -174,6 +221,24 @@ class TestTask(unittest.TestCase):
         t.rm_flag(test_flag)
         self.assertTrue(test_flag not in t.flags)
 
+        # Changing the recurrence writes the file once
+        written = write_counts["written"]
+        events = []
+        t.listeners.append(lambda task, event, old, new: events.append((old, new)))
+        t.set_recurrence(7)
+        t.set_recurrence(3)
+        self.assertEqual(write_counts["written"], written + 2)
+        self.assertListEqual(events, [(["n"], ["n", "r7"]), (["n", "r7"], ["n", "r3"])])
+        self.assertListEqual(Task.from_file(test_file).flags, ["n", "r3"])
+        t.set_recurrence(0)
+        self.assertListEqual(t.flags, ["n"])
+
+        # Dependency flags on tasks of project "r" are not recurrences
+        t.add_dependency("r3")
+        t.set_recurrence(7)
+        self.assertListEqual(t.flags, ["n", "dr3", "r7"])
+        self.assertListEqual(t.dependencies, ["r3"])
+
     # Testing properties
     #####################
 